@@ -0,0 +1,299 @@
+"""
+RISC-V Tutor HTTP JSON API
+Standard-library HTTP/1.1 service for LMS integration: generate questions, read
+their prompts, submit answers per pipeline step (singly or in batches) and read stats.
+
+    POST /questions             {"mode": "encoding", "types": "R I"}
+    GET  /questions/<id>        question state (ground truth once finished)
+    GET  /questions/<id>/prompt the current step's rendered prompt
+    POST /questions/<id>/answer {"answer": "R", "step": "type"}
+    POST /answers               {"answers": [{"id": ..., "answer": ...}, ...]}
+    POST /tokens                {"mode": "decoding", "types": "R"}  signed token, no server state
+    POST /tokens/grade          {"token": ..., "step": "opcode", "answer": "51"} or {"answers": [...]}
+    GET  /stats
+"""
+import json
+import secrets
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from engine import QuizEngine
+from render import WorksheetRenderer
+from pipeline import TEXT, FRAME, PROMPT, GRADE, ALL_TYPES, MODE_NAMES, parse_types, make_pipeline
+import tokens
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+MAX_QUESTIONS = 100_000  # Outstanding questions kept; the least recently used are dropped
+MAX_BODY = 1 << 20
+MAX_BATCH = 1000
+MODE_IDS = {name.lower(): mode for mode, name in MODE_NAMES.items()}
+
+class ApiError(Exception):
+    """A request the API rejects; carries the HTTP status."""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def render_text(events: List[Tuple]) -> str:
+    """Plain-text rendering of pipeline events (screen clears are dropped)."""
+    parts = []
+    for event in events:
+        if event[0] == TEXT:
+            parts.append(event[1] + "\n")
+        elif event[0] == FRAME:
+            parts.append("\n".join(event[1]) + "\n")
+        elif event[0] == PROMPT:
+            parts.append(event[1])
+    return "".join(parts)
+
+def _types(body: Dict) -> List[str]:
+    types = body.get("types") or ALL_TYPES
+    return parse_types(types) if isinstance(types, str) else types
+
+def _mode(raw) -> str:
+    mode = str(raw if raw is not None else "").lower()
+    mode = MODE_IDS.get(mode, mode)
+    if mode not in MODE_NAMES:
+        raise ApiError(400, f"unknown mode {raw!r}")
+    return mode
+
+class TutorAPI:
+    """Transport-independent API core; every method returns a JSON-ready dict or raises ApiError."""
+    def __init__(self, max_questions: int = MAX_QUESTIONS, token_key: Optional[bytes] = None):
+        self.max_questions = max_questions
+        self.token_key = token_key or tokens.default_key()
+        self.worksheet = WorksheetRenderer() # frame() is pure; shared by every request thread
+        self.questions: "OrderedDict[str, Tuple[str, object]]" = OrderedDict() # id -> (mode, pipeline)
+        self.lock = threading.Lock()
+        self.stats = {m: {"questions": 0, "answers": 0, "points": 0, "total_points": 0} for m in MODE_NAMES}
+
+    def generate(self, body: Dict) -> Dict:
+        mode = _mode(body.get("mode"))
+        types = _types(body)
+        engine = QuizEngine()
+        try:
+            engine.filter_pool(types)
+        except (TypeError, ValueError) as e:
+            raise ApiError(400, str(e))
+        pipeline = make_pipeline(mode, engine, engine.generate_question(), sorted(set(i.type for i in engine.pool)),
+                                 self.worksheet)
+        prompt = render_text(pipeline.start())
+
+        qid = secrets.token_urlsafe(12)
+        with self.lock:
+            self.questions[qid] = (mode, pipeline)
+            while len(self.questions) > self.max_questions:
+                self.questions.popitem(last=False)
+            self.stats[mode]["questions"] += 1
+        return {"id": qid, "mode": MODE_NAMES[mode].lower(), "step": pipeline.step_name, "prompt": prompt}
+
+    def _get(self, qid: str) -> Tuple[str, object]:
+        entry = self.questions.get(qid)
+        if entry is None:
+            raise ApiError(404, f"unknown question {qid!r}")
+        self.questions.move_to_end(qid)
+        return entry
+
+    def describe(self, qid: str) -> Dict:
+        with self.lock:
+            _, p = self._get(qid)
+            doc = {"id": qid, "instruction": p.ins.name, "step": p.step_name, "done": p.done,
+                   "points": p.points, "total": p.total}
+            if p.done:
+                doc.update(asm=p.q["asm"], hex=p.truth["hex"], binary=p.truth["binary"])
+            return doc
+
+    def prompt(self, qid: str) -> Dict:
+        with self.lock:
+            _, p = self._get(qid)
+            return {"id": qid, "step": p.step_name, "done": p.done, "prompt": p.prompt}
+
+    def answer(self, qid: str, body: Dict) -> Dict:
+        answer = body.get("answer")
+        if not isinstance(answer, str):
+            raise ApiError(400, "answer must be a string")
+        with self.lock:
+            mode, p = self._get(qid)
+            if p.done:
+                raise ApiError(409, "question is finished")
+            step = p.step_name
+            if body.get("step") is not None and body["step"] != step:
+                raise ApiError(409, f"question is at step {step!r}, not {body['step']!r}")
+            events = p.feed(answer)
+            points = sum(e[2] for e in events if e[0] == GRADE)
+            total = sum(e[3] for e in events if e[0] == GRADE)
+            stats = self.stats[mode]
+            stats["answers"] += 1
+            stats["points"] += points
+            stats["total_points"] += total
+            return {"id": qid, "step": step, "points": round(points, 4), "total": round(total, 4),
+                    "feedback": render_text(e for e in events if e[0] != PROMPT),
+                    "next_step": p.step_name if not p.done else None, "prompt": p.prompt,
+                    "done": p.done, "result": None if not p.done else ("done" if p.result else "quit"),
+                    "score": {"points": p.points, "total": p.total}}
+
+    def batch(self, body: Dict) -> Dict:
+        """Grades many answers in order; each gets a result or its own error."""
+        return self._each(body, lambda item: self.answer(str(item.get("id")), item))
+
+    @staticmethod
+    def _each(body: Dict, grade) -> Dict:
+        answers = body.get("answers")
+        if not isinstance(answers, list):
+            raise ApiError(400, "answers must be a list")
+        if len(answers) > MAX_BATCH:
+            raise ApiError(413, f"at most {MAX_BATCH} answers per batch")
+        results = []
+        for item in answers:
+            try:
+                if not isinstance(item, dict):
+                    raise ApiError(400, "each answer must be an object")
+                results.append(grade(item))
+            except ApiError as e:
+                results.append({"id": item.get("id") if isinstance(item, dict) else None,
+                                "error": str(e), "status": e.status})
+        return {"results": results}
+
+    def issue_token(self, body: Dict) -> Dict:
+        """A new question as a signed token; nothing is stored server-side."""
+        mode = _mode(body.get("mode"))
+        try:
+            token, tok = tokens.generate(self.token_key, mode, _types(body))
+        except (TypeError, ValueError) as e:
+            raise ApiError(400, str(e))
+        p = tokens.pipeline_for(tok, self.worksheet)
+        prompt = render_text(p.start())
+        with self.lock:
+            self.stats[mode]["questions"] += 1
+        return {"token": token, "mode": MODE_NAMES[mode].lower(), "step": p.step_name, "prompt": prompt}
+
+    def grade_token(self, body: Dict) -> Dict:
+        """Grades one step of a token's question, rebuilt from the token alone."""
+        answer = body.get("answer")
+        if not isinstance(answer, str):
+            raise ApiError(400, "answer must be a string")
+        try:
+            tok = tokens.parse(self.token_key, body.get("token"))
+        except ValueError as e:
+            raise ApiError(403, str(e))
+        try:
+            p, events = tokens.grade(tok, body.get("step"), answer)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        points = sum(e[2] for e in events if e[0] == GRADE)
+        total = sum(e[3] for e in events if e[0] == GRADE)
+        with self.lock:
+            stats = self.stats[tok.mode]
+            stats["answers"] += 1
+            stats["points"] += points
+            stats["total_points"] += total
+        return {"step": body["step"], "points": round(points, 4), "total": round(total, 4),
+                "feedback": render_text(e for e in events if e[0] != PROMPT),
+                "next_step": p.step_name if not p.done else None, "done": p.done}
+
+    def grade_tokens(self, body: Dict) -> Dict:
+        """One or many token answers; a batch gets a result or an error per item."""
+        if "answers" not in body:
+            return self.grade_token(body)
+        return self._each(body, self.grade_token)
+
+    def stats_doc(self) -> Dict:
+        with self.lock:
+            return {"outstanding": len(self.questions),
+                    "modes": {MODE_NAMES[m].lower(): dict(s) for m, s in self.stats.items()}}
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's TutorAPI; HTTP/1.1 keeps connections alive."""
+    protocol_version = "HTTP/1.1"
+    server_version = "rvtutor"
+    disable_nagle_algorithm = True # headers and body go out as separate small writes
+
+    def log_message(self, format, *args) -> None:
+        pass # one line per request would dominate at LMS rates
+
+    def _send(self, status: int, doc: Dict) -> None:
+        data = json.dumps(doc).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True # the body's end is unknown
+            raise ApiError(400, "Content-Length must be a non-negative integer")
+        if length > MAX_BODY:
+            raise ApiError(413, "request body too large")
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise ApiError(400, "body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "body must be a JSON object")
+        return body
+
+    def _route(self, method: str) -> None:
+        api: TutorAPI = self.server.api
+        parts = [p for p in self.path.split("?", 1)[0].split("/") if p]
+        try:
+            if method == "POST":
+                body = self._body()
+                if parts == ["questions"]:
+                    return self._send(201, api.generate(body))
+                if len(parts) == 3 and parts[0] == "questions" and parts[2] == "answer":
+                    return self._send(200, api.answer(parts[1], body))
+                if parts == ["answers"]:
+                    return self._send(200, api.batch(body))
+                if parts == ["tokens"]:
+                    return self._send(201, api.issue_token(body))
+                if parts == ["tokens", "grade"]:
+                    return self._send(200, api.grade_tokens(body))
+            else:
+                if parts == ["stats"]:
+                    return self._send(200, api.stats_doc())
+                if len(parts) == 2 and parts[0] == "questions":
+                    return self._send(200, api.describe(parts[1]))
+                if len(parts) == 3 and parts[0] == "questions" and parts[2] == "prompt":
+                    return self._send(200, api.prompt(parts[1]))
+            raise ApiError(404, f"no route for {method} {self.path}")
+        except ApiError as e:
+            if e.status == 413:
+                self.close_connection = True # the unread body is still on the socket
+            self._send(e.status, {"error": str(e)})
+        except Exception:
+            traceback.print_exc()
+            self.close_connection = True
+            self._send(500, {"error": "internal error"})
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, api: TutorAPI = None) -> ThreadingHTTPServer:
+    httpd = ThreadingHTTPServer((host, port), ApiHandler)
+    httpd.daemon_threads = True
+    httpd.api = api or TutorAPI()
+    return httpd
+
+def serve_api(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Runs the API until interrupted."""
+    httpd = make_server(host, port)
+    print(f"rvtutor API on http://{host}:{httpd.server_address[1]}", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
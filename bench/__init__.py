@@ -0,0 +1,4 @@
+"""
+RISC-V Tutor Benchmarks
+Performance tooling; run modules from the repository root, e.g. `python3 -m bench.micro`.
+"""
@@ -0,0 +1,302 @@
+"""
+RISC-V Tutor Synthetic-Student Load Generator
+Connects N simulated students to a running tutor server. Each reads its question
+off the screen, answers every step from the engine's own ground truth (wrong at a
+set rate, after a random think time) and times every answer. Reports per-step
+latency percentiles, throughput and the server's memory over time.
+
+    python3 -m bench.load --students 400 --questions 5 --think exp:2
+    python3 -m bench.load --spawn --workers 4 --students 400 --save load.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from riscv import REGISTRY
+from engine import QuizEngine, decode_word
+from pipeline import RecallPipeline, BitsPipeline, EncodingPipeline, DecodingPipeline
+from bench.oracle import encoding_answers, decoding_answers, recall_answers, bits_answers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT_ENDINGS = (b"> ", b"[Y/n]: ")
+WRONG_ANSWER = "x"        # Advances every step without scoring
+TIMEOUT_S = 30.0
+MEMORY_INTERVAL_S = 0.5
+
+MODES = {"recall": ("1", RecallPipeline.STEPS), "bits": ("2", BitsPipeline.STEPS),
+         "encoding": ("3", EncodingPipeline.STEPS), "decoding": ("4", DecodingPipeline.STEPS)}
+BY_NAME = {ins.name: ins for ins in REGISTRY}
+ASM_FIELDS = { # operand order of format_asm, per type
+    "R": ("rd", "rs1", "rs2"), "I": ("rd", "rs1", "imm"), "S": ("rs2", "imm", "rs1"),
+    "B": ("rs1", "rs2", "imm"), "U": ("rd", "imm"), "J": ("rd", "imm"),
+}
+
+def think_time(spec: str) -> Callable[[random.Random], float]:
+    """A think-time sampler from "fixed:S", "exp:MEAN", "uniform:LO:HI" or "lognormal:MEDIAN:SIGMA"."""
+    kind, _, rest = spec.partition(":")
+    try:
+        args = [float(a) for a in rest.split(":")] if rest else []
+    except ValueError:
+        raise ValueError(f"bad think time {spec!r}")
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0]
+    if kind == "exp" and len(args) == 1:
+        return lambda rng: rng.expovariate(1.0 / args[0]) if args[0] > 0 else 0.0
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "lognormal" and len(args) == 2 and args[0] > 0:
+        mu = math.log(args[0])
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    raise ValueError(f"bad think time {spec!r}")
+
+def answers_from_screen(mode: str, text: str) -> List[str]:
+    """The oracle answers for the question on a mode's first screen."""
+    engine = QuizEngine()
+    if mode in ("recall", "bits"):
+        name = re.search(r"Instruction: (\w+)", text).group(1)
+        q = {"instruction": BY_NAME[name]}
+        return recall_answers(q) if mode == "recall" else bits_answers(q)
+    if mode == "encoding":
+        asm = re.search(r"\n(\w+ x\d+, [^\n]+)\n", text).group(1)
+        name, operands = asm.split(" ", 1)
+        ins = BY_NAME[name]
+        q = {"instruction": ins, "rd": 0, "rs1": 0, "rs2": 0, "imm": 0}
+        values = re.findall(r"-?\d+", operands.replace("x", " "))
+        fields = ("rd", "imm", "rs1") if ins.type == "I" and "(" in operands else ASM_FIELDS[ins.type]
+        q.update(zip(fields, map(int, values)))
+        return encoding_answers(engine, q)
+    nibbles = re.search(r"Hex:((?:\s+[0-9a-f]){8})", text).group(1).split()
+    q = decode_word(int("".join(nibbles), 16))
+    return decoding_answers(engine, q)
+
+def _percentile(vals: List[float], pct: float) -> float:
+    if not vals:
+        return 0.0
+    return vals[min(len(vals) - 1, int(round(pct / 100.0 * (len(vals) - 1))))]
+
+class Stats:
+    """Per-step answer latencies and run totals shared by every student."""
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = {}
+        self.answers = 0
+        self.questions = 0
+        self.failures: List[str] = []
+        self.scores: List[Tuple[float, float]] = [] # each student's final accuracy line
+
+    def record(self, step: str, seconds: float) -> None:
+        self.latency.setdefault(step, []).append(seconds)
+        self.answers += 1
+
+class Student:
+    """One simulated student on its own connection."""
+    def __init__(self, host: str, port: int, mode: str, questions: int, error_rate: float,
+                 think: Callable[[random.Random], float], rng: random.Random, stats: Stats):
+        self.host, self.port = host, port
+        self.mode = mode
+        self.questions = questions
+        self.error_rate = error_rate
+        self.think = think
+        self.rng = rng
+        self.stats = stats
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def screen(self) -> str:
+        buf = bytearray()
+        while not buf.endswith(PROMPT_ENDINGS):
+            chunk = await asyncio.wait_for(self.reader.read(65536), TIMEOUT_S)
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            buf += chunk
+        return buf.decode("utf-8", "replace")
+
+    async def send(self, line: str) -> Tuple[str, float]:
+        sent = time.perf_counter()
+        self.writer.write(line.encode() + b"\n")
+        text = await self.screen()
+        return text, time.perf_counter() - sent
+
+    async def run(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            await self.screen()                    # types prompt
+            await self.send("")                    # mode menu
+            choice, steps = MODES[self.mode]
+            text, _ = await self.send(choice)      # first question
+            for i in range(self.questions):
+                for step, answer in zip(steps, answers_from_screen(self.mode, text)):
+                    delay = self.think(self.rng)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if self.rng.random() < self.error_rate:
+                        answer = WRONG_ANSWER
+                    text, seconds = await self.send(answer)
+                    self.stats.record(f"{self.mode}.{step}", seconds)
+                self.stats.questions += 1
+                m = re.search(r"Accuracy: ([\d.]+)/([\d.]+)", text)
+                if i + 1 == self.questions:
+                    if m:
+                        self.stats.scores.append((float(m.group(1)), float(m.group(2))))
+                    break
+                text, _ = await self.send("y")
+            await self.send("n")                   # back to the mode menu
+            self.writer.write(b"q\n")
+            await self.writer.drain()
+        finally:
+            self.writer.close()
+
+def _memory_kib(pid: int) -> Optional[int]:
+    """Proportional set size of a process and its children (RSS where PSS is unavailable), Linux only."""
+    total, found = 0, False
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as fh:
+            pids += [int(p) for p in fh.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        for path, key in ((f"/proc/{p}/smaps_rollup", "Pss:"), (f"/proc/{p}/status", "VmRSS:")):
+            try:
+                with open(path) as fh:
+                    line = next((l for l in fh if l.startswith(key)), None)
+            except OSError:
+                continue
+            if line:
+                total += int(line.split()[1])
+                found = True
+                break
+    return total if found else None
+
+async def _sample_memory(pid: int, start: float, out: List[Tuple[float, int]]) -> None:
+    while True:
+        kib = _memory_kib(pid)
+        if kib is not None:
+            out.append((round(time.perf_counter() - start, 3), kib))
+        await asyncio.sleep(MEMORY_INTERVAL_S)
+
+async def run_load(host: str, port: int, students: int, questions: int, modes: List[str],
+                   error_rate: float = 0.0, think: str = "fixed:0", ramp: float = 0.0,
+                   seed: int = 0, server_pid: Optional[int] = None) -> Dict:
+    """Runs the students to completion (student i takes modes[i % len(modes)]); returns the report."""
+    sampler = think_time(think)
+    stats = Stats()
+    memory: List[Tuple[float, int]] = []
+    start = time.perf_counter()
+    monitor = asyncio.ensure_future(_sample_memory(server_pid, start, memory)) if server_pid else None
+
+    async def student(i: int):
+        await asyncio.sleep(ramp * i / max(students, 1))
+        s = Student(host, port, modes[i % len(modes)], questions, error_rate, sampler,
+                    random.Random(f"{seed}:{i}"), stats)
+        try:
+            await s.run()
+        except (OSError, asyncio.TimeoutError, AttributeError, KeyError) as e:
+            stats.failures.append(f"student {i}: {type(e).__name__}: {e}")
+
+    await asyncio.gather(*(student(i) for i in range(students)))
+    elapsed = time.perf_counter() - start
+    if monitor is not None:
+        monitor.cancel()
+        kib = _memory_kib(server_pid)
+        if kib is not None:
+            memory.append((round(elapsed, 3), kib))
+
+    steps = {}
+    for name, vals in sorted(stats.latency.items()):
+        vals.sort()
+        steps[name] = {"count": len(vals), "p50_ms": _percentile(vals, 50) * 1e3,
+                       "p99_ms": _percentile(vals, 99) * 1e3, "p999_ms": _percentile(vals, 99.9) * 1e3,
+                       "max_ms": vals[-1] * 1e3}
+    points = sum(p for p, _ in stats.scores)
+    total = sum(t for _, t in stats.scores)
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "students": students, "questions": questions,
+                 "modes": modes, "error_rate": error_rate, "think": think, "seed": seed},
+        "elapsed_s": elapsed,
+        "answers": stats.answers,
+        "answers_per_sec": stats.answers / elapsed if elapsed else 0.0,
+        "questions_per_sec": stats.questions / elapsed if elapsed else 0.0,
+        "accuracy": points / total if total else 0.0,
+        "failures": stats.failures,
+        "steps": steps,
+        "memory_kib": memory,
+    }
+
+def format_report(doc: Dict) -> str:
+    lines = [f"{'step':<20} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'p999 ms':>9} {'max ms':>9}", "-" * 68]
+    for name, r in doc["steps"].items():
+        lines.append(f"{name:<20} {r['count']:>7} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                     f"{r['p999_ms']:>9.2f} {r['max_ms']:>9.2f}")
+    lines.append(f"\n{doc['answers']} answers in {doc['elapsed_s']:.2f}s: {doc['answers_per_sec']:.0f} answers/s, "
+                 f"{doc['questions_per_sec']:.1f} questions/s, accuracy {doc['accuracy']:.1%}")
+    if doc["memory_kib"]:
+        peak = max(k for _, k in doc["memory_kib"])
+        lines.append(f"server memory: {doc['memory_kib'][0][1] / 1024:.1f} MiB at start, "
+                     f"peak {peak / 1024:.1f} MiB, {doc['memory_kib'][-1][1] / 1024:.1f} MiB at end")
+    if doc["failures"]:
+        lines.append(f"{len(doc['failures'])} students failed, first: {doc['failures'][0]}")
+    return "\n".join(lines)
+
+def _spawn_server(workers: int) -> Tuple[subprocess.Popen, int]:
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "serve", "--port", "0",
+                             "--workers", str(workers)], cwd=ROOT, stderr=subprocess.PIPE)
+    line = proc.stderr.readline().decode()
+    m = re.search(r":(\d+) ", line)
+    if not m:
+        proc.kill()
+        raise RuntimeError(f"server did not start: {line.strip()}")
+    return proc, int(m.group(1))
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.load", description="rvtutor synthetic-student load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--spawn", action="store_true", help="Start a server on a free port for the run")
+    parser.add_argument("--workers", type=int, default=1, help="Server workers (--spawn)")
+    parser.add_argument("--server-pid", type=int, default=None, help="Sample this server's memory (Linux)")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=5, help="Questions per student")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Fraction of answers given wrong")
+    parser.add_argument("--think", default="fixed:0",
+                        help="Think time: fixed:S, exp:MEAN, uniform:LO:HI or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--ramp", type=float, default=1.0, help="Seconds over which students connect")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the report as JSON")
+    parser.add_argument("modes", nargs="*", help=f"Modes: {', '.join(MODES)} (default: all, round-robin)")
+    args = parser.parse_args(argv)
+    unknown = [m for m in args.modes if m not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+    try:
+        think_time(args.think)
+    except ValueError as e:
+        parser.error(str(e))
+
+    proc, port, pid = None, args.port, args.server_pid
+    if args.spawn:
+        proc, port = _spawn_server(args.workers)
+        pid = proc.pid
+    try:
+        doc = asyncio.run(run_load(args.host, port, args.students, args.questions, args.modes or list(MODES),
+                                   args.error_rate, args.think, args.ramp, args.seed, pid))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    print(format_report(doc))
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(doc, fh, indent=2)
+    return 1 if doc["failures"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
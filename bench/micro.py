@@ -0,0 +1,251 @@
+"""
+RISC-V Tutor Microbenchmarks
+Times engine, validator, utility and full pipeline hot paths; reports ops/sec
+and p50/p99 latency, saves JSON baselines and compares against a previous run.
+
+    python3 -m bench.micro --save bench/baseline.json
+    python3 -m bench.micro --compare bench/baseline.json
+    python3 -m bench.micro --stats-scaling
+"""
+import argparse
+import builtins
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+import main
+from engine import QuizEngine, Stats
+from utils import to_bin, to_hex, sign_extend
+from bench.oracle import encoding_answers, decoding_answers
+
+TARGET_BATCH_NS = 200_000 # Small ops are timed in batches to keep timer overhead out
+REGRESSION_PCT = 10.0
+SCALING_THREADS = (1, 2, 4, 8, 16, 32)
+
+class NullWriter:
+    """Discarding stdout replacement so terminal output cost is not measured."""
+    def write(self, s: str) -> int:
+        return len(s)
+
+    def flush(self) -> None:
+        pass
+
+def _percentile(sorted_vals: List[float], pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(pct / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+def measure(fn: Callable[[], object], duration: float = 0.5) -> Dict:
+    """Runs fn repeatedly for ~duration seconds; returns ops/sec and per-op p50/p99 in ns."""
+    clock = time.perf_counter_ns
+    # Calibrate a batch size so each timed sample is long enough to be accurate
+    batch = 1
+    while True:
+        t0 = clock()
+        for _ in range(batch):
+            fn()
+        elapsed = clock() - t0
+        if elapsed >= TARGET_BATCH_NS or batch >= 1 << 16:
+            break
+        batch *= 2
+
+    samples = []
+    ops = 0
+    deadline = clock() + int(duration * 1e9)
+    start = clock()
+    while clock() < deadline or len(samples) < 5:
+        t0 = clock()
+        for _ in range(batch):
+            fn()
+        samples.append((clock() - t0) / batch)
+        ops += batch
+    total = clock() - start
+
+    samples.sort()
+    return {
+        "ops_per_sec": ops * 1e9 / total,
+        "p50_ns": _percentile(samples, 50),
+        "p99_ns": _percentile(samples, 99),
+        "samples": len(samples),
+        "batch": batch,
+    }
+
+def _engine_cases(engine: QuizEngine) -> Dict[str, Callable[[], object]]:
+    q = engine.generate_question()
+    ins = q["instruction"]
+    target_vals = {"opcode": ins.op, "rd": q["rd"], "rs1": q["rs1"], "rs2": q["rs2"], "imm": q["imm"]}
+    layout = encoding_answers(engine, q)[1].split()
+    bits = [len(f) for f in encoding_answers(engine, q)[2].split()]
+    asm = q["asm"]
+
+    def ground_truth():
+        engine.current_q = q
+        return engine.get_ground_truth()
+
+    return {
+        "generate_question": engine.generate_question,
+        "format_asm": lambda: engine.format_asm(q),
+        "get_ground_truth": ground_truth,
+        "validate_layout": lambda: (setattr(engine, "current_q", q), engine.validate_layout(layout)),
+        "validate_bits": lambda: (setattr(engine, "current_q", q), engine.validate_bits(bits)),
+        "validate_asm_strict": lambda: main.validate_asm_strict(asm, ins, target_vals),
+        "record_stats": lambda: engine.record_stats(0.5, 1),
+        "utils.to_bin": lambda: to_bin(-1234, 12),
+        "utils.to_hex": lambda: to_hex(0x402081B3),
+        "utils.sign_extend": lambda: sign_extend(0x800, 12),
+    }
+
+def _pipeline_case(engine: QuizEngine, run: Callable, answers_for: Callable) -> Callable[[], object]:
+    """One full pipeline pass over a fresh question, answered by the oracle."""
+    def once():
+        q = engine.generate_question()
+        answers = iter(answers_for(engine, q))
+        builtins.input = lambda prompt="": next(answers)
+        return run(engine, q)
+    return once
+
+class LockedStats:
+    """The alternative to Stats: one dict, one lock taken by every grade."""
+    def __init__(self):
+        self.stats = {"success": 0, "attempts": 0, "points": 0, "total_points": 0}
+        self.lock = threading.Lock()
+
+    def record(self, points: float, total: float) -> None:
+        with self.lock:
+            self.stats["points"] += points
+            self.stats["total_points"] += total
+            self.stats["attempts"] += 1
+            if points == total:
+                self.stats["success"] += 1
+
+def stats_scaling(threads=SCALING_THREADS, grades: int = 20_000) -> Dict[str, Dict[int, float]]:
+    """Grades/sec recorded by every thread count into one shared accumulator, sharded vs locked."""
+    out: Dict[str, Dict[int, float]] = {"sharded": {}, "locked": {}}
+    for name, make in (("sharded", Stats), ("locked", LockedStats)):
+        for n in threads:
+            acc = make()
+            start = threading.Barrier(n + 1)
+            def work(record=acc.record):
+                start.wait()
+                for _ in range(grades):
+                    record(0.5, 1)
+            workers = [threading.Thread(target=work) for _ in range(n)]
+            for t in workers:
+                t.start()
+            t0 = time.perf_counter()
+            start.wait()
+            for t in workers:
+                t.join()
+            out[name][n] = n * grades / (time.perf_counter() - t0)
+    return out
+
+def format_scaling(results: Dict[str, Dict[int, float]]) -> str:
+    names = list(results)
+    lines = [f"{'threads':>8}" + "".join(f"{n + ' grades/s':>20}" for n in names) + f"{'ratio':>8}"]
+    for n in results[names[0]]:
+        rates = [results[name][n] for name in names]
+        lines.append(f"{n:>8}" + "".join(f"{r:>20,.0f}" for r in rates) + f"{rates[0] / rates[1]:>8.2f}")
+    return "\n".join(lines)
+
+def run_suite(duration: float = 0.5, only: Optional[List[str]] = None, seed: int = 0) -> Dict:
+    """Runs every (or the selected) benchmark; returns a baseline document."""
+    random.seed(seed)
+    engine = QuizEngine()
+    engine.filter_pool(["R", "I", "S", "B", "U", "J"])
+
+    cases = _engine_cases(engine)
+    cases["run_encoding_pipeline"] = _pipeline_case(engine, main.run_encoding_pipeline, encoding_answers)
+    cases["run_decoding_pipeline"] = _pipeline_case(engine, main.run_decoding_pipeline, decoding_answers)
+
+    results = {}
+    real_input, real_stdout = builtins.input, sys.stdout
+    try:
+        with patch("main.clear_screen", lambda: None):
+            sys.stdout = NullWriter()
+            for name, fn in cases.items():
+                if only and name not in only:
+                    continue
+                results[name] = measure(fn, duration)
+    finally:
+        builtins.input, sys.stdout = real_input, real_stdout
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration": duration,
+        },
+        "results": results,
+    }
+
+def format_results(doc: Dict) -> str:
+    lines = [f"{'benchmark':<24} {'ops/sec':>14} {'p50':>12} {'p99':>12}", "-" * 65]
+    for name, r in doc["results"].items():
+        lines.append(f"{name:<24} {r['ops_per_sec']:>14,.0f} {_fmt_ns(r['p50_ns']):>12} {_fmt_ns(r['p99_ns']):>12}")
+    return "\n".join(lines)
+
+def compare(base: Dict, new: Dict, threshold: float = REGRESSION_PCT) -> Tuple[str, List[str]]:
+    """Builds a comparison table; returns (table, names that regressed beyond threshold %)."""
+    lines = [f"{'benchmark':<24} {'base ops/s':>14} {'new ops/s':>14} {'change':>9} {'p99 base':>10} {'p99 new':>10}",
+             "-" * 86]
+    regressed = []
+    for name, r in new["results"].items():
+        b = base["results"].get(name)
+        if b is None:
+            lines.append(f"{name:<24} {'-':>14} {r['ops_per_sec']:>14,.0f} {'new':>9}")
+            continue
+        change = (r["ops_per_sec"] / b["ops_per_sec"] - 1.0) * 100.0
+        flag = ""
+        if change < -threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name:<24} {b['ops_per_sec']:>14,.0f} {r['ops_per_sec']:>14,.0f} {change:>+8.1f}% "
+                     f"{_fmt_ns(b['p99_ns']):>10} {_fmt_ns(r['p99_ns']):>10}{flag}")
+    return "\n".join(lines), regressed
+
+def _fmt_ns(ns: float) -> str:
+    if ns >= 1e6: return f"{ns / 1e6:.2f}ms"
+    if ns >= 1e3: return f"{ns / 1e3:.2f}us"
+    return f"{ns:.0f}ns"
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.micro", description="rvtutor microbenchmarks")
+    parser.add_argument("--duration", type=float, default=0.5, help="Seconds per benchmark")
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare against a previously saved baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_PCT, help="Regression threshold in %%")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stats-scaling", action="store_true",
+                        help="Compare sharded and locked stats recording from 1-32 threads instead")
+    parser.add_argument("only", nargs="*", help="Run only these benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.stats_scaling:
+        print(format_scaling(stats_scaling()))
+        return 0
+
+    doc = run_suite(args.duration, args.only or None, args.seed)
+    print(format_results(doc))
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(doc, fh, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as fh:
+            base = json.load(fh)
+        table, regressed = compare(base, doc, args.threshold)
+        print("\n" + table)
+        if regressed:
+            print(f"\nRegressed beyond {args.threshold:.0f}%: {', '.join(regressed)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,42 @@
+"""
+RISC-V Tutor Oracle Answers
+Scripted answers for every pipeline step, derived from the engine's own ground truth.
+"""
+from typing import Dict, List
+from riscv import LAYOUTS
+
+def encoding_answers(engine, q: Dict) -> List[str]:
+    """Correct answers for the 4 encoding steps of a question."""
+    engine.current_q = q
+    truth = engine.get_ground_truth()
+    ins = q["instruction"]
+    return [
+        ins.type,
+        " ".join(f[0] for f in LAYOUTS[ins.type]),
+        " ".join(f[1] for f in truth["fields"]),
+        truth["hex"],
+    ]
+
+def decoding_answers(engine, q: Dict) -> List[str]:
+    """Correct answers for the 6 decoding steps of a question."""
+    engine.current_q = q
+    truth = engine.get_ground_truth()
+    ins = q["instruction"]
+    return [
+        truth["binary"],
+        str(ins.op),
+        ins.type,
+        " ".join(f[0] for f in LAYOUTS[ins.type]),
+        " ".join(str(int(f[1], 2)) for f in truth["fields"]),
+        engine.format_asm(q),
+    ]
+
+def recall_answers(q: Dict) -> List[str]:
+    """Correct answers for the 2 recall steps of a question."""
+    ins = q["instruction"]
+    return [ins.type, " ".join(f[0] for f in LAYOUTS[ins.type])]
+
+def bits_answers(q: Dict) -> List[str]:
+    """Correct answers for the 2 bits steps of a question."""
+    ins = q["instruction"]
+    return [ins.type, " ".join(str(f[1]) for f in LAYOUTS[ins.type])]
@@ -0,0 +1,167 @@
+"""
+RISC-V Tutor Pseudo-Terminal Latency Benchmark
+Runs main.py under a pty, feeds scripted keystrokes and measures
+keystroke-to-frame-complete latency and bytes written per question, per mode.
+POSIX only.
+
+    python3 -m bench.pty_latency --questions 20 --save pty_report.json
+    python3 -m bench.pty_latency --compare pty_report.json
+"""
+import argparse
+import fcntl
+import json
+import os
+import platform
+import select
+import struct
+import subprocess
+import sys
+import termios
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT_ENDINGS = (b"> ", b"[Y/n]: ")
+QUIET_S = 0.02   # A frame is complete once a prompt is shown and output stays quiet this long
+TIMEOUT_S = 10.0
+
+# Filler answers per mode: any non-empty, non-quit answer advances every step
+MODES = {
+    "recall":   ("1", ["R", "opcode"]),
+    "bits":     ("2", ["R", "7"]),
+    "encoding": ("3", ["R", "opcode", "0", "0"]),
+    "decoding": ("4", ["0" * 32, "0", "R", "opcode", "0", "nop"]),
+}
+
+class PtySession:
+    """A main.py process attached to a pseudo-terminal with echo disabled."""
+    def __init__(self, rows: int = 40, cols: int = 120, argv: Optional[List[str]] = None):
+        self.master, slave = os.openpty()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+        attrs = termios.tcgetattr(slave)
+        attrs[3] &= ~termios.ECHO # count only what the tutor writes
+        termios.tcsetattr(slave, termios.TCSANOW, attrs)
+        env = dict(os.environ, TERM="xterm-256color", PYTHONUNBUFFERED="1")
+        self.proc = subprocess.Popen(argv or [sys.executable, os.path.join(ROOT, "main.py")],
+                                     stdin=slave, stdout=slave, stderr=slave, cwd=ROOT, env=env,
+                                     start_new_session=True, close_fds=True)
+        os.close(slave)
+
+    def read_frame(self) -> Tuple[bytes, float]:
+        """Reads until a prompt is shown and output goes quiet; returns (bytes, last byte time)."""
+        buf = bytearray()
+        last = time.perf_counter()
+        deadline = last + TIMEOUT_S
+        while True:
+            done = buf.endswith(PROMPT_ENDINGS)
+            wait = QUIET_S if done else max(0.0, deadline - time.perf_counter())
+            ready, _, _ = select.select([self.master], [], [], wait)
+            if not ready:
+                if done:
+                    return bytes(buf), last
+                raise TimeoutError(f"No prompt after {TIMEOUT_S}s; got {bytes(buf[-200:])!r}")
+            try:
+                chunk = os.read(self.master, 65536)
+            except OSError: # EIO once the child exits
+                chunk = b""
+            if not chunk:
+                return bytes(buf), last
+            last = time.perf_counter()
+            buf += chunk
+
+    def send(self, line: str) -> float:
+        """Types a line; returns the send timestamp."""
+        t = time.perf_counter()
+        os.write(self.master, line.encode() + b"\r")
+        return t
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        os.close(self.master)
+
+def _percentile(vals: List[float], pct: float) -> float:
+    vals = sorted(vals)
+    if not vals:
+        return 0.0
+    return vals[min(len(vals) - 1, int(round(pct / 100.0 * (len(vals) - 1))))]
+
+def run_mode(mode: str, questions: int) -> Dict:
+    """Drives one mode for N questions; returns latency and byte statistics."""
+    choice, answers = MODES[mode]
+    session = PtySession()
+    latencies, bytes_per_q = [], []
+    try:
+        session.read_frame()                 # types prompt
+        session.send("")
+        session.read_frame()                 # mode menu
+        session.send(choice)
+        session.read_frame()                 # first question
+        for i in range(questions):
+            written = 0
+            for answer in answers + ["y" if i + 1 < questions else "n"]:
+                sent = session.send(answer)
+                frame, last = session.read_frame()
+                latencies.append((last - sent) * 1e3)
+                written += len(frame)
+            bytes_per_q.append(written)
+        session.send("q")
+    finally:
+        session.close()
+    return {
+        "questions": questions,
+        "keystrokes": len(latencies),
+        "latency_ms": {"p50": _percentile(latencies, 50), "p99": _percentile(latencies, 99),
+                       "max": max(latencies) if latencies else 0.0},
+        "bytes_per_question": sum(bytes_per_q) / len(bytes_per_q) if bytes_per_q else 0.0,
+    }
+
+def run_report(modes: List[str], questions: int) -> Dict:
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "questions": questions},
+        "modes": {m: run_mode(m, questions) for m in modes},
+    }
+
+def format_report(doc: Dict, base: Optional[Dict] = None) -> str:
+    lines = [f"{'mode':<10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'bytes/q':>10}" +
+             (f" {'base p50':>9} {'base bytes/q':>13}" if base else ""),
+             "-" * (50 + (24 if base else 0))]
+    for mode, r in doc["modes"].items():
+        lat = r["latency_ms"]
+        row = f"{mode:<10} {lat['p50']:>9.2f} {lat['p99']:>9.2f} {lat['max']:>9.2f} {r['bytes_per_question']:>10.0f}"
+        b = (base or {}).get("modes", {}).get(mode)
+        if b:
+            row += f" {b['latency_ms']['p50']:>9.2f} {b['bytes_per_question']:>13.0f}"
+        lines.append(row)
+    return "\n".join(lines)
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.pty_latency", description="rvtutor pty latency benchmark")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per mode")
+    parser.add_argument("--save", help="Write the report as JSON")
+    parser.add_argument("--history", help="Append the report to a JSON-lines history file")
+    parser.add_argument("--compare", help="Show a previously saved report alongside")
+    parser.add_argument("modes", nargs="*", help=f"Modes: {', '.join(MODES)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [m for m in args.modes if m not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    doc = run_report(args.modes or list(MODES), args.questions)
+    base = None
+    if args.compare:
+        with open(args.compare) as fh:
+            base = json.load(fh)
+    print(format_report(doc, base))
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(doc, fh, indent=2)
+    if args.history:
+        with open(args.history, "a") as fh:
+            fh.write(json.dumps(doc) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
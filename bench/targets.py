@@ -0,0 +1,141 @@
+"""
+RISC-V Tutor Timing Targets
+Times the operations the README gives a target for, and exits 1 when one is
+missed. The unit tests check the same operations for correctness only, so a
+slow or instrumented interpreter does not fail them.
+
+    python3 -m bench.targets
+    python3 -m bench.targets restore takeover overhead
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+import checkpoint
+import sampler
+from engine import ground_truth
+from pipeline import reference_rows
+from render import WorksheetRenderer
+from server import Session, TutorServer
+
+class NullWriter:
+    """A connection that takes every write."""
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+def restore_seconds(repeats: int = 20) -> float:
+    """Best time to restore a session checkpointed three steps into a decoding worksheet."""
+    async def main():
+        worksheet = WorksheetRenderer()
+        session = Session(asyncio.StreamReader(), NullWriter(), "s")
+        engine = session.engine
+        engine.filter_pool(["R", "I"])
+        session.types, session.mode, session.phase = ["I", "R"], "4", checkpoint.QUESTION
+        q = engine.generate_question()
+        session.rows = reference_rows(engine, q["instruction"])
+        pipeline = session.pipeline = session._pipeline(q, worksheet)
+        pipeline.start()
+        for answer in (ground_truth(q)["binary"], "0", q["instruction"].type):
+            session.answers.append(answer)
+            pipeline.feed(answer)
+        record = session.checkpoint()
+        best = float("inf")
+        for _ in range(repeats):
+            restored = Session(asyncio.StreamReader(), NullWriter(), "s")
+            start = perf_counter()
+            restored.restore(record, worksheet)
+            best = min(best, perf_counter() - start)
+        return best
+    return asyncio.run(main())
+
+def takeover_seconds(sessions: int = 1000) -> float:
+    """Time for a new server to take over `sessions` connections, one of them mid-worksheet."""
+    async def send(r, w, line):
+        w.write(line.encode() + b"\n")
+        return await r.readuntil(b"> ")
+
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            control = os.path.join(tmp, "control")
+            old = TutorServer(port=0, control=control)
+            await old.start()
+            conns = []
+            for _ in range(sessions):
+                r, w = await asyncio.open_connection("127.0.0.1", old.port)
+                await r.readuntil(b"> ")
+                await send(r, w, "")
+                conns.append((r, w))
+            await send(r, w, "4")
+            new = TutorServer(port=0, control=control)
+            start = perf_counter()
+            await new.start()
+            elapsed = perf_counter() - start
+            if new.taken_over != sessions:
+                raise RuntimeError(f"took over {new.taken_over} of {sessions} sessions")
+            for _, w in conns:
+                w.close()
+            await old.close()
+            await new.close()
+            return elapsed
+    return asyncio.run(main())
+
+def sampler_overhead(seconds: float = 2.0, hz: float = sampler.DEFAULT_HZ) -> float:
+    """Share of a profiling window the sampler held the interpreter while another thread runs."""
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    busy = threading.Thread(target=spin, name="busy")
+    busy.start()
+    try:
+        return sampler.profile(seconds, hz=hz).overhead
+    finally:
+        stop.set()
+        busy.join()
+
+# name -> (measure, limit, format, what is measured)
+TARGETS: Dict[str, Tuple[Callable[[], float], float, Callable[[float], str], str]] = {
+    "restore": (restore_seconds, 0.001, lambda v: f"{v * 1e3:.3f} ms", "restore a mid-worksheet checkpoint"),
+    "takeover": (takeover_seconds, 1.0, lambda v: f"{v:.3f} s", "hand 1,000 sessions to a new server"),
+    "overhead": (sampler_overhead, 0.01, lambda v: f"{v:.2%}", "sampler's share of a 100 Hz /profile window"),
+}
+
+def run_targets(only: List[str]) -> List[Tuple[str, float, bool]]:
+    """(name, measured, met) per target."""
+    results = []
+    for name in only or list(TARGETS):
+        measure, limit, _, _ = TARGETS[name]
+        value = measure()
+        results.append((name, value, value < limit))
+    return results
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.targets", description="rvtutor timing targets")
+    parser.add_argument("only", nargs="*", help=f"Targets: {', '.join(TARGETS)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [t for t in args.only if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    missed = 0
+    print(f"{'target':<12}{'measured':>14}{'limit':>14}  what")
+    for name, value, met in run_targets(args.only):
+        _, limit, fmt, what = TARGETS[name]
+        print(f"{name:<12}{fmt(value):>14}{fmt(limit):>14}  {what}" + ("" if met else "  MISSED"))
+        missed += not met
+    return 1 if missed else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
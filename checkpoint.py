@@ -0,0 +1,133 @@
+"""
+RISC-V Tutor Session Checkpoints
+A session's resumable state packed into a compact binary record: menu position,
+type filter, stats, and the open question with its reference rows and the
+answers given so far. Replaying those answers rebuilds the question exactly as
+the student left it. Instructions are recorded by name, so a record restores
+under any registry that still has them. Evicted sessions' records are kept in a
+spill directory.
+"""
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+import riscv
+from pipeline import ALL_TYPES, MODE_NAMES, _ref_row
+
+VERSION = 2
+# Where the session's menu loop is waiting
+TYPES, MODE, QUESTION, CONTINUE = range(4)
+FRESH = 1 # flag: no line read yet, so the first one may still be a resume request
+
+# version, flags, phase, type mask, mode, attempts, success, points, total points
+HEADER = struct.Struct("<BBBBBIIdd")
+# rd, rs1, rs2, imm, reference rows, answers; then the instruction's and rows' names, and the answers
+QUESTION_HEAD = struct.Struct("<BBBiBB")
+NAME = struct.Struct("<B")    # before each instruction name
+LENGTH = struct.Struct("<H")  # before each answer
+LAST = struct.Struct("<I")    # before the output last sent, replayed to a resumed connection
+
+class SessionState:
+    """The state a session needs to pick up where it left off; `question` is None outside a question."""
+    __slots__ = ("phase", "fresh", "types", "mode", "stats", "question", "rows", "answers", "last")
+
+    def __init__(self, phase: int, fresh: bool, types: List[str], mode: Optional[str], stats: Dict,
+                 question: Optional[Dict] = None, rows: Tuple = (), answers: Tuple[str, ...] = (),
+                 last: bytes = b""):
+        self.phase = phase
+        self.fresh = fresh
+        self.types = types
+        self.mode = mode
+        self.stats = stats
+        self.question = question
+        self.rows = rows       # decoding reference rows, as pipeline.reference_rows returns them
+        self.answers = answers # fed to the question so far, in order
+        self.last = last
+
+def pack(state: SessionState) -> bytes:
+    s = state.stats
+    parts = [HEADER.pack(VERSION, FRESH if state.fresh else 0, state.phase,
+                         sum(1 << i for i, t in enumerate(ALL_TYPES) if t in state.types),
+                         int(state.mode or 0), s["attempts"], s["success"], s["points"], s["total_points"])]
+    q = state.question
+    if state.phase == QUESTION:
+        if q is None:
+            raise ValueError("a session in a question needs its question")
+        parts.append(QUESTION_HEAD.pack(q["rd"], q["rs1"], q["rs2"], q["imm"], len(state.rows), len(state.answers)))
+        for name in [q["instruction"].name] + [row[0] for row in state.rows]:
+            raw = name.encode()
+            parts.append(NAME.pack(len(raw)))
+            parts.append(raw)
+        for answer in state.answers:
+            raw = answer.encode()
+            parts.append(LENGTH.pack(len(raw)))
+            parts.append(raw)
+    parts.append(LAST.pack(len(state.last)))
+    parts.append(state.last)
+    return b"".join(parts)
+
+def unpack(data: bytes) -> SessionState:
+    """Decodes a record; raises ValueError if it is malformed."""
+    try:
+        version, flags, phase, mask, mode, attempts, success, points, total = HEADER.unpack_from(data)
+        if version != VERSION or phase > CONTINUE or (mode and str(mode) not in MODE_NAMES):
+            raise ValueError("checkpoint fields are out of range")
+        pos = HEADER.size
+        question, rows, answers = None, (), []
+        if phase == QUESTION:
+            rd, rs1, rs2, imm, nrows, nanswers = QUESTION_HEAD.unpack_from(data, pos)
+            pos += QUESTION_HEAD.size
+            by_name, found = riscv.current().by_name, []
+            for _ in range(1 + nrows):
+                (n,) = NAME.unpack_from(data, pos)
+                name = data[pos + NAME.size:pos + NAME.size + n].decode()
+                if name not in by_name:
+                    raise ValueError(f"checkpoint names {name!r}, which is not in the registry")
+                found.append(by_name[name])
+                pos += NAME.size + n
+            question = {"instruction": found[0], "rd": rd, "rs1": rs1, "rs2": rs2, "imm": imm}
+            rows = [_ref_row(ins) for ins in found[1:]]
+            for _ in range(nanswers):
+                (n,) = LENGTH.unpack_from(data, pos)
+                if len(data) < pos + LENGTH.size + n:
+                    raise ValueError("checkpoint is truncated")
+                answers.append(data[pos + LENGTH.size:pos + LENGTH.size + n].decode())
+                pos += LENGTH.size + n
+        (n,) = LAST.unpack_from(data, pos)
+        last = data[pos + LAST.size:pos + LAST.size + n]
+        if len(last) != n:
+            raise ValueError("checkpoint is truncated")
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"malformed checkpoint: {e}")
+    stats = {"success": success, "attempts": attempts, "points": points, "total_points": total}
+    types = [t for i, t in enumerate(ALL_TYPES) if mask >> i & 1]
+    return SessionState(phase, bool(flags & FRESH), types, str(mode) if mode else None, stats,
+                        question, rows, tuple(answers), last)
+
+class SpillDir:
+    """Records of evicted sessions, one file per session id."""
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, sid: str) -> str:
+        if not sid or not sid.isalnum():
+            raise ValueError(f"bad session id {sid!r}")
+        return os.path.join(self.path, sid)
+
+    def put(self, sid: str, record: bytes) -> None:
+        with open(self._file(sid), "wb") as fh:
+            fh.write(record)
+
+    def take(self, sid: str) -> bytes:
+        """Reads a record and removes it; raises FileNotFoundError if there is none."""
+        path = self._file(sid)
+        with open(path, "rb") as fh:
+            record = fh.read()
+        os.unlink(path)
+        return record
+
+    def discard(self, sid: str) -> None:
+        try:
+            os.unlink(self._file(sid))
+        except FileNotFoundError:
+            pass
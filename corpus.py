@@ -0,0 +1,155 @@
+"""
+RISC-V Tutor Golden Encoding Corpus
+Fixed-width binary records of (instruction, operands, expected word), checked
+against the engine's encoder through mmap in vectorized chunks.
+"""
+import mmap
+import random
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple
+from riscv import REGISTRY, Swizzler
+from engine import QuizEngine, FIELD_PLANS, encode_word
+from verify import QuestionSpace
+
+try:
+    import numpy as np
+except ImportError: # Optional: the stdlib path is used without it
+    np = None
+
+MAGIC = b"RVGC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")     # magic, version, record size, record count
+RECORD = struct.Struct("<8sBBBxiI")  # mnemonic, rd, rs1, rs2, pad, imm, word
+DEFAULT_PATH = "golden.rvgc"
+DEFAULT_COUNT = 1 << 20
+CHUNK = 1 << 18
+SAMPLE_STRIDE = 997 # Scalar get_ground_truth/Swizzler cross-check every Nth record
+MAX_REPORTED = 20
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([("name", "S8"), ("rd", "u1"), ("rs1", "u1"), ("rs2", "u1"),
+                             ("pad", "u1"), ("imm", "<i4"), ("word", "<u4")])
+    assert RECORD_DTYPE.itemsize == RECORD.size
+
+def build_corpus(path: str = DEFAULT_PATH, count: int = DEFAULT_COUNT, seed: int = 0) -> int:
+    """Writes `count` records sampled uniformly over the full question space; returns count."""
+    if count <= 0:
+        raise ValueError(f"count must be positive, got {count}")
+    rng = random.Random(seed)
+    space = QuestionSpace()
+    with open(path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count))
+        buf = bytearray()
+        for _ in range(count):
+            q = space.point(rng.randrange(len(space)))
+            buf += RECORD.pack(q["instruction"].name.encode(), q["rd"], q["rs1"], q["rs2"],
+                               q["imm"], encode_word(q))
+            if len(buf) >= CHUNK * RECORD.size:
+                fh.write(buf)
+                buf.clear()
+        fh.write(buf)
+    return count
+
+def _open_records(fh) -> Tuple[mmap.mmap, int]:
+    mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < HEADER.size:
+        mm.close()
+        raise ValueError("Corpus file is truncated")
+    magic, version, size, count = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        mm.close()
+        raise ValueError(f"Not a version {VERSION} golden corpus")
+    if len(mm) != HEADER.size + count * RECORD.size:
+        mm.close()
+        raise ValueError(f"Corpus length does not match its {count} records")
+    return mm, count
+
+def _encode_chunk_numpy(rec) -> "np.ndarray":
+    """Vectorized counterpart of engine.encode_word over a structured record array."""
+    words = np.zeros(len(rec), dtype=np.uint32)
+    known = np.zeros(len(rec), dtype=bool)
+    imm = rec["imm"].astype(np.int64)
+    for ins in REGISTRY:
+        sel = rec["name"] == ins.name.encode()
+        if not sel.any():
+            continue
+        known |= sel
+        sources = {
+            "opcode": ins.op, "zero": 0,
+            "funct3": ins.f3 if ins.f3 is not None else 0,
+            "funct7": ins.f7 if ins.f7 is not None else 0,
+            "rd": rec["rd"][sel].astype(np.int64), "rs1": rec["rs1"][sel].astype(np.int64),
+            "rs2": rec["rs2"][sel].astype(np.int64), "imm": imm[sel],
+        }
+        w = np.zeros(int(sel.sum()), dtype=np.int64)
+        for _, length, shift, source, lo in FIELD_PLANS[ins.type]:
+            w |= ((np.asarray(sources[source], dtype=np.int64) >> lo) & ((1 << length) - 1)) << shift
+        words[sel] = w.astype(np.uint32)
+    # Unknown mnemonics can never match; flip their expected word
+    words[~known] = ~rec["word"][~known]
+    return words
+
+def _scalar_check(engine: QuizEngine, q: Dict, word: int) -> bool:
+    """Cross-checks get_ground_truth and the Swizzler against an expected word."""
+    engine.current_q = q
+    truth = engine.get_ground_truth()
+    if int(truth["hex"], 16) != word:
+        return False
+    imm_bits = [v for n, v in truth["fields"] if n.startswith("imm")]
+    swizzle = {'S': Swizzler.s_type, 'B': Swizzler.b_type, 'J': Swizzler.j_type}.get(q["instruction"].type)
+    if swizzle is not None and swizzle(q["imm"]) != imm_bits:
+        return False
+    return True
+
+def check_corpus(path: str = DEFAULT_PATH, vectorized: Optional[bool] = None, out=None) -> List[int]:
+    """Compares every record with the encoder; returns the indices of mismatched records."""
+    out = out or sys.stdout
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized and np is None:
+        raise RuntimeError("numpy is required for vectorized comparison")
+
+    by_name = {i.name: i for i in REGISTRY}
+    engine = QuizEngine()
+    mismatches = []
+    with open(path, "rb") as fh:
+        mm, count = _open_records(fh)
+        try:
+            for start in range(0, count, CHUNK):
+                stop = min(count, start + CHUNK)
+                if vectorized:
+                    rec = np.frombuffer(mm, dtype=RECORD_DTYPE, count=stop - start,
+                                        offset=HEADER.size + start * RECORD.size)
+                    bad = np.nonzero(_encode_chunk_numpy(rec) != rec["word"])[0]
+                    mismatches.extend(int(i) + start for i in bad)
+                    del rec # release the buffer export before mm.close()
+                else:
+                    view = memoryview(mm)[HEADER.size + start * RECORD.size:HEADER.size + stop * RECORD.size]
+                    for i, (name, rd, rs1, rs2, imm, word) in enumerate(RECORD.iter_unpack(view)):
+                        ins = by_name.get(name.rstrip(b"\0").decode())
+                        q = {"instruction": ins, "rd": rd, "rs1": rs1, "rs2": rs2, "imm": imm}
+                        if ins is None or encode_word(q) != word:
+                            mismatches.append(start + i)
+                    view.release()
+
+                # Strided scalar pass keeps get_ground_truth and the Swizzler honest too
+                for index in range(start, stop, SAMPLE_STRIDE):
+                    name, rd, rs1, rs2, imm, word = RECORD.unpack_from(mm, HEADER.size + index * RECORD.size)
+                    ins = by_name.get(name.rstrip(b"\0").decode())
+                    if ins is not None and not _scalar_check(engine, {"instruction": ins, "rd": rd, "rs1": rs1,
+                                                                      "rs2": rs2, "imm": imm}, word):
+                        mismatches.append(index)
+        finally:
+            mm.close()
+
+    mismatches = sorted(set(mismatches))
+    print(f"Checked {count} records ({'numpy' if vectorized else 'stdlib'}): {len(mismatches)} mismatches", file=out)
+    with open(path, "rb") as fh:
+        for index in mismatches[:MAX_REPORTED]:
+            fh.seek(HEADER.size + index * RECORD.size)
+            name, rd, rs1, rs2, imm, word = RECORD.unpack(fh.read(RECORD.size))
+            name = name.rstrip(b"\0").decode()
+            print(f"  #{index}: {name} rd={rd} rs1={rs1} rs2={rs2} imm={imm} "
+                  f"expected {word:08x}", file=out)
+    return mismatches
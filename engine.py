@@ -3,57 +3,181 @@ RISC-V Tutor Quiz Engine
 Manages instruction pools, randomization, and ground truth generation.
 """
 import random
-from typing import List, Dict, Optional, Tuple
+import re
+import threading
+from typing import List, Dict, Optional, Sequence, Tuple
+import riscv
 from riscv import REGISTRY, LAYOUTS, Instruction, Swizzler
-from utils import to_bin, to_hex
+from utils import to_bin, to_hex, sign_extend
+
+def _compile_plan(type_char: str) -> Tuple[Tuple[str, int, int, str, int], ...]:
+    """Compiles LAYOUTS[type_char] into (name, width, shift, source, source_lo) per field, MSB first."""
+    plan = []
+    pos = 32
+    for name, length in LAYOUTS[type_char]:
+        pos -= length
+        if name.startswith("imm"):
+            source = "imm"
+            bits = re.search(r"\[(\d+)(?::(\d+))?\]", name)
+            # U-type immediate provided is the field value itself (20 bits):
+            # it corresponds to bits 31:12 of the final value, but q['imm'] IS that value.
+            if type_char == 'U' or not bits:
+                lo = 0
+            else:
+                lo = int(bits.group(2) if bits.group(2) is not None else bits.group(1))
+        elif name in ("opcode", "funct3", "funct7", "rs1", "rs2", "rd"):
+            source, lo = name, 0
+        else:
+            # Should not happen, but safety fallback: encode as zero
+            source, lo = "zero", 0
+        plan.append((name, length, pos, source, lo))
+    return tuple(plan)
+
+# Field plans shared by the scalar and batch encoders and the decoder
+FIELD_PLANS = {t: _compile_plan(t) for t in LAYOUTS}
+
+def field_sources(q: Dict) -> Dict[str, int]:
+    """Maps each plan source name to its integer value for a question."""
+    ins = q["instruction"]
+    return {
+        "opcode": ins.op,
+        "funct3": ins.f3 if ins.f3 is not None else 0,
+        "funct7": ins.f7 if ins.f7 is not None else 0,
+        "rs1": q["rs1"], "rs2": q["rs2"], "rd": q["rd"],
+        "imm": q["imm"], "zero": 0,
+    }
+
+def encode_word(q: Dict) -> int:
+    """Encodes a question straight to its 32-bit word without building strings."""
+    sources = field_sources(q)
+    word = 0
+    for _, length, shift, source, lo in FIELD_PLANS[q["instruction"].type]:
+        word |= ((sources[source] >> lo) & ((1 << length) - 1)) << shift
+    return word
+
+def ground_truth(q: Dict) -> Dict:
+    """Binary, hex and per-field bits of a question's encoding."""
+    sources = field_sources(q)
+    
+    full_bin_str = ""
+    result_fields = []
+    for name, length, _, source, lo in FIELD_PLANS[q["instruction"].type]:
+        val_bin = to_bin(sources[source] >> lo, length)
+        full_bin_str += val_bin
+        result_fields.append((name, val_bin))
+        
+    return {
+        "binary": full_bin_str,
+        "hex": to_hex(int(full_bin_str, 2)),
+        "fields": result_fields
+    }
+
+STAT_KEYS = ("success", "attempts", "points", "total_points")
+
+class Stats:
+    """Grading totals sharded per thread: a thread only ever adds to its own shard, so
+    recording takes no lock, and reads merge every shard. A read racing a record may
+    see it partly applied."""
+    __slots__ = ("_shards",)
+
+    def __init__(self, totals: Optional[Dict] = None):
+        self.reset(totals or {})
+
+    def reset(self, totals: Dict) -> None:
+        """Replaces all shards with `totals`; not to be raced with record()."""
+        self._shards: Dict[int, List] = {threading.get_ident(): [totals.get(k, 0) for k in STAT_KEYS]}
+
+    def record(self, points: float, total: float) -> None:
+        shard = self._shards.get(threading.get_ident())
+        if shard is None: # this thread's first grade: one atomic insert
+            shard = self._shards.setdefault(threading.get_ident(), [0, 0, 0, 0])
+        if points == total:
+            shard[0] += 1
+        shard[1] += 1
+        shard[2] += points
+        shard[3] += total
+
+    def totals(self) -> Dict:
+        merged = [0, 0, 0, 0]
+        for shard in list(self._shards.values()):
+            for i, value in enumerate(shard):
+                merged[i] += value
+        return dict(zip(STAT_KEYS, merged))
 
 class QuizEngine:
     def __init__(self):
-        self.pool: List[Instruction] = []
-        self.stats = {"success": 0, "attempts": 0, "points": 0, "total_points": 0}
+        self._pool: Sequence[Instruction] = () # shared with every engine on the same registry and filter
+        self.pool_key: Optional[Tuple[str, ...]] = None # the filter's types; None when pool is set directly
+        self._stats = Stats()
         self.current_q: Optional[Dict] = None
 
+    @property
+    def pool(self) -> Sequence[Instruction]:
+        """The pool as of the last filter_pool(); questions are drawn from the filter's types in the current registry."""
+        return self._pool
+
+    @pool.setter
+    def pool(self, pool: Sequence[Instruction]) -> None:
+        """Sets the pool by hand; it then stays as given across reloads."""
+        self._pool, self.pool_key = pool, None
+
+    @property
+    def stats(self) -> Dict:
+        """Merged totals: success, attempts, points and total_points. A copy, so changing it records nothing."""
+        return self._stats.totals()
+
+    @stats.setter
+    def stats(self, totals: Dict) -> None:
+        self._stats.reset(totals)
+
     def record_stats(self, points: int, total: int):
-        """Updates stats with points achieved and total possible."""
-        self.stats["points"] += points
-        self.stats["total_points"] += total
-        self.stats["attempts"] += 1
-        if points == total:
-            self.stats["success"] += 1
+        """Updates stats with points achieved and total possible; safe from any number of threads."""
+        self._stats.record(points, total)
 
-    def filter_pool(self, types: List[str]) -> None:
-        """Filters instructions into the active pool based on types (e.g., ['R', 'I'])."""
+    def filter_pool(self, types: List[str], registry: Optional[riscv.Registry] = None) -> None:
+        """Filters instructions into the active pool based on types (e.g., ['R', 'I']).
+        The pool follows reloads of the current registry, unless pinned to `registry`."""
         if not isinstance(types, list):
             raise TypeError("types must be a list of strings")
         
-        valid_types = [t.upper() for t in types if isinstance(t, str)]
-        self.pool = [i for i in REGISTRY if i.type in valid_types]
-        
-        if not self.pool:
+        key = tuple(sorted(set(t.upper() for t in types if isinstance(t, str)) & LAYOUTS.keys()))
+        self._pool = (registry or riscv.current()).pools[key]
+        self.pool_key = key if registry is None else None
+
+        if not self._pool:
             raise ValueError("No instructions found for the given types")
 
     def generate_question(self) -> Dict:
         """Picks a random instruction and generates values for fields."""
-        if not self.pool:
+        q = self.make_question()
+        self.current_q = q
+        return q
+
+    def make_question(self, rng=random) -> Dict:
+        """Like generate_question, but draws from `rng` and changes nothing on the engine, so it is safe
+        off the main thread."""
+        pool = self._pool
+        if self.pool_key is not None: # a reload applies from the next question; open ones keep theirs
+            pool = riscv.current().pools[self.pool_key] or pool # unless it left nothing of the filter
+        if not pool:
             raise RuntimeError("Pool is empty. Call filter_pool first.")
             
-        ins = random.choice(self.pool)
+        ins = rng.choice(pool)
         q = {
             "instruction": ins,
-            "rs1": random.randint(0, 31),
-            "rs2": random.randint(0, 31),
-            "rd": random.randint(1, 31), # Enforce semantic validity: rd != x0
+            "rs1": rng.randint(0, 31),
+            "rs2": rng.randint(0, 31),
+            "rd": rng.randint(1, 31), # Enforce semantic validity: rd != x0
             "imm": 0
         }
         
         # Immediate range handling
-        if ins.type == 'I': q["imm"] = random.randint(-99, 99)
-        elif ins.type == 'S': q["imm"] = random.randint(-99, 99)
-        elif ins.type == 'B': q["imm"] = random.choice(range(-98, 98, 2))
-        elif ins.type == 'U': q["imm"] = random.randint(0, 99)
-        elif ins.type == 'J': q["imm"] = random.choice(range(-98, 98, 2))
+        if ins.type == 'I': q["imm"] = rng.randint(-99, 99)
+        elif ins.type == 'S': q["imm"] = rng.randint(-99, 99)
+        elif ins.type == 'B': q["imm"] = rng.choice(range(-98, 98, 2))
+        elif ins.type == 'U': q["imm"] = rng.randint(0, 99)
+        elif ins.type == 'J': q["imm"] = rng.choice(range(-98, 98, 2))
         
-        self.current_q = q
         q["asm"] = self.format_asm(q)
         return q
 
@@ -84,65 +208,7 @@ class QuizEngine:
         if not self.current_q:
             raise RuntimeError("No current question")
             
-        q = self.current_q
-        ins = q["instruction"]
-        fields = {}
-        
-        # Standard opcode/funct fields
-        fields["opcode"] = to_bin(ins.op, 7)
-        if ins.f3 is not None: fields["funct3"] = to_bin(ins.f3, 3)
-        if ins.f7 is not None: fields["funct7"] = to_bin(ins.f7, 7)
-        
-        layout_names = [f[0] for f in LAYOUTS[ins.type]]
-        
-        # Dynamic register fields
-        if "rs1" in layout_names: fields["rs1"] = to_bin(q["rs1"], 5)
-        if "rs2" in layout_names: fields["rs2"] = to_bin(q["rs2"], 5)
-        if "rd" in layout_names: fields["rd"] = to_bin(q["rd"], 5)
-        
-        full_bin_str = ""
-        result_fields = []
-        import re
-        
-        for name, length in LAYOUTS[ins.type]:
-            val_bin = ""
-            
-            if name in fields:
-                val_bin = fields[name]
-            elif name.startswith("imm"):
-                full_imm = q['imm']
-                
-                range_match = re.search(r"\[(\d+):(\d+)\]", name)
-                bit_match = re.search(r"\[(\d+)\]", name)
-                
-                if ins.type == 'U':
-                    # U-type immediate provided is the field value itself (20 bits)
-                    # It corresponds to bits 31:12 of the final value, but q['imm'] IS that value.
-                    val = full_imm & ((1<<length)-1)
-                elif range_match:
-                    hi = int(range_match.group(1))
-                    lo = int(range_match.group(2))
-                    val = (full_imm >> lo) & ((1 << (hi - lo + 1)) - 1)
-                elif bit_match:
-                    bit = int(bit_match.group(1))
-                    val = (full_imm >> bit) & 1
-                else:
-                    # Fallback for unsplit immediates (e.g. if any)
-                    val = full_imm & ((1<<length)-1)
-                    
-                val_bin = to_bin(val, length)
-            else:
-                 # Should not happen, but safety fallback
-                 val_bin = to_bin(0, length)
-            
-            full_bin_str += val_bin
-            result_fields.append((name, val_bin))
-            
-        return {
-            "binary": full_bin_str,
-            "hex": to_hex(int(full_bin_str, 2)),
-            "fields": result_fields
-        }
+        return ground_truth(self.current_q)
 
     def validate_layout(self, user_input: List[str]) -> Tuple[bool, List[bool], List[str]]:
         """Verifies field names; returns (all_ok, mask_list, correct_list)."""
@@ -178,3 +244,35 @@ class QuizEngine:
             
         all_correct = len(user_input) == len(correct) and all(mask)
         return all_correct, mask, correct
+
+def decode_word(word: int) -> Optional[Dict]:
+    """Decodes a 32-bit word back into a question dict; None if no instruction matches."""
+    if not isinstance(word, int):
+        raise TypeError(f"word must be int, got {type(word)}")
+    word &= 0xFFFFFFFF
+
+    op = word & 0x7F
+    f3 = (word >> 12) & 0x7
+    f7 = (word >> 25) & 0x7F
+    ins = next((i for i in REGISTRY
+                if i.op == op
+                and (i.f3 is None or i.f3 == f3)
+                and (i.f7 is None or i.f7 == f7)), None)
+    if ins is None:
+        return None
+
+    q = {"instruction": ins, "rs1": 0, "rs2": 0, "rd": 0, "imm": 0}
+    imm = 0
+    for _, length, shift, source, lo in FIELD_PLANS[ins.type]:
+        val = (word >> shift) & ((1 << length) - 1)
+        if source == "imm":
+            imm |= val << lo
+        elif source in q:
+            q[source] = val
+
+    # Sign-extend from the architectural immediate width
+    if ins.type in ('I', 'S'): imm = sign_extend(imm, 12)
+    elif ins.type == 'B': imm = sign_extend(imm, 13)
+    elif ins.type == 'J': imm = sign_extend(imm, 21)
+    q["imm"] = imm
+    return q
@@ -0,0 +1,106 @@
+"""
+RISC-V Tutor Headless Session Runner
+Drives scripted sessions through the question pipelines without a terminal and
+reports structured per-step results.
+
+Each input line is one session:
+    {"mode": "encoding", "types": "R I", "questions": [["R", "funct7 rs2 ...", ...], ...]}
+"mode" is recall, bits, encoding or decoding (or 1-4); "types" defaults to all;
+"answers" may be given instead of "questions" for a single question.
+"""
+import json
+import random
+from typing import Dict, Iterable, List, Tuple, Union
+from engine import QuizEngine, ground_truth
+from render import Worksheet
+from pipeline import GRADE, ALL_TYPES, MODE_NAMES, parse_types, make_pipeline, reference_rows
+
+MODE_IDS = {name.lower(): mode for mode, name in MODE_NAMES.items()}
+
+def _parse_spec(spec: Dict) -> Tuple[str, List[str], List[List[str]]]:
+    if not isinstance(spec, dict):
+        raise TypeError("session must be a JSON object")
+    mode = str(spec.get("mode", "")).lower()
+    mode = MODE_IDS.get(mode, mode)
+    if mode not in MODE_NAMES:
+        raise ValueError(f"unknown mode {spec.get('mode')!r}")
+
+    types = spec.get("types") or ALL_TYPES
+    if isinstance(types, str):
+        types = parse_types(types)
+
+    questions = spec.get("questions")
+    if questions is None:
+        questions = [spec.get("answers", [])]
+    if not isinstance(questions, list) or not all(isinstance(a, list) for a in questions):
+        raise TypeError("questions must be a list of answer lists")
+    if not all(isinstance(x, str) for a in questions for x in a):
+        raise TypeError("answers must be strings")
+    return mode, types, questions
+
+def run_question(pipeline, answers: List[str]) -> Dict:
+    """Feeds one question's answers; returns its per-step results."""
+    steps: List[Dict] = []
+    pipeline.start()
+    for answer in answers:
+        if pipeline.done:
+            break
+        step = {"step": pipeline.step_name, "answer": answer, "points": 0, "total": 0}
+        for event in pipeline.feed(answer):
+            if event[0] == GRADE:
+                step["points"] = round(step["points"] + event[2], 4)
+                step["total"] = round(step["total"] + event[3], 4)
+        if pipeline.result is not False: # the quitting answer is not a step
+            steps.append(step)
+
+    q = pipeline.q
+    return {
+        "instruction": q["instruction"].name,
+        "asm": q["asm"],
+        "hex": pipeline.truth["hex"],
+        "result": "done" if pipeline.result else ("quit" if pipeline.done else "incomplete"),
+        "points": pipeline.points,
+        "total": pipeline.total,
+        "steps": steps,
+    }
+
+def run_session(spec: Dict, seed: Union[int, str, None] = None) -> Dict:
+    """Runs one scripted session on a fresh engine; returns its results. Questions draw from
+    their own stream seeded with `seed`, leaving the global random state alone."""
+    mode, types, questions = _parse_spec(spec)
+    rng = random.Random(seed)
+    engine = QuizEngine()
+    engine.filter_pool(types)
+    active_types = sorted(set(i.type for i in engine.pool))
+
+    results = []
+    for answers in questions:
+        q = engine.make_question(rng)
+        engine.current_q = q
+        truth = ground_truth(q)
+        sheet = None
+        if mode == "4": # no worksheet renderer, so no frames are built; the reference rows use the stream
+            ins = q["instruction"]
+            sheet = Worksheet(ins, truth, reference_rows(engine, ins, rng), q["asm"], len(truth["fields"]))
+        result = run_question(make_pipeline(mode, engine, q, active_types, None, truth, sheet), answers)
+        results.append(result)
+        if result["result"] != "done":
+            break # A quit (or running out of answers) ends the session, as in the tutor
+    return {"mode": MODE_NAMES[mode].lower(), "questions": results,
+            "points": round(engine.stats["points"], 4), "total": round(engine.stats["total_points"], 4)}
+
+def run_script(lines: Iterable[str], seed: int = 0) -> List[Dict]:
+    """Runs every session in a JSON-lines script; session i is seeded from (seed, i)."""
+    out = []
+    for index, line in enumerate(l for l in lines if l.strip()):
+        try:
+            result = run_session(json.loads(line), f"{seed}:{index}")
+        except (ValueError, TypeError) as e:
+            result = {"error": str(e)}
+        result["session"] = index
+        out.append(result)
+    return out
+
+def format_results(results: List[Dict]) -> str:
+    """One JSON line per session."""
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
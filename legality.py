@@ -0,0 +1,173 @@
+"""
+RISC-V Tutor Instruction Legality Map
+A bit-per-word bitmap of all 2^32 words classified against REGISTRY, built in
+parallel shards and memory-mapped so validity checks are a single bit probe.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from riscv import REGISTRY, Instruction
+
+DEFAULT_PREFIX = "legality"
+BITMAP_BYTES = 1 << 29          # 2^32 words, one bit each (512 MiB)
+SHARDS = 128                    # one shard per funct7 value (bits 31:25)
+SHARD_BYTES = BITMAP_BYTES // SHARDS
+TILE_WORDS = 1 << 15            # bits 14:0 (opcode, rd, funct3) decide a tile
+TILE_REPEATS = 1 << 10          # bits 24:15 (rs1, rs2) never affect legality
+BLOCK_WORDS = 1 << 12           # rank directory granularity
+RANK = struct.Struct("<I")
+MAX_INSTRUCTIONS = 255          # ids are stored in one byte, 0 meaning illegal
+
+def registry_fingerprint() -> str:
+    """Identifies the registry a map was built from, so stale maps are rejected."""
+    desc = repr([(i.name, i.type, i.op, i.f3, i.f7) for i in REGISTRY])
+    return hashlib.sha1(desc.encode()).hexdigest()
+
+def key_table() -> bytearray:
+    """Maps (funct7, funct3, opcode) keys to REGISTRY index + 1, or 0 when illegal.
+
+    Follows the same first-match rule as engine.decode_word.
+    """
+    if len(REGISTRY) > MAX_INSTRUCTIONS:
+        raise ValueError(f"REGISTRY has {len(REGISTRY)} instructions; one-byte ids allow {MAX_INSTRUCTIONS}")
+    table = bytearray(1 << 17)
+    for idx in reversed(range(len(REGISTRY))):
+        ins = REGISTRY[idx]
+        for f7 in (range(128) if ins.f7 is None else (ins.f7,)):
+            for f3 in (range(8) if ins.f3 is None else (ins.f3,)):
+                table[(f7 << 10) | (f3 << 7) | ins.op] = idx + 1
+    return table
+
+def _tile(keys: bytearray, f7: int) -> List[int]:
+    """Instruction ids (index + 1, or 0) of the first TILE_WORDS words of a funct7 shard."""
+    base = f7 << 10
+    return [keys[base | ((w >> 5) & 0x380) | (w & 0x7F)] for w in range(TILE_WORDS)]
+
+def _shard_counts(keys: bytearray) -> List[int]:
+    """Legal words per shard: each legal (funct3, opcode) pair covers 32 rd x 1024 tiles."""
+    return [sum(1 for k in range(f7 << 10, (f7 + 1) << 10) if keys[k]) * 32 * TILE_REPEATS
+            for f7 in range(SHARDS)]
+
+def build_shard(prefix: str, f7: int, base: int, with_ids: bool) -> int:
+    """Writes one funct7 shard of the bitmap (and rank/id tables) in place; returns legal words."""
+    ids = _tile(key_table(), f7)
+
+    bits = bytearray(TILE_WORDS // 8)
+    for w, ins_id in enumerate(ids):
+        if ins_id:
+            bits[w >> 3] |= 1 << (w & 7)
+    with open(prefix + ".bitmap", "r+b") as fh:
+        fh.seek(f7 * SHARD_BYTES)
+        fh.write(bytes(bits) * TILE_REPEATS)
+
+    legal = bytes(i - 1 for i in ids if i)
+    if with_ids:
+        # Rank of the first word of every 4096-word block in the shard
+        per_f3 = [sum(1 for i in ids[f3 * BLOCK_WORDS:(f3 + 1) * BLOCK_WORDS] if i) for f3 in range(8)]
+        rank = bytearray()
+        for r in range(TILE_REPEATS):
+            run = base + r * len(legal)
+            for count in per_f3:
+                rank += RANK.pack(run)
+                run += count
+        with open(prefix + ".rank", "r+b") as fh:
+            fh.seek(f7 * (SHARD_BYTES // 512) * RANK.size)
+            fh.write(rank)
+        with open(prefix + ".ids", "r+b") as fh:
+            fh.seek(base)
+            fh.write(legal * TILE_REPEATS)
+    return len(legal) * TILE_REPEATS
+
+def _presize(path: str, size: int) -> None:
+    with open(path, "wb") as fh:
+        fh.truncate(size)
+
+def build_map(prefix: str = DEFAULT_PREFIX, with_ids: bool = False, workers: Optional[int] = None,
+              shards: Optional[List[int]] = None) -> int:
+    """Builds the legality map across a process pool; returns the number of legal words.
+
+    `shards` restricts the build to some funct7 values (files keep their full size).
+    """
+    counts = _shard_counts(key_table())
+    bases = [sum(counts[:f7]) for f7 in range(SHARDS)]
+    total = sum(counts)
+
+    _presize(prefix + ".bitmap", BITMAP_BYTES)
+    if with_ids:
+        _presize(prefix + ".rank", (BITMAP_BYTES // 512) * RANK.size)
+        _presize(prefix + ".ids", total)
+
+    todo = list(range(SHARDS)) if shards is None else list(shards)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(build_shard, prefix, f7, bases[f7], with_ids) for f7 in todo]
+        for f7, fut in zip(todo, futures):
+            if fut.result() != counts[f7]:
+                raise RuntimeError(f"Shard {f7} wrote {fut.result()} legal words, expected {counts[f7]}")
+
+    with open(prefix + ".json", "w") as fh:
+        json.dump({"registry": registry_fingerprint(), "legal": total, "ids": with_ids,
+                   "shards": sorted(todo)}, fh)
+    return total
+
+class LegalityMap:
+    """Memory-mapped legality bitmap with an optional rank-indexed instruction-id table.
+
+    A map built from some shards only raises RuntimeError on probes into the others.
+    """
+    def __init__(self, prefix: str = DEFAULT_PREFIX):
+        with open(prefix + ".json") as fh:
+            meta = json.load(fh)
+        if meta["registry"] != registry_fingerprint():
+            raise ValueError(f"{prefix} was built for a different REGISTRY; rebuild it")
+        self.meta = meta
+        self.missing = frozenset(range(SHARDS)).difference(meta["shards"]) # funct7 shards never built
+        self._files = []
+        self.bitmap = self._map(prefix + ".bitmap")
+        if len(self.bitmap) != BITMAP_BYTES:
+            raise ValueError(f"{prefix}.bitmap is not {BITMAP_BYTES} bytes")
+        self.rank = self._map(prefix + ".rank") if meta["ids"] else None
+        self.ids = self._map(prefix + ".ids") if meta["ids"] else None
+
+    def _map(self, path: str) -> mmap.mmap:
+        fh = open(path, "rb")
+        self._files.append(fh)
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        for m in (self.bitmap, self.rank, self.ids):
+            if m is not None:
+                m.close()
+        for fh in self._files:
+            fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_legal(self, word: int) -> bool:
+        """One bit probe: is this word an instruction in REGISTRY?"""
+        word &= 0xFFFFFFFF
+        if self.missing and word >> 25 in self.missing:
+            raise RuntimeError(f"Map was built without the funct7={word >> 25:#x} shard; rebuild it in full")
+        return bool((self.bitmap[word >> 3] >> (word & 7)) & 1)
+
+    def instruction(self, word: int) -> Optional[Instruction]:
+        """Looks up the instruction for a legal word via the rank directory, or None."""
+        if self.ids is None:
+            raise RuntimeError("Map was built without the instruction-id table (use --ids)")
+        word &= 0xFFFFFFFF
+        if not self.is_legal(word):
+            return None
+        block = word >> 12
+        rank = RANK.unpack_from(self.rank, block * RANK.size)[0]
+        start, byte = block * (BLOCK_WORDS // 8), word >> 3
+        if byte > start:
+            rank += bin(int.from_bytes(self.bitmap[start:byte], "little")).count("1")
+        rank += bin(self.bitmap[byte] & ((1 << (word & 7)) - 1)).count("1")
+        return REGISTRY[self.ids[rank]]
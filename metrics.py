@@ -0,0 +1,204 @@
+"""
+RISC-V Tutor Metrics
+Counters, fixed-bucket histograms and gauges rendered in the Prometheus text
+format. Every thread records into its own shard, so recording takes no lock;
+shards are merged when the metrics are read.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Shards:
+    """Per-thread dicts of values; a thread only ever writes its own, readers merge them all."""
+    def __init__(self):
+        self._local = threading.local()
+        self._all: List[Dict] = []
+        self._lock = threading.Lock() # taken once per thread, on its first record
+
+    def mine(self) -> Dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._all.append(shard)
+            return shard
+
+    def shards(self) -> List[Dict]:
+        with self._lock:
+            return list(self._all)
+
+class Counter:
+    """A monotonically increasing count per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._shards = Shards()
+
+    def inc(self, labels: Tuple = (), n: float = 1) -> None:
+        shard = self._shards.mine()
+        shard[labels] = shard.get(labels, 0) + n
+
+    def values(self) -> Dict[Tuple, float]:
+        out: Dict[Tuple, float] = {}
+        for shard in self._shards.shards():
+            for labels, n in list(shard.items()):
+                out[labels] = out.get(labels, 0) + n
+        return out
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        return [("", labels, n) for labels, n in sorted(self.values().items())]
+
+class Histogram:
+    """Observations counted into fixed buckets per label set, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._shards = Shards()
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        shard = self._shards.mine()
+        row = shard.get(labels)
+        if row is None: # one count per bucket, then +Inf, sum and count
+            row = shard[labels] = [0] * (len(self.buckets) + 3)
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def values(self) -> Dict[Tuple, List[float]]:
+        out: Dict[Tuple, List[float]] = {}
+        for shard in self._shards.shards():
+            for labels, row in list(shard.items()):
+                total = out.setdefault(labels, [0] * len(row))
+                for i, v in enumerate(list(row)):
+                    total[i] += v
+        return out
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        out = []
+        for labels, row in sorted(self.values().items()):
+            cumulative = 0
+            for i, bound in enumerate(self.buckets + (float("inf"),)):
+                cumulative += row[i]
+                out.append(("_bucket", labels + (("+Inf" if bound == float("inf") else repr(bound)),), cumulative))
+            out.append(("_sum", labels, row[-2]))
+            out.append(("_count", labels, row[-1]))
+        return out
+
+class Gauge:
+    """A value read from a callback at scrape time; None omits it."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Optional[Callable[[], Optional[float]]] = None):
+        self.name, self.help, self.labels = name, help, ()
+        self.read = read
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        value = self.read() if self.read is not None else None
+        return [] if value is None else [("", (), value)]
+
+def _memory_bytes() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # peak, on platforms without /proc
+
+QUESTIONS = Counter("rvtutor_questions_total", "Questions generated.", ("mode", "type"))
+GRADES = Counter("rvtutor_grades_total", "Graded answers.", ("mode", "step"))
+GRADE_POINTS = Counter("rvtutor_grade_points_total", "Points awarded to graded answers.", ("mode", "step"))
+ASM_PARSE_FAILURES = Counter("rvtutor_asm_parse_failures_total",
+                             "Assembly answers rejected by validate_asm_strict as syntax errors.")
+CALL_SECONDS = Histogram("rvtutor_call_seconds", "Latency of engine, validator and render calls.", ("call",))
+SESSIONS = Gauge("rvtutor_sessions", "Connected sessions.")
+PARKED_SESSIONS = Gauge("rvtutor_parked_sessions", "Hung-up sessions waiting to be resumed.")
+EVICTED_SESSIONS = Gauge("rvtutor_evicted_sessions", "Idle sessions spilled to disk.")
+EVICTIONS = Counter("rvtutor_evictions_total", "Idle sessions checkpointed and spilled to disk.")
+RESTORE_SECONDS = Histogram("rvtutor_restore_seconds", "Time to restore an evicted session from its checkpoint.")
+MEMORY = Gauge("rvtutor_resident_memory_bytes", "Resident memory of this process.", _memory_bytes)
+FAMILIES = [QUESTIONS, GRADES, GRADE_POINTS, ASM_PARSE_FAILURES, CALL_SECONDS, SESSIONS, PARKED_SESSIONS,
+            EVICTED_SESSIONS, EVICTIONS, RESTORE_SECONDS, MEMORY]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for fam in FAMILIES:
+        lines.append(f"# HELP {fam.name} {fam.help}")
+        lines.append(f"# TYPE {fam.name} {fam.kind}")
+        names = fam.labels + (("le",) if fam.kind == "histogram" else ())
+        for suffix, labels, value in fam.samples():
+            label_names = names if suffix == "_bucket" else fam.labels
+            text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in zip(label_names, labels))
+            lines.append(f"{fam.name}{suffix}{{{text}}} {value:g}" if text else f"{fam.name}{suffix} {value:g}")
+    return "\n".join(lines) + "\n"
+
+def _timed(call: str, fn: Callable) -> Callable:
+    observe, key, clock = CALL_SECONDS.observe, (call,), time.perf_counter
+
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            observe(key, clock() - start)
+    return timed
+
+def _asm_checked(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def checked(*args, **kwargs):
+        ok, msg = result = fn(*args, **kwargs)
+        if not ok and msg.startswith("Syntax Error"):
+            ASM_PARSE_FAILURES.inc()
+        return result
+    return checked
+
+_installed: List[Tuple[object, str, object]] = []
+
+def instrument() -> None:
+    """Wraps the hot paths with latency histograms; until then they run unwrapped, at no cost."""
+    import engine
+    import pipeline
+    import render
+    if _installed:
+        return
+    targets = [
+        (engine.QuizEngine, "generate_question", "generate_question"),
+        (engine, "ground_truth", "ground_truth"),     # get_ground_truth and the pipelines both end here
+        (pipeline, "ground_truth", "ground_truth"),
+        (engine.QuizEngine, "validate_layout", "validate_layout"),
+        (engine.QuizEngine, "validate_bits", "validate_bits"),
+        (pipeline, "validate_asm_strict", "validate_asm_strict"),
+        (render.WorksheetRenderer, "frame", "render_frame"),
+    ]
+    for owner, attr, call in targets:
+        original = owner.__dict__[attr]
+        wrapped = _timed(call, original)
+        if attr == "validate_asm_strict":
+            wrapped = _asm_checked(wrapped)
+        _installed.append((owner, attr, original))
+        setattr(owner, attr, wrapped)
+
+def uninstrument() -> None:
+    """Restores the unwrapped functions."""
+    while _installed:
+        owner, attr, original = _installed.pop()
+        setattr(owner, attr, original)
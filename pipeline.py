@@ -0,0 +1,618 @@
+"""
+RISC-V Tutor Question Pipelines
+Resumable state machines for every quiz mode: answers go in through feed(),
+render and feedback events come out. Drivers decide how to show them.
+"""
+import random
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from engine import QuizEngine, ground_truth
+from riscv import LAYOUTS, Instruction
+from render import WorksheetRenderer, Worksheet
+
+# Event kinds; every event is a tuple starting with its kind
+CLEAR = "clear"     # (CLEAR,)                       clear the screen
+TEXT = "text"       # (TEXT, line)                   print a line
+FRAME = "frame"     # (FRAME, lines)                 draw a full worksheet frame
+PROMPT = "prompt"   # (PROMPT, text)                 ask for the next answer; always last
+GRADE = "grade"     # (GRADE, step, points, total)   a graded answer, already in engine.stats
+
+Event = Tuple
+
+ALL_TYPES = ["R", "I", "S", "B", "U", "J"]
+MODE_NAMES = {"1": "Recall", "2": "Bits", "3": "Encoding", "4": "Decoding"}
+TYPES_BANNER = "\nEnter instruction types (R I S B U J) [Space or Comma separated, Enter for ALL]"
+TYPES_PROMPT = "\nTypes (or 'q' to quit):\n> "
+MODE_PROMPT = "\nChoice:\n> "
+CONTINUE_PROMPT = "Continue? [Y/n]: "
+
+def validate_asm_strict(user_input: str, target_ins: Instruction, target_vals: Dict) -> Tuple[bool, str]:
+    """
+    Validates assembly input using strict regex patterns.
+    Returns (is_correct, feedback_message).
+    """
+    # Normalize input: trim and display single spaces (keep commas/parens)
+    u = " ".join(user_input.split())
+    
+    # Define regex patterns
+    patterns = {
+        'R': r"^(\w+)\s+(x\d+),\s+(x\d+),\s+(x\d+)$",
+        'I': r"^(\w+)\s+(x\d+),\s+(x\d+),\s+(-?\d+)$",
+        'S': r"^(\w+)\s+(x\d+),\s+(-?\d+)\((x\d+)\)$",
+        'B': r"^(\w+)\s+(x\d+),\s+(x\d+),\s+(-?\d+)$",
+        'U': r"^(\w+)\s+(x\d+),\s+(-?\d+)$",
+        'J': r"^(\w+)\s+(x\d+),\s+(-?\d+)$"
+    }
+    
+    # I-Type Load variant (e.g., lw x1, 4(x2))
+    if target_ins.type == 'I' and target_ins.name in ['lw', 'lb', 'lh', 'lbu', 'lhu']:
+        pattern = r"^(\w+)\s+(x\d+),\s+(-?\d+)\((x\d+)\)$"
+    else:
+        pattern = patterns.get(target_ins.type)
+        
+    if not pattern:
+        return False, "Internal Error: No pattern for type"
+
+    match = re.match(pattern, u, re.IGNORECASE)
+    if not match:
+        # Construct expected format example
+        ex = "???"
+        if target_ins.type == 'R': ex = "add x1, x2, x3"
+        elif target_ins.type == 'S': ex = "sw x1, 4(x2)"
+        elif target_ins.type == 'B': ex = "beq x1, x2, -4"
+        elif target_ins.type == 'U': ex = "lui x1, 10"
+        elif target_ins.type == 'J': ex = "jal x1, 4"
+        elif target_ins.type == 'I' and target_ins.name == 'lw': ex = "lw x1, 4(x2)"
+        elif target_ins.type == 'I': ex = "addi x1, x2, 10"
+        return False, f"Syntax Error. Expected format like: {ex}"
+
+    groups = match.groups()
+    mnemonic = groups[0].lower()
+    
+    # 1. Mnemonic Check
+    if mnemonic != target_ins.name:
+        return False, f"Incorrect Mnemonic. Expected: {target_ins.name}"
+
+    # Extract parsed values
+    regs = {}
+    imm_val = None
+    
+    # Map regex groups to logical fields based on type
+    try:
+        if target_ins.type == 'R':
+            # regex: (mnemonic), (rd), (rs1), (rs2) -> indices 0, 1, 2, 3
+            regs['rd'] = int(groups[1][1:])
+            regs['rs1'] = int(groups[2][1:])
+            regs['rs2'] = int(groups[3][1:])
+            
+        elif target_ins.type == 'I':
+            if target_ins.name in ['lw', 'lb', 'lh', 'lbu', 'lhu']:
+                # lw rd, imm(rs1) -> groups: mnem, rd, imm, rs1
+                regs['rd'] = int(groups[1][1:])
+                imm_val = int(groups[2])
+                regs['rs1'] = int(groups[3][1:])
+            else:
+                # addi rd, rs1, imm -> groups: mnem, rd, rs1, imm
+                regs['rd'] = int(groups[1][1:])
+                regs['rs1'] = int(groups[2][1:])
+                imm_val = int(groups[3])
+                
+        elif target_ins.type == 'S':
+            # sw rs2, imm(rs1) -> groups: mnem, rs2, imm, rs1
+            regs['rs2'] = int(groups[1][1:])
+            imm_val = int(groups[2])
+            regs['rs1'] = int(groups[3][1:])
+            
+        elif target_ins.type == 'B':
+            # beq rs1, rs2, imm -> groups: mnem, rs1, rs2, imm
+            regs['rs1'] = int(groups[1][1:])
+            regs['rs2'] = int(groups[2][1:])
+            imm_val = int(groups[3])
+            
+        elif target_ins.type == 'U':
+            # lui rd, imm -> groups: mnem, rd, imm
+            regs['rd'] = int(groups[1][1:])
+            imm_val = int(groups[2])
+            
+        elif target_ins.type == 'J':
+            # jal rd, imm -> groups: mnem, rd, imm
+            regs['rd'] = int(groups[1][1:])
+            imm_val = int(groups[2])
+            
+    except ValueError:
+        return False, "Error parsing integer values."
+
+    # 2. Register Checks
+    for r_name, r_val in regs.items():
+        if r_val != target_vals[r_name]:
+            return False, f"Incorrect register for {r_name}. Got x{r_val}, expected x{target_vals[r_name]}."
+
+    # 3. Immediate Check
+    if imm_val is not None:
+        if imm_val != target_vals['imm']:
+             return False, f"Incorrect Immediate. Got {imm_val}, expected {target_vals['imm']}. (Check un-swizzling!)"
+
+    return True, "Correct."
+
+def check_quit(s):
+    return s.lower() in ['q', 'quit']
+
+@lru_cache(maxsize=None)
+def _ref_row(i: Instruction) -> Tuple:
+    """One reference table row; shared, so sessions holding their rows hold no copies."""
+    f3 = str(i.f3) if i.f3 is not None else "-"
+    f7 = str(i.f7) if i.f7 is not None else "-"
+    return (i.name, i.op, f3, f7, i.type)
+
+def reference_rows(engine, ins: Instruction, rng=random) -> List[Tuple]:
+    """Shuffled reference table rows: the target plus up to 5 distractors with other opcodes."""
+    distractors_by_op = {}
+    for d in engine.pool:
+        if d.op != ins.op:
+            if d.op not in distractors_by_op: distractors_by_op[d.op] = []
+            distractors_by_op[d.op].append(d)
+    
+    available_ops = list(distractors_by_op.keys())
+    num_distractors = min(5, len(available_ops))
+    selected_ops = rng.sample(available_ops, num_distractors)
+    selected_distractors = [rng.choice(distractors_by_op[op]) for op in selected_ops]
+    
+    table_rows = [_ref_row(ins)] + [_ref_row(d) for d in selected_distractors]
+    rng.shuffle(table_rows)
+    return table_rows
+
+DECODE_FIRST_STEP = "Step 1: Hex to Binary"
+
+def prepare_worksheet(engine, worksheet, q, truth, rng=random):
+    """Builds a question's decoding worksheet and formats its first frame (prefetch hook)."""
+    ins = q["instruction"]
+    sheet = worksheet.prepare(ins, truth, reference_rows(engine, ins, rng), q.get("asm"), len(LAYOUTS[ins.type]))
+    worksheet.frame(sheet, DECODE_FIRST_STEP, show_nibbles=True)
+    return sheet
+
+def _layout_feedback(ans: List[str], mask: List[bool], correct: List[str]) -> str:
+    parts = []
+    for i, name in enumerate(ans):
+        if i < len(correct):
+            msg = "✓" if mask[i] else f"✗ (Expected: {correct[i]})"
+            parts.append(f"{name}: {msg}")
+        else:
+            parts.append(f"{name}: ✗ (Extra)")
+    if len(ans) < len(correct):
+        parts.extend([f"Missing (Expected: {correct[i]})" for i in range(len(ans), len(correct))])
+    return " | ".join(parts)
+
+def _field_feedback(ans: List[str], mask: List[bool], correct: List, field_names: List[str]) -> str:
+    parts = []
+    for i in range(len(ans)):
+        if i < len(correct):
+            msg = "✓" if mask[i] else f"✗ (Expected: {correct[i]})"
+            parts.append(f"{field_names[i]}: {msg}")
+        else:
+            parts.append(f"✗ (Extra)")
+    if len(ans) < len(correct):
+        parts.extend([f"{field_names[i]}: ✗ (Expected: {correct[i]})" for i in range(len(ans), len(correct))])
+    return " | ".join(parts)
+
+class Pipeline:
+    """One question as a state machine: start() and feed(answer) return the events to show."""
+    STEPS: Tuple[str, ...] = ()
+    QUIT_ON_EMPTY = False # An empty answer quits to the menu
+
+    def __init__(self, engine: QuizEngine, q: Dict, truth: Optional[Dict] = None):
+        self.engine = engine
+        self.q = q
+        self.ins: Instruction = q["instruction"]
+        self._truth = truth # None: rebuilt from q on use, so a waiting pipeline holds no binary strings
+        self.step = 0
+        self.prompt: Optional[str] = None
+        self.done = False
+        self.result: Optional[bool] = None # True: finished, False: quit to the menu
+        # Score for this question only
+        self.points = 0.0
+        self.total = 0.0
+        self._out: List[Event] = []
+
+    @property
+    def truth(self) -> Dict:
+        return self._truth if self._truth is not None else ground_truth(self.q)
+
+    @property
+    def step_name(self) -> Optional[str]:
+        return self.STEPS[self.step] if self.step < len(self.STEPS) else None
+
+    def start(self) -> List[Event]:
+        """Events up to and including the first prompt."""
+        if self.step != 0 or self.prompt is not None:
+            raise RuntimeError("Pipeline already started")
+        self._ask()
+        return self._take()
+
+    def resume(self, step: int) -> List[Event]:
+        """Like start(), but at a later step; earlier steps' progress is not replayed."""
+        if self.step != 0 or self.prompt is not None:
+            raise RuntimeError("Pipeline already started")
+        if not 0 <= step < len(self.STEPS):
+            raise ValueError(f"step must be in 0..{len(self.STEPS) - 1}, got {step}")
+        self.step = step
+        self._ask()
+        return self._take()
+
+    def feed(self, answer: str) -> List[Event]:
+        """Grades one answer; returns its feedback and everything up to the next prompt."""
+        if not isinstance(answer, str):
+            raise TypeError("answer must be a string")
+        if self.done or self.prompt is None:
+            raise RuntimeError("Pipeline is not waiting for an answer")
+        raw = answer.strip()
+        self.prompt = None
+        if check_quit(raw) or (self.QUIT_ON_EMPTY and not raw):
+            self._finish(False)
+        else:
+            self.engine.current_q = self.q # validators read the engine's current question
+            getattr(self, "_grade_" + self.STEPS[self.step])(raw)
+            self.step += 1
+            if self.step == len(self.STEPS):
+                self._finish(True)
+            else:
+                self._ask()
+        return self._take()
+
+    def _ask(self) -> None:
+        self.prompt = getattr(self, "_show_" + self.STEPS[self.step])()
+        self._out.append((PROMPT, self.prompt))
+
+    def _finish(self, result: bool) -> None:
+        self.done = True
+        self.result = result
+
+    def _take(self) -> List[Event]:
+        out, self._out = self._out, []
+        return out
+
+    def _text(self, line: str = "") -> None:
+        self._out.append((TEXT, line))
+
+    def _grade(self, points, total) -> None:
+        self.points = round(self.points + points, 4)
+        self.total = round(self.total + total, 4)
+        self.engine.record_stats(points, total)
+        self._out.append((GRADE, self.STEPS[self.step], points, total))
+
+class RecallPipeline(Pipeline):
+    """Recall mode: instruction type, then field names in order."""
+    STEPS = ("type", "layout")
+
+    def __init__(self, engine: QuizEngine, q: Dict, header: str, truth: Optional[Dict] = None):
+        super().__init__(engine, q, truth)
+        self.header = header
+
+    def _show_type(self) -> str:
+        self._out.append((CLEAR,))
+        self._text(self.header)
+        self._text(f"Instruction: {self.ins.name.lower()}")
+        return "\nWhat instruction type is this? (q to quit):\n> "
+
+    def _grade_type(self, raw: str) -> None:
+        if raw.upper() == self.ins.type:
+            self._grade(1, 1)
+        else:
+            self._grade(0, 1)
+            self._text(f"Answer: {self.ins.type}")
+
+    def _show_layout(self) -> str:
+        self._text(f"\nInstruction: {self.ins.name.lower()} ({self.ins.type}-Type)")
+        return "\nFields in order (use imm[hi:lo], q to quit):\n> "
+
+    def _grade_layout(self, raw: str) -> None:
+        if not raw:
+            return
+        ans = raw.split()
+        all_ok, mask, correct_list = self.engine.validate_layout(ans)
+        self._grade(sum(mask), len(correct_list))
+        if not all_ok:
+            self._text(_layout_feedback(ans, mask, correct_list))
+
+class BitsPipeline(RecallPipeline):
+    """Bits mode: instruction type, then the bit width of every field."""
+    STEPS = ("type", "bits")
+
+    def _show_bits(self) -> str:
+        self._text(f"\nInstruction: {self.ins.name.lower()} ({self.ins.type}-Type)")
+        return "\nBit widths in order for fields/imm[hi:lo] (space separated, q to quit):\n> "
+
+    def _grade_bits(self, raw: str) -> None:
+        if not raw:
+            return
+        ans = raw.split()
+        all_ok, mask, correct_list = self.engine.validate_bits(ans)
+        self._grade(sum(mask), len(correct_list))
+        if not all_ok:
+            self._text(_field_feedback(ans, mask, correct_list, [f[0] for f in LAYOUTS[self.ins.type]]))
+
+class EncodingPipeline(Pipeline):
+    """4-step interactive encoding process with exit paths."""
+    STEPS = ("type", "layout", "binary", "hex")
+    QUIT_ON_EMPTY = True
+
+    def _context(self, show_givens: bool = False) -> None:
+        self._out.append((CLEAR,))
+        self._text(f"Mode: Encoding")
+        self._text(f"\n{self.q['asm']}\n")
+        if show_givens:
+            if self.ins.f3 is not None:
+                self._text(f"  Funct3: {self.ins.f3}")
+            if self.ins.f7 is not None:
+                self._text(f"  Funct7: {self.ins.f7}")
+            self._text()
+
+    # Step 1: Type
+    def _show_type(self) -> str:
+        self._context(show_givens=False)
+        self._text(f"What instruction type is {self.ins.name.lower()}?")
+        return "\nType (q to quit):\n> "
+
+    def _grade_type(self, raw: str) -> None:
+        if raw.upper() == self.ins.type:
+            self._grade(1, 1)
+        else:
+            self._grade(0, 1)
+            self._text(f"Answer: {self.ins.type}")
+
+    # Step 2: Fields
+    def _show_layout(self) -> str:
+        self._context(show_givens=False)
+        self._text(f"What are the field names for instruction {self.ins.name.lower()} in order?")
+        return "\nFields (space separated, use imm[hi:lo], q to quit):\n> "
+
+    def _grade_layout(self, raw: str) -> None:
+        ans = raw.split()
+        ok, mask, correct = self.engine.validate_layout(ans)
+        self._grade(sum(mask), len(correct))
+        if not ok:
+            self._text(_layout_feedback(ans, mask, correct))
+
+    # Step 3: Binary per field
+    def _show_binary(self) -> str:
+        self._context(show_givens=True)
+        self._text(f"What are the binary values for each field in {self.ins.name.lower()}?")
+        return "\nBinary (space separated, q to quit):\n> "
+
+    def _grade_binary(self, raw: str) -> None:
+        ans = raw.split()
+        fields = self.truth["fields"]
+        truth_parts = [p[1] for p in fields]
+        mask = [False] * len(truth_parts)
+        for i in range(min(len(ans), len(truth_parts))):
+            if ans[i] == truth_parts[i]:
+                mask[i] = True
+        points = sum(mask)
+        total = len(truth_parts)
+        self._grade(points, total)
+        if not (points == total and len(ans) == total):
+            self._text(_field_feedback(ans, mask, truth_parts, [p[0] for p in fields]))
+
+    # Step 4: Final Hex
+    def _show_hex(self) -> str:
+        self._context(show_givens=True)
+        self._text(f"What is the final 32-bit hex encoding for {self.ins.name.lower()}?")
+        return "\nHex (q to quit):\n> "
+
+    def _grade_hex(self, raw: str) -> None:
+        h = raw.lower()
+        expected = self.truth["hex"]
+        if h == expected or h == "0x" + expected:
+            self._grade(1, 1)
+        else:
+            self._grade(0, 1)
+            self._text(f"Answer: {expected}")
+
+class DecodingPipeline(Pipeline):
+    """Refined 7-Step Decoding Workflow with Horizontal UI and Strict Grading."""
+    STEPS = ("binary", "opcode", "type", "fields", "values", "assembly")
+
+    def __init__(self, engine: QuizEngine, q: Dict, worksheet: Optional[WorksheetRenderer],
+                 truth: Optional[Dict] = None, sheet: Optional[Worksheet] = None):
+        super().__init__(engine, q, truth)
+        self.worksheet = worksheet # None: headless, no frames are built
+        # Solving State for Worksheet
+        self.field_layouts = LAYOUTS[self.ins.type] # MSB to LSB
+        self.num_fields = len(self.field_layouts)
+        if sheet is None:
+            sheet = (prepare_worksheet(engine, worksheet, q, self.truth) if worksheet is not None else
+                     Worksheet(self.ins, self.truth, reference_rows(engine, self.ins), q.get("asm"), self.num_fields))
+        self.sheet = sheet
+
+    def _draw(self, step_name: str, **flags) -> None:
+        if self.worksheet is None:
+            return
+        self._out.append((FRAME, self.worksheet.frame(self.sheet, step_name, **flags)))
+
+    def _log(self, entry: str) -> None:
+        # Persistent status log (survives screen clears)
+        self.sheet.status_log.append(entry)
+
+    # --- Step 1: Hex to Binary ---
+    def _show_binary(self) -> str:
+        self._draw(DECODE_FIRST_STEP, show_nibbles=True)
+        return "\nConvert Hex to Binary (32 bits):\nPress 'q' to quit to main menu.\n> "
+
+    def _grade_binary(self, raw: str) -> None:
+        sheet, truth_bin = self.sheet, self.truth['binary']
+        nibble_status, nibble_bins = sheet.nibble_status, sheet.nibble_bins
+        inp = re.sub(r'[^01]', '', raw)
+        if len(inp) == 32:
+            for i in range(8):
+                u_nib = inp[i*4:(i+1)*4]
+                nibble_bins[i] = u_nib
+                nibble_status[i] = "✓" if u_nib == truth_bin[i*4:(i+1)*4] else "✗"
+            correct_nibbles = sum(1 for s in nibble_status if s == "✓")
+            self._grade(correct_nibbles / 8.0, 1)
+            if correct_nibbles == 8:
+                sheet.user_bin = inp
+                self._log("Step 1: ✓ Binary correct")
+            else:
+                for i in range(8):
+                    nibble_bins[i] = truth_bin[i*4:(i+1)*4]
+                sheet.user_bin = truth_bin
+                self._log(f"Step 1: ✗ Binary {correct_nibbles}/8 nibbles correct")
+        else:
+            # Wrong length → 0 points, reveal all correct nibbles
+            self._grade(0, 1)
+            for i in range(8):
+                nibble_bins[i] = truth_bin[i*4:(i+1)*4]
+                nibble_status[i] = "✗"
+            sheet.user_bin = truth_bin
+            self._log("Step 1: ✗ Invalid input (need exactly 32 binary digits)")
+        self._draw(DECODE_FIRST_STEP, show_nibbles=True)
+
+    # --- Step 2: Opcode ---
+    def _show_opcode(self) -> str:
+        self._draw("Step 2: Opcode", show_bin=True)
+        return "\nWhat is the opcode in decimal?\nPress 'q' to quit to main menu.\n> "
+
+    def _grade_opcode(self, raw: str) -> None:
+        op = self.ins.op
+        try:
+            if int(raw) == op:
+                self._grade(1, 1)
+                self._log("Step 2: ✓ Opcode correct")
+            else:
+                self._grade(0, 1)
+                self._log(f"Step 2: ✗ Opcode was {op}, got {raw}")
+        except ValueError:
+            self._grade(0, 1)
+            self._log(f"Step 2: ✗ Opcode was {op}, got '{raw}'")
+
+    # --- Step 3: Type ---
+    def _show_type(self) -> str:
+        self._draw("Step 3: Instruction Type", show_bin=True, show_op=True)
+        return "\nIdentify the Type (R, I, S, B, U, J):\nPress 'q' to quit to main menu.\n> "
+
+    def _grade_type(self, raw: str) -> None:
+        inp = raw.upper()
+        if inp == self.ins.type:
+            self._grade(1, 1)
+            self._log("Step 3: ✓ Type correct")
+        else:
+            self._grade(0, 1)
+            self._log(f"Step 3: ✗ Type was {self.ins.type}, got {inp}")
+
+    # --- Step 4: Field Names ---
+    def _show_fields(self) -> str:
+        self._draw("Step 4: Field Names", show_bin=True, show_op=True, show_type=True, show_fields=True)
+        return "\nEnter field names (space separated, MSB to LSB):\nPress 'q' to quit to main menu.\n> "
+
+    def _grade_fields(self, raw: str) -> None:
+        sheet = self.sheet
+        ans = raw.split()
+        all_ok, mask, correct_list = self.engine.validate_layout(ans)
+        for i in range(self.num_fields):
+            sheet.solved_names[i] = correct_list[i]
+            sheet.status_icons[i] = "✓" if i < len(ans) and mask[i] else "✗"
+
+        if all_ok:
+            self._grade(1.0, 1.0)
+            self._log("Step 4: ✓ Field names correct")
+        else:
+            self._grade(0.0, 1.0)
+            self._log(f"Step 4: ✗ Fields {sum(mask)}/{self.num_fields} correct")
+        self._draw("Step 4: Field Names", show_bin=True, show_op=True, show_type=True, show_fields=True)
+
+    # --- Step 5: Field Values (all at once, MSB to LSB) ---
+    def _show_values(self) -> str:
+        for i in range(self.num_fields): self.sheet.status_icons[i] = "?"
+        self._draw("Step 5: Field Values", show_bin=True, show_op=True, show_type=True, show_fields=True, show_vals=True)
+        return "\nEnter decimal values (space separated, MSB to LSB):\nPress 'q' to quit to main menu.\n> "
+
+    def _grade_values(self, raw: str) -> None:
+        sheet, n, fields = self.sheet, self.num_fields, self.truth['fields']
+        user_vals = raw.split()
+        correct_val_count = 0
+
+        for i in range(n):
+            field_name, width = self.field_layouts[i]
+            bin_str = next((f[1] for f in fields if f[0] == field_name), "0")
+            expected_val = int(bin_str, 2)
+
+            if i < len(user_vals):
+                try:
+                    user_val = int(user_vals[i])
+                    if (user_val & ((1 << width) - 1)) == expected_val:
+                        sheet.solved_vals[i] = user_vals[i]
+                        sheet.status_icons[i] = "✓"
+                        self._grade(1.0 / n, 1.0 / n)
+                        correct_val_count += 1
+                        continue
+                except ValueError:
+                    pass
+
+            # Wrong or missing
+            self._grade(0.0, 1.0 / n)
+            sheet.solved_vals[i] = str(expected_val)
+            sheet.status_icons[i] = "✗"
+
+        if correct_val_count == n:
+            self._log("Step 5: ✓ Field values correct")
+        else:
+            self._log(f"Step 5: ✗ Values {correct_val_count}/{n} correct")
+        self._draw("Step 5: Field Values", show_bin=True, show_op=True, show_type=True, show_fields=True, show_vals=True)
+
+    # --- Step 6: Final Assembly ---
+    def _show_assembly(self) -> str:
+        self._draw("Step 6: Final Assembly", show_bin=True, show_op=True, show_type=True, show_fields=True, show_vals=True)
+        return "\nWrite the final assembly (e.g. add x1, x2, x3):\nPress 'q' to quit to main menu.\n> "
+
+    def _grade_assembly(self, raw: str) -> None:
+        q = self.q
+        target_vals = {"opcode": self.ins.op, "rd": q['rd'], "rs1": q['rs1'], "rs2": q['rs2'], "imm": q['imm']}
+        ok, msg = validate_asm_strict(raw, self.ins, target_vals)
+        if ok:
+            self._grade(1, 1)
+            self._log("Step 6: ✓ Assembly correct")
+        else:
+            self._grade(0, 1)
+            self._log(f"Step 6: ✗ {msg}")
+        # Show final state with assembly revealed
+        self._draw("Step 6: Final Assembly", show_bin=True, show_op=True, show_type=True, show_fields=True,
+                   show_vals=True, show_asm=True)
+
+def parse_types(types_raw: str) -> List[str]:
+    """Instruction types from a menu answer; empty or 'all' selects every type."""
+    types_raw = types_raw.strip().lower()
+    if not types_raw or types_raw == 'all':
+        return list(ALL_TYPES)
+    return [t.strip().upper() for t in types_raw.replace(',', ' ').split()]
+
+def accuracy_line(engine: QuizEngine) -> str:
+    p = engine.stats['points']
+    t = engine.stats['total_points']
+    acc = (p * 100 // t) if t > 0 else 0
+    return f"Accuracy: {p:.2f}/{t:.2f} ({acc:.1f}%)"
+
+def mode_menu(engine: QuizEngine, active_types: List[str]) -> List[str]:
+    """Lines of the mode selection menu."""
+    return [f"\nMode Selection (Active Instruction Types: {', '.join(active_types)})",
+            accuracy_line(engine),
+            "-" * 20,
+            "1: Recall (Field names)",
+            "2: Bits (Field bit-widths)",
+            "3: Encoding (Full 32-bit practice)",
+            "4: Decoding (Hex to Assembly)",
+            "m: Instruction Type selection",
+            "q: Quit"]
+
+def make_pipeline(mode: str, engine: QuizEngine, q: Dict, active_types: List[str],
+                  worksheet: Optional[WorksheetRenderer] = None, truth: Optional[Dict] = None,
+                  sheet: Optional[Worksheet] = None) -> Pipeline:
+    """The pipeline for a menu mode ("1"-"4")."""
+    if mode == "1":
+        return RecallPipeline(engine, q, f"Mode: Recall (Active Types: {', '.join(active_types)})", truth)
+    if mode == "2":
+        return BitsPipeline(engine, q, f"Mode: Bits (Active Types: {', '.join(active_types)})", truth)
+    if mode == "3":
+        return EncodingPipeline(engine, q, truth)
+    if mode == "4":
+        return DecodingPipeline(engine, q, worksheet, truth, sheet)
+    raise ValueError(f"Unknown mode {mode!r}")
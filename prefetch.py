@@ -0,0 +1,124 @@
+"""
+RISC-V Tutor Question Prefetcher
+Builds upcoming questions, their ground truth and any mode-specific first frame
+on a worker thread while the student is still answering the current one.
+Each question draws from its own random stream, so the sequence a seeded
+session sees does not depend on which thread built what, or when.
+"""
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from engine import QuizEngine, ground_truth
+
+DEFAULT_DEPTH = 2
+
+def _prepare_rng(seed: int) -> random.Random:
+    """The stream a question's prepare hook draws from, wherever and however often it runs."""
+    return random.Random(f"{seed}:prepare")
+
+class Prefetched:
+    """A ready question: the question dict, its ground truth and the prepare hook's result."""
+    __slots__ = ("question", "truth", "extra", "seed", "prepared")
+
+    def __init__(self, question: Dict, truth: Dict, extra: Any = None, seed: int = 0,
+                 prepared: Optional[Callable] = None):
+        self.question = question
+        self.truth = truth
+        self.extra = extra
+        self.seed = seed         # of the question's random streams
+        self.prepared = prepared # the hook `extra` came from
+
+class Prefetcher:
+    """Keeps up to `depth` questions ready; the engine is only read on the worker thread.
+    Questions are seeded in order from `seed`, by default drawn from the global random module."""
+    def __init__(self, engine: QuizEngine, depth: int = DEFAULT_DEPTH, seed: Optional[int] = None):
+        if depth < 1:
+            raise ValueError(f"depth must be at least 1, got {depth}")
+        self.engine = engine
+        self.depth = depth
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self._seeds = random.Random(self.seed) # one draw per build, taken under the lock
+        self.prepare: Optional[Callable[[Dict, Dict, random.Random], Any]] = None
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._epoch = 0                 # Bumped by reset(); stale builds are dropped
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def set_prepare(self, prepare: Optional[Callable[[Dict, Dict, random.Random], Any]]) -> None:
+        """Sets the hook run on the worker for each new question, e.g. a decoding first frame;
+        it takes the question, its ground truth and the random stream to draw from."""
+        with self._cond:
+            self.prepare = prepare
+
+    def reset(self) -> None:
+        """Discards ready and in-flight questions, e.g. after the pool changed."""
+        with self._cond:
+            self._epoch += 1
+            self._seeds = random.Random(f"{self.seed}:{self._epoch}") # however far the old stream got
+            self._ready.clear()
+            self._error = None
+            self._cond.notify_all()
+
+    def next(self) -> Prefetched:
+        """Takes the next question (waiting if none is ready) and makes it the engine's current one."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Prefetcher is closed")
+            self._start()
+            while not self._ready and self._error is None:
+                self._cond.wait()
+            if not self._ready:
+                err, self._error = self._error, None
+                self._cond.notify_all()
+                raise err
+            item = self._ready.popleft()
+            self._cond.notify_all()
+            prepare = self.prepare
+        if item.prepared is not prepare: # queued before the hook changed
+            item.extra = prepare(item.question, item.truth, _prepare_rng(item.seed)) if prepare else None
+            item.prepared = prepare
+        self.engine.current_q = item.question
+        return item
+
+    def close(self) -> None:
+        """Stops the worker and waits for any in-flight build."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rvtutor-prefetch", daemon=True)
+            self._thread.start()
+
+    def _build(self, prepare: Optional[Callable], seed: int) -> Prefetched:
+        q = self.engine.make_question(random.Random(seed))
+        truth = ground_truth(q)
+        return Prefetched(q, truth, prepare(q, truth, _prepare_rng(seed)) if prepare else None, seed, prepare)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (len(self._ready) >= self.depth or self._error is not None):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                epoch, prepare, seed = self._epoch, self.prepare, self._seeds.getrandbits(64)
+            try:
+                item, err = self._build(prepare, seed), None
+            except BaseException as e: # Re-raised to the consumer in next()
+                item, err = None, e
+            with self._cond:
+                if epoch != self._epoch:
+                    continue
+                if err is not None:
+                    self._error = err
+                else:
+                    self._ready.append(item)
+                self._cond.notify_all()
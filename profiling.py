@@ -0,0 +1,104 @@
+"""
+RISC-V Tutor Profiling
+Runs a session under cProfile with tracemalloc snapshots around every question,
+then reports the top functions by cumulative time and the top allocation sites.
+Saves PREFIX.pstats (for pstats or snakeviz) and PREFIX.alloc.txt (per-question
+allocation diffs).
+"""
+import cProfile
+import functools
+import io
+import pstats
+import sys
+import tracemalloc
+from typing import Callable, List, Optional, TextIO, Tuple
+
+DEFAULT_PREFIX = "rvtutor-profile"
+TOP = 20
+FRAMES = 8 # traceback depth kept per allocation; deep enough to reach the closure that allocated
+
+# the profiler's and tracemalloc's own bookkeeping and import machinery are not ours to fix
+_FILTERS = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"), tracemalloc.Filter(False, "<unknown>")]
+
+def _label(pipeline) -> str:
+    return f"{type(pipeline).__name__} {pipeline.ins.name}"
+
+class Profiler:
+    """cProfile for the whole run; a tracemalloc diff for every question."""
+    def __init__(self, prefix: str = DEFAULT_PREFIX, top: int = TOP):
+        if top < 1:
+            raise ValueError("top must be at least 1")
+        self.prefix, self.top = prefix, top
+        self.profile = cProfile.Profile()
+        self.questions: List[Tuple[str, List[tracemalloc.StatisticDiff]]] = []
+        self._first: Optional[tracemalloc.Snapshot] = None
+        self._installed: List[Tuple[object, str, object]] = []
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    def _question(self, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def profiled(pipeline, *args, **kwargs):
+            self.profile.disable() # snapshots are bookkeeping, not the tutor's time
+            before = self._snapshot()
+            self.profile.enable()
+            try:
+                return fn(pipeline, *args, **kwargs)
+            finally:
+                self.profile.disable()
+                diff = self._snapshot().compare_to(before, "lineno")
+                self.questions.append((_label(pipeline), [d for d in diff if d.size_diff][:self.top]))
+                self.profile.enable()
+        return profiled
+
+    def start(self, cli=None) -> None:
+        """Starts profiling; questions are driven by `cli`'s drive() (default: main) or headless.run_question."""
+        import headless
+        if cli is None:
+            import main as cli
+        for owner, attr in ((cli, "drive"), (headless, "run_question")):
+            self._installed.append((owner, attr, getattr(owner, attr)))
+            setattr(owner, attr, self._question(getattr(owner, attr)))
+        tracemalloc.start(FRAMES)
+        self._first = self._snapshot()
+        self.profile.enable()
+
+    def stop(self, out: Optional[TextIO] = None) -> None:
+        """Stops profiling, saves both files and prints the report (default: stderr)."""
+        self.profile.disable()
+        last = self._snapshot()
+        tracemalloc.stop()
+        while self._installed:
+            owner, attr, original = self._installed.pop()
+            setattr(owner, attr, original)
+        self.profile.dump_stats(self.prefix + ".pstats")
+        with open(self.prefix + ".alloc.txt", "w") as fh:
+            fh.write(self.allocations(last))
+        out = out or sys.stderr
+        out.write(self.report(last))
+        out.write(f"Saved {self.prefix}.pstats and {self.prefix}.alloc.txt\n")
+        out.flush()
+
+    def report(self, last: tracemalloc.Snapshot) -> str:
+        """Top functions by cumulative time, then the top live allocation sites."""
+        buf = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=buf)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        buf.write(f"Top {self.top} allocation sites (live at exit):\n")
+        for stat in last.statistics("lineno")[:self.top]:
+            frame = stat.traceback[0]
+            buf.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
+        return buf.getvalue()
+
+    def allocations(self, last: tracemalloc.Snapshot) -> str:
+        """Growth over the whole run, then every question's own allocation diff."""
+        lines = [f"== run: {len(self.questions)} questions"]
+        if self._first is not None:
+            lines += [str(d) for d in last.compare_to(self._first, "lineno") if d.size_diff][:self.top]
+        for i, (label, diff) in enumerate(self.questions, 1):
+            lines.append(f"== question {i}: {label}")
+            lines += [str(d) for d in diff]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,203 @@
+"""
+RISC-V Tutor Frame Renderer
+Draws frames into memory and sends only the lines that changed since the
+previous frame, in one write, using the alternate screen and cursor addressing.
+"""
+import os
+import shutil
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+ALT_SCREEN_ON = "\033[?1049h"
+ALT_SCREEN_OFF = "\033[?1049l"
+HOME_CLEAR = "\033[H\033[2J"
+PROMPT_ROWS = 4 # Rows kept free below a frame for the input prompt and answer
+
+class FrameRenderer:
+    """Diffing renderer; falls back to clear-and-reprint when the stream is not an ANSI tty."""
+    def __init__(self, stream=None, clear: Optional[Callable[[], None]] = None):
+        self._stream = stream       # None: resolve sys.stdout at render time
+        self._clear = clear         # Full-clear hook for the plain fallback
+        self.prev: Optional[List[str]] = None
+        self.active = False         # Alternate screen entered
+
+    @property
+    def stream(self):
+        return self._stream if self._stream is not None else sys.stdout
+
+    def ansi(self) -> bool:
+        """True when cursor addressing can be used on the output stream."""
+        if os.name == 'nt':
+            return False
+        isatty = getattr(self.stream, "isatty", None)
+        return bool(isatty and isatty())
+
+    def invalidate(self) -> None:
+        """Forgets the previous frame, e.g. after something else cleared the screen."""
+        self.prev = None
+
+    def render(self, lines: List[str]) -> int:
+        """Draws a frame; returns the number of characters written."""
+        out = self.stream
+        if not self.ansi():
+            if self._clear is not None:
+                self._clear()
+            buf = "\n".join(lines) + "\n"
+        else:
+            buf = self._diff(lines)
+        self.prev = list(lines)
+        out.write(buf)
+        out.flush()
+        return len(buf)
+
+    def _diff(self, lines: List[str]) -> str:
+        parts = []
+        if not self.active:
+            parts.append(ALT_SCREEN_ON)
+            self.active = True
+            self.prev = None
+
+        rows = shutil.get_terminal_size((80, 24)).lines
+        prev = self.prev
+        if prev is None or len(lines) + PROMPT_ROWS >= rows:
+            # Unknown screen contents, or the frame would scroll: redraw in full.
+            # The student's Enter moves the cursor one row past the prompt, hence >=.
+            parts.append(HOME_CLEAR)
+            parts.append("\n".join(lines) + "\n")
+            return "".join(parts)
+
+        for i, line in enumerate(lines):
+            if i >= len(prev) or prev[i] != line:
+                parts.append(f"\033[{i + 1};1H{line}\033[K")
+        # Park below the frame and drop stale rows and the previous prompt
+        parts.append(f"\033[{len(lines) + 1};1H\033[J")
+        return "".join(parts)
+
+    def leave(self) -> None:
+        """Restores the primary screen if the alternate screen was entered."""
+        if self.active:
+            self.stream.write(ALT_SCREEN_OFF)
+            self.stream.flush()
+            self.active = False
+            self.prev = None
+
+REF_HEADER = ("Reference Table:",
+              f"{'Instruction':<12} | {'opcode':<8} | {'funct3':<8} | {'funct7':<8}",
+              "-" * 46)
+
+@lru_cache(maxsize=None) # one entry per reference row, i.e. per instruction in the registry
+def _ref_entry(row: Tuple) -> Tuple:
+    """(type, opcode, formatted line) for a reference row; shared by every worksheet showing it."""
+    return (row[4], row[1], f"{row[0]:<12} | {row[1]:<8} | {row[2]:<8} | {row[3]:<8}")
+
+class Worksheet:
+    """One decoding question: pre-formatted static rows plus the student's progress."""
+    __slots__ = ("ins", "asm", "ref_rows", "hex_row", "op_row", "type_row", "num_fields",
+                 "nibble_status", "nibble_bins", "user_bin",
+                 "solved_names", "solved_vals", "status_icons", "status_log",
+                 "_ref_cache", "_memo")
+
+    def __init__(self, ins, truth: Dict, table_rows: List[Tuple], asm: Optional[str], num_fields: int):
+        self.ins = ins
+        self.asm = asm
+        # (type, opcode, formatted line) per reference row, in display order
+        self.ref_rows = tuple(_ref_entry(row) for row in table_rows)
+        self.hex_row = "Hex:    " + "".join(f"{h:<5}" for h in truth['hex'])
+        self.op_row = f"Opcode: {ins.op}"
+        self.type_row = f"Type:   {ins.type}"
+        self.num_fields = num_fields
+
+        self.nibble_status = ["?"] * 8
+        self.nibble_bins = ["????"] * 8
+        self.user_bin = "0" * 32
+        self.solved_names = ["?"] * num_fields
+        self.solved_vals = ["-"] * num_fields
+        self.status_icons = ["?"] * num_fields
+        # Persistent status log (survives screen clears)
+        self.status_log: List[str] = []
+
+        self._ref_cache: Dict[Tuple, List[str]] = {}
+        self._memo: Dict[str, Tuple] = {}
+
+    def ref_table(self, filter_type=None, filter_op=None) -> List[str]:
+        """Reference table lines for a filter; each variant is formatted once per question."""
+        key = (filter_type, filter_op)
+        lines = self._ref_cache.get(key)
+        if lines is None:
+            lines = list(REF_HEADER)
+            for row_type, row_op, line in self.ref_rows:
+                if filter_type and row_type != filter_type: continue
+                if filter_op is not None and row_op != filter_op: continue
+                lines.append(line)
+            self._ref_cache[key] = lines
+        return lines
+
+    def memo(self, slot: str, key, build: Callable[[], List[str]]) -> List[str]:
+        """One-entry cache per dynamic section: rebuilt only when its inputs change."""
+        hit = self._memo.get(slot)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        lines = build()
+        self._memo[slot] = (key, lines)
+        return lines
+
+class WorksheetRenderer:
+    """Builds decoding worksheet frames; created once per session and reused for every question."""
+    def __init__(self, screen: Optional[FrameRenderer] = None):
+        self.screen = screen or FrameRenderer()
+
+    def prepare(self, ins, truth: Dict, table_rows: List[Tuple], asm: Optional[str], num_fields: int) -> Worksheet:
+        """Pre-formats the static parts of a question's worksheet."""
+        return Worksheet(ins, truth, table_rows, asm, num_fields)
+
+    def frame(self, sheet: Worksheet, step_name: str, show_bin=False, show_op=False, show_type=False,
+              show_fields=False, show_vals=False, show_nibbles=False, show_asm=False) -> List[str]:
+        ins = sheet.ins
+        lines = [f"Mode: Decoding - {step_name}"]
+        # Successively build ref table focus
+        lines.extend(sheet.ref_table(ins.type if show_type else None, ins.op if show_op else None))
+        lines.append("")
+        lines.append(sheet.hex_row)
+
+        if show_nibbles:
+            lines.extend(sheet.memo("nibbles", (tuple(sheet.nibble_bins), tuple(sheet.nibble_status)), lambda: [
+                "Binary: " + "".join(f"{b:<5}" for b in sheet.nibble_bins),
+                "Status: " + "".join(f"{s:<5}" for s in sheet.nibble_status)]))
+        elif show_bin:
+            # Show formatted binary (nibbles)
+            lines.extend(sheet.memo("binary", sheet.user_bin, lambda: [
+                "Binary: " + "".join(f"{sheet.user_bin[i*4:(i+1)*4]} " for i in range(8))]))
+
+        if show_op:    lines.append(sheet.op_row)
+        if show_type:  lines.append(sheet.type_row)
+
+        if show_fields:
+            key = (tuple(sheet.solved_names), tuple(sheet.solved_vals), tuple(sheet.status_icons), show_vals)
+            lines.extend(sheet.memo("progress", key, lambda: self._progress(sheet, show_vals)))
+
+        # Persistent log: show last 3 entries
+        if sheet.status_log:
+            recent = tuple(sheet.status_log[-3:])
+            lines.extend(sheet.memo("log", recent, lambda: ["", "Log (recent):"] + [f"  {e}" for e in recent]))
+
+        if show_asm:
+            lines.extend(["", f"Assembly: {sheet.asm}"])
+        return lines
+
+    @staticmethod
+    def _progress(sheet: Worksheet, show_vals: bool) -> List[str]:
+        n = sheet.num_fields
+        # Calculate column widths
+        widths = [max(len(sheet.solved_names[i]), len(sheet.solved_vals[i]) if show_vals else 1, 5) + 2
+                  for i in range(n)]
+        lines = ["", "Progress:",
+                 "Field:  " + "".join(f"{sheet.solved_names[i]:^{widths[i]}}" for i in range(n))]
+        if show_vals:
+            lines.append("Value:  " + "".join(f"{sheet.solved_vals[i]:^{widths[i]}}" for i in range(n)))
+        lines.append("Status: " + "".join(f"{sheet.status_icons[i]:^{widths[i]}}" for i in range(n)))
+        return lines
+
+    def draw(self, sheet: Worksheet, step_name: str, **flags) -> None:
+        """Builds a frame and sends it through the diffing screen."""
+        self.screen.render(self.frame(sheet, step_name, **flags))
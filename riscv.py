@@ -2,7 +2,11 @@
 RISC-V Tutor Instruction Registry & Swizzlers
 Defines layouts and bit-reordering logic with strict guards.
 """
-from typing import List, Dict, Optional
+import itertools
+import json
+import threading
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Sequence, Tuple
 from utils import to_bin
 
 class Instruction:
@@ -83,3 +87,60 @@ REGISTRY = [
     Instruction("auipc","U", 0x17),
     Instruction("jal",  "J", 0x6F),
 ]
+
+class Registry:
+    """An immutable snapshot of the instruction set and the indexes derived from it:
+    the instructions by name and the filtered pool for every set of types. A reload
+    publishes a new snapshot; one is never changed in place."""
+    __slots__ = ("instructions", "by_name", "pools", "version")
+
+    def __init__(self, instructions: Sequence[Instruction], version: int = 0):
+        instructions = tuple(instructions)
+        if not instructions:
+            raise ValueError("a registry needs at least one instruction")
+        by_name = {i.name: i for i in instructions}
+        if len(by_name) != len(instructions):
+            raise ValueError("instruction names must be unique")
+        types = sorted(LAYOUTS)
+        pools = {key: tuple(i for i in instructions if i.type in key) # all 2^6 type sets, sorted
+                 for n in range(len(types) + 1) for key in itertools.combinations(types, n)}
+        self.instructions: Tuple[Instruction, ...] = instructions
+        self.by_name: Mapping[str, Instruction] = MappingProxyType(by_name)
+        self.pools: Mapping[Tuple[str, ...], Tuple[Instruction, ...]] = MappingProxyType(pools)
+        self.version = version
+
+def load(path: str) -> List[Instruction]:
+    """Instructions from a JSON list of [name, type, opcode, funct3, funct7] entries (funct
+    fields may be null); raises ValueError if the file is malformed."""
+    with open(path) as fh:
+        try:
+            entries = json.load(fh)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a list of instructions")
+    try:
+        return [Instruction(*entry) for entry in entries]
+    except TypeError as e:
+        raise ValueError(f"{path}: {e}")
+
+# The shipped instruction set, which formats indexing REGISTRY (signed tokens) stay on across reloads
+BUILT_IN = Registry(REGISTRY)
+# The published snapshot. Readers load it once per use and never lock; writers replace it whole
+_current = BUILT_IN
+_publishing = threading.Lock()
+
+def current() -> Registry:
+    return _current
+
+def publish(instructions: Sequence[Instruction]) -> Registry:
+    """Builds a snapshot of `instructions` and makes it current; returns it."""
+    global _current
+    with _publishing: # orders writers only
+        registry = Registry(instructions, _current.version + 1)
+        _current = registry
+    return registry
+
+def reload(path: str) -> Registry:
+    """Publishes the registry in `path`; the current one stays if the file is bad."""
+    return publish(load(path))
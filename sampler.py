@@ -0,0 +1,106 @@
+"""
+RISC-V Tutor Sampling Profiler
+Samples every thread's stack on a timer through sys._current_frames() and
+counts them as collapsed stacks, one "root;caller;callee count" line per
+distinct stack, ready for flamegraph.pl or speedscope. Only the sampling thread
+does any work, and it exists only while a window is open.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_HZ = 100
+MAX_HZ = 1000
+MAX_SECONDS = 300.0
+MAX_DEPTH = 128
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class Sampler:
+    """One profiling window at a time: start(), then stop() and read collapsed()."""
+    def __init__(self, hz: float = DEFAULT_HZ):
+        if not 0 < hz <= MAX_HZ:
+            raise ValueError(f"hz must be in (0, {MAX_HZ}]")
+        self.interval = 1.0 / hz
+        self.counts: Dict[str, int] = {}
+        self.samples = 0
+        self.busy = 0.0     # seconds spent sampling, all of it holding the GIL
+        self.elapsed = 0.0
+        self._names: Dict[int, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def overhead(self) -> float:
+        """Share of the window the sampler held the interpreter."""
+        return self.busy / self.elapsed if self.elapsed else 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            raise RuntimeError("Sampler already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rvtutor-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Ends the window; waits at most one interval for the sampling thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def collapsed(self) -> str:
+        """The stacks in collapsed format, most frequent first."""
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+    def _run(self) -> None:
+        clock = time.perf_counter
+        own = threading.get_ident()
+        begin = due = clock()
+        while not self._stop.wait(max(0.0, due - clock())):
+            t0 = clock()
+            self._sample(own)
+            self.busy += clock() - t0
+            self.samples += 1
+            due += self.interval
+            if due < t0: # fell behind (a long GIL hold elsewhere): skip the missed ticks
+                due = t0 + self.interval
+        self.elapsed += clock() - begin
+
+    def _sample(self, own: int) -> None:
+        counts, names = self.counts, self._names
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            name = names.get(tid)
+            if name is None:
+                for t in threading.enumerate():
+                    names[t.ident] = t.name
+                name = names.get(tid, f"thread-{tid}")
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(name)
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+
+def profile(seconds: float, hz: float = DEFAULT_HZ) -> Sampler:
+    """Samples for `seconds` on the calling thread's behalf; blocks until the window ends."""
+    if not 0 < seconds <= MAX_SECONDS:
+        raise ValueError(f"seconds must be in (0, {MAX_SECONDS:g}]")
+    sampler = Sampler(hz)
+    sampler.start()
+    try:
+        time.sleep(seconds)
+    finally:
+        sampler.stop()
+    return sampler
@@ -0,0 +1,919 @@
+"""
+RISC-V Tutor Session Server
+Hosts many tutor sessions over line-oriented TCP (telnet, nc), one asyncio task
+per connection driving the same pipelines as the terminal UI. With several
+workers, a parent builds the shared tables once and forks processes that all
+listen on the port via SO_REUSEPORT.
+
+A client that drops can reconnect and send `resume <session id>` as its first
+line; the session id hashes to the worker that owns it, and the connection is
+passed to that worker if the kernel delivered it elsewhere.
+"""
+import asyncio
+import gc
+import hashlib
+import ipaddress
+import os
+import secrets
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+import urllib.parse
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import riscv
+from riscv import LAYOUTS
+from engine import QuizEngine, ground_truth
+from render import WorksheetRenderer, HOME_CLEAR
+import checkpoint
+import metrics
+import sampler
+import takeover
+from timerwheel import TimerWheel
+from pipeline import (CLEAR, TEXT, FRAME, PROMPT, GRADE, TYPES_BANNER, TYPES_PROMPT, MODE_PROMPT, CONTINUE_PROMPT,
+                      MODE_NAMES, parse_types, mode_menu, accuracy_line, make_pipeline, reference_rows,
+                      validate_asm_strict)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+MAX_SESSIONS = 10000
+BACKLOG = 4096               # Pending connections: a whole lab connects at the start of a session
+MAX_LINE = 1024              # Longest accepted answer line, bytes
+WRITE_HIGH_WATER = 64 * 1024 # Output buffered per connection before drain() waits
+WRITE_TIMEOUT = 10.0         # A client that cannot take one batch in this long is dropped
+IDLE_TIMEOUT = 30 * 60.0     # Seconds without an answer before a session is closed
+EVICT_AFTER = 2 * 60.0       # Seconds without an answer before a session's state is spilled to disk
+WHEEL_TICK = 1.0             # Resolution of the idle and eviction timeouts, seconds
+RESUME_TIMEOUT = 5 * 60.0    # Seconds a hung-up session waits for its student to reconnect
+PROFILE_SECONDS = 10.0       # Default /profile sampling window
+ADMIN_PATHS = (b"/profile", b"/reload") # Metrics port routes answered only on connections made over loopback
+CLEAR_SEQ = "\033[H\033[J"
+
+class SessionClosed(Exception):
+    """The client went away, idled out or could not keep up."""
+
+class ResumeRequest(Exception):
+    """A new connection asked to take over an existing session."""
+    def __init__(self, sid: str):
+        super().__init__(sid)
+        self.sid = sid
+
+def session_owner(sid: str, workers: int) -> int:
+    """The worker owning a session id (jump consistent hash)."""
+    key = int.from_bytes(hashlib.blake2b(sid.encode(), digest_size=8).digest(), "little")
+    b, j = -1, 0
+    while j < workers:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+def new_session_id(index: int, workers: int) -> str:
+    """A random session id that hashes to worker `index`."""
+    while True:
+        sid = secrets.token_hex(6)
+        if session_owner(sid, workers) == index:
+            return sid
+
+class SessionMoved(Exception):
+    """The session was checkpointed for the server taking over from this one."""
+
+class Evicted(Exception):
+    """An idle session's task was stopped so that its state can be spilled to disk."""
+
+class Session:
+    """One student: engine state, the menu position as an explicit phase, and the streams of its
+    current connection. The phase, filter, stats and open question are all a checkpoint needs."""
+    __slots__ = ("engine", "reader", "writer", "task", "sid", "server", "fresh", "last", "waiter", "handover",
+                 "idle", "seen", "reading", "evicting", "phase", "types", "mode", "pipeline", "rows", "answers",
+                 "pending", "restored", "_out")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, sid: Optional[str] = None,
+                 server: Optional["TutorServer"] = None):
+        self.engine = QuizEngine()
+        self.reader = reader
+        self.writer = writer
+        self.task = asyncio.current_task()
+        self.sid = sid
+        self.server = server # parks the session on hang-up; None closes it instead
+        self.fresh = True    # no line read yet: the first one may be a resume request
+        self.last = b""      # the last write, replayed to a resumed connection
+        self.waiter: Optional[asyncio.Future] = None
+        self.handover: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+        self.idle = False    # hung up by the server's timer wheel
+        self.seen = 0        # wheel tick of the last answer
+        self.reading = False # waiting on the client, and so safe to evict
+        self.evicting = False
+        self.phase = checkpoint.TYPES
+        self.types: List[str] = []
+        self.mode: Optional[str] = None
+        self.pipeline = None # the open question
+        self.rows: Sequence[Tuple] = () # its decoding reference rows
+        self.answers: List[str] = [] # fed to it so far
+        self.pending: Optional[bytes] = None # a line read while evicted, consumed by the next ask()
+        self.restored = False # the screen already shows the prompt the next ask() would send
+        self._out: List[str] = []
+
+    def say(self, line: str = "") -> None:
+        self._out.append(line + "\n")
+
+    async def flush(self) -> None:
+        """Sends everything queued in one write, waiting (bounded) for the client to keep up."""
+        if not self._out:
+            return
+        data = "".join(self._out).replace("\n", "\r\n").encode()
+        self._out.clear()
+        self.last = data
+        self.writer.write(data)
+        try:
+            await asyncio.wait_for(self.writer.drain(), WRITE_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            raise SessionClosed("slow or broken client") from e
+
+    async def _readline(self) -> bytes:
+        """The next line, b"" on EOF."""
+        try:
+            return await self.reader.readline()
+        except (ValueError, asyncio.LimitOverrunError) as e: # over-long line
+            raise SessionClosed("bad input") from e
+        except ConnectionError:
+            return b""
+
+    async def ask(self, prompt: str) -> str:
+        if self.restored: # restored from a checkpoint: the prompt is already on screen
+            self.restored = False
+            self._out.clear()
+        else:
+            self._out.append(prompt)
+            await self.flush()
+        while True:
+            if self.pending is not None:
+                line, self.pending = self.pending, None
+            elif self.server is not None and self.server.moving: # stop here, to be handed over
+                raise Evicted()
+            else: # read inline, not through _readline(): one coroutine frame less per waiting session
+                self.reading = True # timeouts come from the server's timer wheel, not a timer per read
+                try:
+                    line = await self.reader.readline()
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    raise SessionClosed("bad input") from e
+                except ConnectionError:
+                    line = b""
+                except asyncio.CancelledError:
+                    if not self.evicting:
+                        raise
+                    self.evicting = False
+                    if hasattr(self.task, "uncancel"): # 3.11+: the cancel was ours, and has been handled
+                        self.task.uncancel()
+                    raise Evicted()
+                finally:
+                    self.reading = False
+            if line:
+                break
+            if self.idle:
+                raise SessionClosed("idle")
+            if self.server is None or self.fresh: # nothing worth resuming yet
+                raise SessionClosed("eof")
+            await self.server.park(self) # returns on a new connection with the last output replayed
+        if self.server is not None:
+            self.server.touch(self)
+        text = line.decode("utf-8", "replace")
+        if self.fresh:
+            self.fresh = False
+            if text.startswith("resume "):
+                raise ResumeRequest(text[7:].strip())
+        return text
+
+    async def drive(self, pipeline, worksheet: WorksheetRenderer, mode: str = "") -> bool:
+        """Network counterpart of main.drive: full frames, one write per prompt. A pipeline
+        rebuilt from a checkpoint carries on from its current prompt."""
+        events = pipeline.start() if pipeline.prompt is None else [(PROMPT, pipeline.prompt)]
+        while True:
+            answer = None
+            for event in events:
+                kind = event[0]
+                if kind == GRADE:
+                    metrics.GRADES.inc((mode, event[1]))
+                    metrics.GRADE_POINTS.inc((mode, event[1]), event[2])
+                elif kind == CLEAR:
+                    self._out.append(CLEAR_SEQ)
+                elif kind == TEXT:
+                    self.say(event[1])
+                elif kind == FRAME:
+                    self._out.append(HOME_CLEAR + "\n".join(event[1]) + "\n")
+                elif kind == PROMPT:
+                    answer = await self.ask(event[1])
+            if pipeline.done:
+                return pipeline.result
+            self.answers.append(answer)
+            events = pipeline.feed(answer)
+
+    def _pipeline(self, q: Dict, worksheet: WorksheetRenderer):
+        sheet = None
+        if self.mode == "4": # built from the session's own rows, so a checkpoint can rebuild it
+            ins = q["instruction"]
+            sheet = worksheet.prepare(ins, ground_truth(q), self.rows, q["asm"], len(LAYOUTS[ins.type]))
+        return make_pipeline(self.mode, self.engine, q, self.types, worksheet, sheet=sheet)
+
+    async def run(self, worksheet: WorksheetRenderer) -> None:
+        """The menu flow of main.run_session, one phase per pass; returns when the student quits."""
+        engine = self.engine
+        if not self.restored:
+            self.say("Welcome to rvtutor")
+            if self.sid is not None:
+                self.say(f"Session {self.sid}: if disconnected, reconnect and enter 'resume {self.sid}'")
+            self.say("-" * 20)
+        while True:
+            if self.phase == checkpoint.TYPES: # 1. Types Configuration
+                self.say(TYPES_BANNER)
+                types_raw = (await self.ask(TYPES_PROMPT)).strip().lower()
+                if types_raw in ['q', 'quit']:
+                    return
+                try:
+                    engine.filter_pool(parse_types(types_raw))
+                except (TypeError, ValueError) as e:
+                    self.say(f"Error: {e}. Please try again.")
+                    continue
+                self.types = sorted(set(t.type for t in engine.pool))
+                self.say(f"Selected Instruction Types: {', '.join(self.types)}")
+                self.phase = checkpoint.MODE
+
+            elif self.phase == checkpoint.MODE: # 2. Mode Selection
+                self._out.append(CLEAR_SEQ)
+                for line in mode_menu(engine, self.types):
+                    self.say(line)
+                mode = (await self.ask(MODE_PROMPT)).strip().lower()
+                if mode == 'm':
+                    self.phase = checkpoint.TYPES
+                elif mode == 'q':
+                    return
+                elif mode not in MODE_NAMES:
+                    self.say("Invalid choice.")
+                else:
+                    self.mode = mode
+                    self.phase = checkpoint.QUESTION
+
+            elif self.phase == checkpoint.QUESTION: # 3. Quiz
+                name = MODE_NAMES[self.mode].lower()
+                if self.pipeline is None:
+                    q = engine.generate_question()
+                    metrics.QUESTIONS.inc((name, q["instruction"].type))
+                    self.rows = reference_rows(engine, q["instruction"]) if self.mode == "4" else ()
+                    self.pipeline = self._pipeline(q, worksheet)
+                finished = await self.drive(self.pipeline, worksheet, name)
+                self.pipeline, self.rows, self.answers = None, (), []
+                if finished:
+                    self.say("\n" + accuracy_line(engine))
+                    self.phase = checkpoint.CONTINUE
+                else:
+                    self.phase = checkpoint.MODE
+
+            else: # Continue?
+                more = (await self.ask(CONTINUE_PROMPT)).strip().lower() != 'n'
+                self.phase = checkpoint.QUESTION if more else checkpoint.MODE
+
+    def checkpoint(self) -> bytes:
+        """The session's state as a compact binary record."""
+        q = self.pipeline.q if self.pipeline is not None else None
+        return checkpoint.pack(checkpoint.SessionState(self.phase, self.fresh, self.types, self.mode,
+                                                       self.engine.stats, q, self.rows, tuple(self.answers),
+                                                       self.last))
+
+    def restore(self, record: bytes, worksheet: WorksheetRenderer) -> None:
+        """Rebuilds the state a checkpoint recorded; the next ask() sends nothing, as the
+        student's screen already shows its prompt."""
+        state = checkpoint.unpack(record)
+        self.phase, self.fresh, self.types, self.mode = state.phase, state.fresh, state.types, state.mode
+        self.last = state.last
+        engine = self.engine = QuizEngine()
+        if state.types:
+            engine.filter_pool(state.types)
+        if state.question is not None:
+            q = state.question
+            q["asm"] = engine.format_asm(q)
+            self.rows = state.rows
+            self.pipeline = self._pipeline(q, worksheet)
+            self.pipeline.start()
+            for answer in state.answers: # replays the progress, including the worksheet's
+                self.pipeline.feed(answer)
+            self.answers = list(state.answers)
+        engine.stats = state.stats # the replay re-recorded its steps; the checkpoint already counted them
+        self.restored = True
+
+    def _drop(self) -> None:
+        """Releases everything a checkpoint holds."""
+        self.engine = self.pipeline = None
+        self.types, self.rows, self.answers, self.last = [], (), [], b""
+        self._out.clear()
+
+    async def serve(self, worksheet: WorksheetRenderer) -> None:
+        """run(), spilling the session to disk each time the server evicts it and
+        restoring it when its next line (or EOF) arrives. Raises SessionMoved once
+        checkpointed for a server taking over."""
+        server = self.server
+        while True:
+            try:
+                return await self.run(worksheet)
+            except Evicted:
+                pass
+            if server.moving:
+                server.moved.append((self, self.checkpoint()))
+                raise SessionMoved()
+            spill = server.spill
+            spill.put(self.sid, self.checkpoint())
+            self._drop()
+            metrics.EVICTIONS.inc()
+            server.evicted += 1
+            try:
+                line = await self._readline()
+                if not line and self.idle:
+                    raise SessionClosed("idle")
+                record = spill.take(self.sid)
+            except asyncio.CancelledError:
+                if not server.moving:
+                    raise
+                server.moved.append((self, spill.take(self.sid)))
+                raise SessionMoved()
+            finally:
+                server.evicted -= 1
+                spill.discard(self.sid)
+            start = time.perf_counter()
+            try:
+                self.restore(record, worksheet)
+            except ValueError as e: # its question's instruction was reloaded away
+                raise SessionClosed("stale checkpoint") from e
+            metrics.RESTORE_SECONDS.observe((), time.perf_counter() - start)
+            self.pending = line
+
+class TutorServer:
+    """asyncio TCP server with a session cap and per-connection backpressure.
+
+    `index`/`workers` place it among pre-forked workers: `sock` is its SO_REUSEPORT
+    listener and `handoff_dir` holds each worker's Unix socket for passing resumed
+    connections to their owner. With `metrics_port`, Prometheus metrics and the
+    sampling profiler are served over HTTP on metrics_port + index (0: any free port).
+    Sessions idle for `evict_after` seconds (0: never) are checkpointed into `spill_dir`
+    and restored when their student next answers. With `control`, a Unix socket path,
+    start() first takes over the listener and sessions of the server running there,
+    and a later server started with the same path takes over from this one.
+    `registry_file` is the JSON instruction registry that reload() publishes again."""
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_sessions: int = MAX_SESSIONS,
+                 index: int = 0, workers: int = 1, sock: Optional[socket.socket] = None,
+                 handoff_dir: Optional[str] = None, metrics_port: Optional[int] = None,
+                 spill_dir: Optional[str] = None, evict_after: float = EVICT_AFTER, control: Optional[str] = None,
+                 registry_file: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.index = index
+        self.workers = workers
+        self.sock = sock
+        self.handoff_dir = handoff_dir
+        self.worksheet = WorksheetRenderer() # frame() is pure, so all sessions share one
+        self.sessions: Set[Session] = set()       # connected
+        self.by_id: Dict[str, Session] = {}       # connected or waiting to be resumed
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.closing = False
+        self.metrics_port = metrics_port
+        self._metrics: Optional[asyncio.AbstractServer] = None
+        self._sampler: Optional[sampler.Sampler] = None
+        self.spill = checkpoint.SpillDir(spill_dir) if spill_dir is not None and evict_after else None
+        self.evict_after = evict_after
+        self.evicted = 0
+        # one timer per connected session: eviction first, then the idle hang-up
+        self.wheel = TimerWheel(WHEEL_TICK, int(max(IDLE_TIMEOUT, evict_after) / WHEEL_TICK) + 2)
+        self._ticker: Optional[asyncio.Task] = None
+        self._handoff: Optional[socket.socket] = None
+        self.registry_file = registry_file
+        self.control = control
+        self._control: Optional[socket.socket] = None
+        self._mover: Optional[asyncio.Task] = None
+        self.moving = False # handing over to the next server
+        self.moved: List[Tuple[Session, bytes]] = []
+        self.taken_over = 0  # sessions taken from the previous server
+        self.handed_over: Optional[int] = None # sessions passed to the next one
+
+    async def start(self) -> None:
+        if self.control is not None:
+            await self._take_over(self.control)
+        if self.sock is not None:
+            self.server = await asyncio.start_server(self._handle, sock=self.sock, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                     limit=MAX_LINE, backlog=BACKLOG)
+        self.port = self.server.sockets[0].getsockname()[1] # resolves port 0
+        self._ticker = asyncio.ensure_future(self._tick())
+        if self.metrics_port is not None:
+            metrics.SESSIONS.read = lambda: len(self.sessions)
+            metrics.PARKED_SESSIONS.read = lambda: len(self.by_id) - len(self.sessions)
+            metrics.EVICTED_SESSIONS.read = lambda: self.evicted
+            port = self.metrics_port + self.index if self.metrics_port else 0
+            self._metrics = await asyncio.start_server(self._serve_metrics, self.host, port)
+            self.metrics_port = self._metrics.sockets[0].getsockname()[1]
+        if self.handoff_dir is not None:
+            self._handoff = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._handoff.bind(self._handoff_path(self.index))
+            self._handoff.setblocking(False)
+            asyncio.get_running_loop().add_reader(self._handoff.fileno(), self._receive_handoff)
+        if self.control is not None:
+            self._control = takeover.listen(self.control)
+            self._control.setblocking(False)
+            asyncio.get_running_loop().add_reader(self._control.fileno(), self._on_control)
+
+    async def serve_forever(self) -> None:
+        """Serves until cancelled, or until a new server has taken over."""
+        if self.server is None:
+            await self.start()
+        try:
+            while True:
+                try:
+                    async with self.server:
+                        await self.server.serve_forever()
+                except asyncio.CancelledError:
+                    if self._mover is None: # stopped by the hand-over, not cancelled
+                        raise
+                    mover, self._mover = self._mover, None
+                    await mover
+                    if self.handed_over is not None:
+                        return
+                    # the hand-over failed and was rolled back: serve on
+        finally:
+            await self.close() # parked sessions would otherwise wait out RESUME_TIMEOUT
+
+    async def close(self) -> None:
+        """Stops accepting, hangs up every session and waits for their tasks to end."""
+        self.closing = True
+        if self.server is not None:
+            self.server.close()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        if self._metrics is not None:
+            self._metrics.close()
+        if self._handoff is not None:
+            asyncio.get_running_loop().remove_reader(self._handoff.fileno())
+            self._handoff.close()
+            self._handoff = None
+        if self._control is not None:
+            asyncio.get_running_loop().remove_reader(self._control.fileno())
+            self._control.close()
+            self._control = None
+            os.unlink(self.control)
+        tasks = [s.task for s in self.by_id.values()]
+        for session in list(self.by_id.values()):
+            if session.waiter is not None:
+                session.waiter.cancel()
+            session.writer.close() # the session's next read sees EOF
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    async def _tick(self) -> None:
+        """Advances the timer wheel in real time; only the sessions due in a tick are looked at."""
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        while True:
+            due += self.wheel.tick
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            for session in self.wheel.advance():
+                self._expire(session)
+
+    def _expire(self, session: Session) -> None:
+        idle = (self.wheel.now - session.seen) * self.wheel.tick
+        if idle >= IDLE_TIMEOUT:
+            session.idle = True
+            session.writer.close() # its pending read sees EOF and ends the session
+            return
+        if self.spill is not None and session.reading:
+            session.evicting = True
+            session.task.cancel() # serve() checkpoints it and waits for the next line
+        self.wheel.schedule(session, IDLE_TIMEOUT - idle)
+
+    def touch(self, session: Session) -> None:
+        """Restarts a session's timeouts after an answer."""
+        session.seen = self.wheel.now
+        delay = self.evict_after if self.spill is not None else IDLE_TIMEOUT
+        self.wheel.schedule(session, min(delay, IDLE_TIMEOUT))
+
+    async def _serve_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """A minimal HTTP/1.1 responder, one request per connection: GET /metrics, the
+        admin GET /profile?seconds=S&hz=H, which samples every thread for S seconds and
+        answers with collapsed stacks, and POST /reload, which reloads the registry file."""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), WRITE_TIMEOUT)
+            parts = request.split(b" ", 2)
+            path, _, query = (parts[1] if len(parts) == 3 else b"").partition(b"?")
+            extra = ""
+            if path in ADMIN_PATHS and not _on_loopback(writer):
+                status, ctype, body = "403 Forbidden", "text/plain; charset=utf-8", b"Admin routes are loopback only\n"
+            elif path == b"/metrics":
+                status, ctype, body = "200 OK", metrics.CONTENT_TYPE, metrics.render().encode()
+            elif path == b"/reload":
+                if parts[0] == b"POST":
+                    status, body = await self.reload()
+                else:
+                    status, body = "405 Method Not Allowed", b"Use POST\n"
+                ctype = "text/plain; charset=utf-8"
+            elif path == b"/profile":
+                status, body, prof = await self._profile(query.decode("latin-1"))
+                ctype = "text/plain; charset=utf-8"
+                if prof is not None:
+                    extra = f"X-Samples: {prof.samples}\r\nX-Sampler-Overhead: {prof.overhead:.5f}\r\n"
+            else:
+                status, ctype, body = "404 Not Found", "text/plain; charset=utf-8", b"Not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\n{extra}"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _profile(self, query: str) -> Tuple[str, bytes, Optional[sampler.Sampler]]:
+        params = urllib.parse.parse_qs(query)
+        try:
+            seconds = float(params.get("seconds", [PROFILE_SECONDS])[0])
+            if not 0 < seconds <= sampler.MAX_SECONDS:
+                raise ValueError(f"seconds must be in (0, {sampler.MAX_SECONDS:g}]")
+            prof = sampler.Sampler(float(params.get("hz", [sampler.DEFAULT_HZ])[0]))
+        except ValueError as e:
+            return "400 Bad Request", f"{e}\n".encode(), None
+        if self._sampler is not None:
+            return "409 Conflict", b"A profile is already running\n", None
+        self._sampler = prof
+        prof.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            prof.stop()
+            self._sampler = None
+        return "200 OK", prof.collapsed().encode(), prof
+
+    async def reload(self) -> Tuple[str, bytes]:
+        """Publishes the registry file again, built off the event loop; sessions never wait on it."""
+        if self.registry_file is None:
+            return "409 Conflict", b"No registry file to reload (serve --registry)\n"
+        try:
+            registry = await asyncio.to_thread(riscv.reload, self.registry_file)
+        except (OSError, ValueError) as e:
+            return "400 Bad Request", f"{e}\n".encode()
+        return "200 OK", f"Registry v{registry.version}: {len(registry.instructions)} instructions\n".encode()
+
+    async def park(self, session: Session) -> None:
+        """Holds a hung-up session until its student resumes it; raises SessionClosed if they don't."""
+        if self.closing:
+            raise SessionClosed("eof")
+        self.sessions.discard(session)
+        self.wheel.cancel(session)
+        if session.writer is not None: # None: taken over while hung up
+            session.writer.close()
+        if session.handover is not None: # already reconnected
+            new, session.handover = session.handover, None
+        else:
+            session.waiter = asyncio.get_running_loop().create_future()
+            try:
+                new = await asyncio.wait_for(session.waiter, RESUME_TIMEOUT)
+            except asyncio.TimeoutError as e:
+                raise SessionClosed("not resumed") from e
+            except asyncio.CancelledError:
+                if not self.moving:
+                    raise
+                raise Evicted() # handed over still hung up
+            finally:
+                session.waiter = None
+        session.reader, session.writer = new
+        self.touch(session)
+        self.sessions.add(session)
+        session.writer.write(session.last)
+
+    def _resume(self, sid: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Attaches a connection to a session of this worker; False if there is no such session."""
+        session = self.by_id.get(sid)
+        if session is None:
+            return False
+        if session.waiter is not None and not session.waiter.done():
+            session.waiter.set_result((reader, writer))
+        else: # the old connection is still open: drop it, and park() takes the new one
+            if session.handover is not None:
+                session.handover[1].close()
+            session.handover = (reader, writer)
+            session.writer.close()
+        return True
+
+    def _handoff_path(self, index: int) -> str:
+        return os.path.join(self.handoff_dir, f"w{index}.sock")
+
+    def _pass_on(self, sid: str, writer: asyncio.StreamWriter) -> bool:
+        """Sends a connection's socket to the worker owning `sid`."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as out:
+            try:
+                out.connect(self._handoff_path(session_owner(sid, self.workers)))
+                socket.send_fds(out, [sid.encode()], [writer.get_extra_info("socket").fileno()])
+            except OSError:
+                return False
+        return True
+
+    def _receive_handoff(self) -> None:
+        try:
+            msg, fds, _, _ = socket.recv_fds(self._handoff, 256, 1)
+        except (BlockingIOError, InterruptedError):
+            return
+        if fds:
+            asyncio.ensure_future(self._adopt(msg.decode(), socket.socket(fileno=fds[0])))
+
+    async def _adopt(self, sid: str, sock: socket.socket) -> None:
+        sock.setblocking(False)
+        reader, writer = await asyncio.open_connection(sock=sock, limit=MAX_LINE)
+        if not self._resume(sid, reader, writer):
+            writer.write(b"Unknown or expired session.\r\n")
+            writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if len(self.by_id) >= self.max_sessions:
+            writer.write(b"Server full, try again later.\r\n")
+            writer.close()
+            return
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        session = Session(reader, writer, new_session_id(self.index, self.workers), self)
+        self.sessions.add(session)
+        await self._run(session)
+
+    async def _run(self, session: Session) -> None:
+        reader, writer = session.reader, session.writer
+        self.by_id[session.sid] = session
+        self.touch(session)
+        adopted = False # the connection now belongs to the session it resumed, or to the next server
+        try:
+            await session.serve(self.worksheet)
+            session.say("Goodbye.")
+            await session.flush()
+        except ResumeRequest as e:
+            if session_owner(e.sid, self.workers) == self.index:
+                adopted = self._resume(e.sid, reader, writer)
+                ok = adopted
+            else: # the owner gets its own descriptor; ours is closed below
+                ok = self.handoff_dir is not None and self._pass_on(e.sid, writer)
+            if not ok:
+                writer.write(b"Unknown or expired session.\r\n")
+        except SessionMoved: # closed once its descriptor is sent
+            adopted = True
+        except (SessionClosed, asyncio.CancelledError): # hang-ups and server shutdown end quietly
+            pass
+        finally:
+            self.sessions.discard(session)
+            self.wheel.cancel(session)
+            if self.by_id.get(session.sid) is session:
+                del self.by_id[session.sid]
+            if not adopted and session.writer is not None:
+                session.writer.close()
+
+    def _on_control(self) -> None:
+        try:
+            conn, _ = self._control.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        asyncio.get_running_loop().remove_reader(self._control.fileno())
+        self._control.close() # not unlinked: the path is the next server's now
+        self._control = None
+        self._mover = asyncio.ensure_future(self._hand_over(conn))
+
+    async def _hand_over(self, conn: socket.socket) -> None:
+        """Stops every session at its next read, checkpoints it and passes it with the listener
+        to the server that connected to the control socket; serve_forever() then returns."""
+        self.moving = True
+        # a duplicate keeps the listening socket, and its queue of unaccepted connections, open
+        listener = socket.socket(fileno=os.dup(self.server.sockets[0].fileno()))
+        self.server.close()
+        if self._metrics is not None:
+            self._metrics.close() # frees the port for the next server
+        tasks = [s.task for s in self.by_id.values()]
+        for session in list(self.by_id.values()):
+            if session.reading:
+                session.evicting = True
+                session.task.cancel()
+            elif session.waiter is not None: # hung up
+                session.waiter.cancel()
+            elif session.engine is None: # evicted
+                session.task.cancel()
+            # otherwise busy: it stops at its next ask()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        moved = []
+        for session, record in self.moved:
+            sock, pending = None, b""
+            if session.writer is not None and not session.writer.is_closing(): # parked sessions have none
+                session.writer.transport.pause_reading()
+                pending = bytes(session.reader._buffer) # input read ahead of the session; asyncio has no peek
+                # a duplicate keeps the connection up once the session's transport closes, whoever ends up with it
+                sock = socket.socket(fileno=os.dup(session.writer.get_extra_info("socket").fileno()))
+            moved.append((session.sid, record, pending, sock))
+        failed = None
+        try:
+            await asyncio.to_thread(takeover.send, conn, listener, moved)
+        except (OSError, ValueError) as e: # the next server died mid-transfer, or a session does not fit
+            failed = e
+        finally:
+            conn.close()
+        for session, _ in self.moved:
+            if session.writer is not None:
+                session.writer.close()
+        if failed is not None:
+            print(f"rvtutor hand-over failed, serving on: {failed}", file=sys.stderr)
+            await self._roll_back(listener, moved)
+            return
+        listener.close()
+        for *_, sock in moved:
+            if sock is not None:
+                sock.close() # the peer holds its own descriptor, so the connection stays up
+        self.handed_over = len(moved)
+
+    async def _roll_back(self, listener: socket.socket, moved: List[takeover.Moved]) -> None:
+        """Takes back a failed hand-over: serves on the listener again, restores every
+        checkpointed session on its connection, and listens for the next server."""
+        self.moving, self.moved = False, []
+        self.server = await asyncio.start_server(self._handle, sock=listener, limit=MAX_LINE)
+        if self._metrics is not None:
+            self._metrics = await asyncio.start_server(self._serve_metrics, self.host, self.metrics_port)
+        await asyncio.gather(*(self._continue(*m) for m in moved))
+        self._control = takeover.listen(self.control)
+        self._control.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._control.fileno(), self._on_control)
+
+    async def _take_over(self, path: str) -> None:
+        """Takes the listener and sessions from the server running at `path`, if there is one."""
+        conn = takeover.connect(path)
+        if conn is None:
+            return
+        with conn:
+            listener, moved = await asyncio.to_thread(takeover.receive, conn)
+        self.sock = listener
+        await asyncio.gather(*(self._continue(*m) for m in moved))
+        self.taken_over = len(moved)
+
+    async def _continue(self, sid: str, record: bytes, pending: bytes, sock: Optional[socket.socket]) -> None:
+        """Restores a session passed on by the previous server; it carries on at its next answer."""
+        reader = writer = None
+        if sock is not None:
+            loop = asyncio.get_running_loop()
+            reader = asyncio.StreamReader(limit=MAX_LINE)
+            reader.feed_data(pending) # ahead of anything still to arrive on the socket
+            protocol = asyncio.StreamReaderProtocol(reader)
+            transport, _ = await loop.connect_accepted_socket(lambda: protocol, sock=sock)
+            writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+            transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        session = Session(reader, writer, sid, self)
+        try:
+            session.restore(record, self.worksheet)
+        except ValueError: # recorded under a registry this server does not have
+            if writer is not None:
+                writer.close()
+            return
+        if writer is not None:
+            self.sessions.add(session)
+        else:
+            session.pending = b"" # hung up: parks at once, waiting for its student
+        self.by_id[sid] = session
+        session.task = asyncio.ensure_future(self._run(session))
+
+def _on_loopback(writer: asyncio.StreamWriter) -> bool:
+    """True if the connection was made to a loopback address, i.e. from the server's own machine."""
+    addr = ipaddress.ip_address(writer.get_extra_info("sockname")[0].partition("%")[0])
+    if getattr(addr, "ipv4_mapped", None) is not None:
+        addr = addr.ipv4_mapped
+    return addr.is_loopback
+
+def warm() -> None:
+    """Builds the lazily created tables and caches once, so forked workers share them."""
+    engine = QuizEngine()
+    for ins in riscv.current().instructions:
+        q = {"instruction": ins, "rd": 1, "rs1": 2, "rs2": 3, "imm": 4}
+        q["asm"] = engine.format_asm(q)
+        ground_truth(q)
+        validate_asm_strict(q["asm"], ins, {"opcode": ins.op, "rd": 1, "rs1": 2, "rs2": 3, "imm": 4})
+    engine.filter_pool(parse_types("all"))
+    for mode in MODE_NAMES:
+        make_pipeline(mode, engine, engine.generate_question(), ["R"], WorksheetRenderer()).start()
+
+def _listener(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+def _reload_on_hangup(server: TutorServer) -> None:
+    """SIGHUP reloads the registry file, if the server has one."""
+    async def reload():
+        _, body = await server.reload()
+        print(f"rvtutor reload: {body.decode().strip()}", file=sys.stderr)
+    if server.registry_file is not None and hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(reload()))
+
+def _run_worker(server: TutorServer) -> None:
+    signal.signal(signal.SIGTERM, signal.default_int_handler) # the parent stops workers like Ctrl-C
+
+    async def main():
+        _reload_on_hangup(server)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_sessions: int = MAX_SESSIONS,
+          workers: int = 1, metrics_port: Optional[int] = None, evict_after: float = EVICT_AFTER,
+          control: Optional[str] = None, registry_file: Optional[str] = None) -> None:
+    """Runs the server until interrupted, in `workers` pre-forked processes if more than one.
+    With `control`, takes over from the server already running there, and runs until the
+    next one takes over. With `registry_file`, serves its instructions and reloads them on
+    SIGHUP or POST /reload."""
+    if metrics_port is not None:
+        metrics.instrument()
+    if registry_file is not None:
+        riscv.reload(registry_file) # a bad file stops the server here, not at the first reload
+    if workers > 1:
+        if control is not None:
+            raise RuntimeError("takeover is only supported with a single worker")
+        return _serve_forked(host, port, max_sessions, workers, metrics_port, evict_after, registry_file)
+    spill_dir = tempfile.mkdtemp(prefix="rvtutor-spill-")
+    server = TutorServer(host, port, max_sessions, metrics_port=metrics_port, spill_dir=spill_dir,
+                         evict_after=evict_after, control=control, registry_file=registry_file)
+
+    async def main():
+        _reload_on_hangup(server)
+        start = time.perf_counter()
+        await server.start()
+        if server.taken_over:
+            print(f"rvtutor took over {server.taken_over} sessions in {time.perf_counter() - start:.3f}s",
+                  file=sys.stderr)
+        print(f"rvtutor serving on {server.host}:{server.port} (max {max_sessions} sessions)", file=sys.stderr)
+        await server.serve_forever()
+        if server.handed_over is not None:
+            print(f"rvtutor handed over {server.handed_over} sessions", file=sys.stderr)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+def _serve_forked(host: str, port: int, max_sessions: int, workers: int, metrics_port: Optional[int],
+                  evict_after: float, registry_file: Optional[str]) -> None:
+    if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("multiple workers need fork() and SO_REUSEPORT")
+    warm()
+    signal.signal(signal.SIGTERM, signal.default_int_handler) # stop the workers on the way out
+    # Bound but never listening: fixes port 0 for every worker without taking connections
+    reserve = _listener(host, port)
+    port = reserve.getsockname()[1]
+    handoff_dir = tempfile.mkdtemp(prefix="rvtutor-")
+    gc.collect()
+    gc.freeze() # keeps the collector from writing to, and so copying, the shared pages
+    pids = []
+    try:
+        for index in range(workers):
+            sock = _listener(host, port)
+            sock.listen(BACKLOG)
+            server = TutorServer(host, port, max_sessions // workers or 1, index, workers, sock, handoff_dir,
+                                 metrics_port, os.path.join(handoff_dir, f"spill{index}"), evict_after,
+                                 registry_file=registry_file)
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    reserve.close()
+                    _run_worker(server)
+                except BaseException:
+                    traceback.print_exc()
+                    code = 1
+                finally:
+                    os._exit(code)
+            sock.close()
+            pids.append(pid)
+        if registry_file is not None and hasattr(signal, "SIGHUP"): # each worker reloads its own registry
+            signal.signal(signal.SIGHUP, lambda *_: [os.kill(pid, signal.SIGHUP) for pid in pids])
+        print(f"rvtutor serving on {host}:{port} ({workers} workers, max {max_sessions} sessions)", file=sys.stderr)
+        for pid in pids:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        reserve.close()
+        shutil.rmtree(handoff_dir, ignore_errors=True)
@@ -0,0 +1,76 @@
+"""
+RISC-V Tutor Takeover
+Hands a running server's listening socket and sessions to its replacement over a
+Unix seqpacket socket: one message for the listener, then one per session with
+its checkpoint, any input read ahead of it, and its connection (SCM_RIGHTS).
+"""
+import os
+import socket
+import struct
+from typing import List, Optional, Tuple
+
+LISTENER, SESSION, END = b"L", b"S", b"E"
+HEAD = struct.Struct("<cBII") # kind, session id length, checkpoint length, read-ahead length
+MAX_MESSAGE = 1 << 16
+
+# session id, checkpoint, read-ahead input, connection (None: hung up, waiting to be resumed)
+Moved = Tuple[str, bytes, bytes, Optional[socket.socket]]
+
+def listen(path: str) -> socket.socket:
+    """The control socket a replacement connects to; replaces a stale one at `path`."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    sock.bind(path)
+    os.chmod(path, 0o600) # whoever connects is handed every student's connection
+    sock.listen(1)
+    return sock
+
+def connect(path: str) -> Optional[socket.socket]:
+    """A connection to the server running at `path`; None if there is none."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+def _message(kind: bytes, sid: str = "", record: bytes = b"", pending: bytes = b"") -> bytes:
+    raw = sid.encode()
+    msg = HEAD.pack(kind, len(raw), len(record), len(pending)) + raw + record + pending
+    if len(msg) > MAX_MESSAGE:
+        raise ValueError(f"session {sid} does not fit in a takeover message")
+    return msg
+
+def send(conn: socket.socket, listener: socket.socket, sessions: List[Moved]) -> None:
+    """Sends the listener, then every session; blocks until the peer has taken them."""
+    socket.send_fds(conn, [_message(LISTENER)], [listener.fileno()])
+    for sid, record, pending, sock in sessions:
+        socket.send_fds(conn, [_message(SESSION, sid, record, pending)], [sock.fileno()] if sock else [])
+    conn.sendall(_message(END))
+
+def receive(conn: socket.socket) -> Tuple[socket.socket, List[Moved]]:
+    """The listener and sessions sent by send(); raises ValueError if the stream is malformed."""
+    listener, sessions = None, []
+    while True:
+        msg, fds, flags, _ = socket.recv_fds(conn, MAX_MESSAGE, 1)
+        socks = [socket.socket(fileno=fd) for fd in fds]
+        if flags & socket.MSG_TRUNC or len(msg) < HEAD.size:
+            raise ValueError("truncated takeover message")
+        kind, nsid, nrecord, npending = HEAD.unpack_from(msg)
+        if kind == END:
+            break
+        if kind == LISTENER and len(socks) == 1:
+            listener = socks[0]
+        elif kind == SESSION and len(msg) == HEAD.size + nsid + nrecord + npending:
+            pos = HEAD.size + nsid
+            sessions.append((msg[HEAD.size:pos].decode(), msg[pos:pos + nrecord], msg[pos + nrecord:],
+                             socks[0] if socks else None))
+        else:
+            raise ValueError(f"bad takeover message {kind!r}")
+    if listener is None:
+        raise ValueError("takeover sent no listener")
+    return listener, sessions
@@ -0,0 +1,111 @@
+import unittest
+import json
+import threading
+import http.client
+import io
+from unittest.mock import patch
+import api
+from api import TutorAPI, ApiError
+
+class TestTutorAPI(unittest.TestCase):
+    def setUp(self):
+        self.api = TutorAPI(max_questions=3)
+
+    def test_generate_and_answer_every_step(self):
+        q = self.api.generate({"mode": "bits", "types": "U"})
+        self.assertEqual((q["mode"], q["step"]), ("bits", "type"))
+        self.assertIn("What instruction type is this?", q["prompt"])
+        r = self.api.answer(q["id"], {"answer": "U", "step": "type"})
+        self.assertEqual((r["points"], r["next_step"], r["done"]), (1, "bits", False))
+        r = self.api.answer(q["id"], {"answer": "20 5 7"})
+        self.assertEqual((r["points"], r["total"], r["result"]), (3, 3, "done"))
+        doc = self.api.describe(q["id"])
+        self.assertEqual(len(doc["binary"]), 32)
+        stats = self.api.stats_doc()["modes"]["bits"]
+        self.assertEqual((stats["questions"], stats["answers"], stats["points"]), (1, 2, 4))
+
+    def test_step_guard_and_finished_questions(self):
+        q = self.api.generate({"mode": "3"})
+        with self.assertRaises(ApiError) as cm:
+            self.api.answer(q["id"], {"answer": "R", "step": "hex"})
+        self.assertEqual(cm.exception.status, 409)
+        self.assertFalse(self.api.describe(q["id"])["done"])
+        self.assertNotIn("hex", self.api.describe(q["id"]))
+        self.api.answer(q["id"], {"answer": "q"})
+        with self.assertRaises(ApiError) as cm:
+            self.api.answer(q["id"], {"answer": "R"})
+        self.assertEqual(cm.exception.status, 409)
+
+    def test_batch_reports_errors_per_item(self):
+        a = self.api.generate({"mode": "recall", "types": ["R"]})
+        out = self.api.batch({"answers": [{"id": a["id"], "answer": "R"}, {"id": "nope", "answer": "x"}, 5]})
+        results = out["results"]
+        self.assertEqual(results[0]["next_step"], "layout")
+        self.assertEqual(results[1]["status"], 404)
+        self.assertEqual(results[2]["status"], 400)
+
+    def test_bad_requests_and_eviction(self):
+        for body in ({"mode": "x"}, {"mode": "recall", "types": "Q"}):
+            with self.assertRaises(ApiError) as cm:
+                self.api.generate(body)
+            self.assertEqual(cm.exception.status, 400)
+        ids = [self.api.generate({"mode": "recall"})["id"] for _ in range(4)]
+        with self.assertRaises(ApiError):
+            self.api.prompt(ids[0])
+        self.assertEqual(self.api.stats_doc()["outstanding"], 3)
+
+class TestHTTP(unittest.TestCase):
+    def setUp(self):
+        self.httpd = api.make_server(port=0)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.httpd.server_address[1], timeout=10)
+
+    def tearDown(self):
+        self.conn.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def call(self, method, path, body=None):
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None)
+        r = self.conn.getresponse()
+        return r.status, json.loads(r.read())
+
+    def test_keep_alive_round_trip(self):
+        status, q = self.call("POST", "/questions", {"mode": "decoding"})
+        self.assertEqual(status, 201)
+        self.assertIn("Hex to Binary", q["prompt"])
+        sock = self.conn.sock
+        status, p = self.call("GET", f"/questions/{q['id']}/prompt")
+        self.assertEqual((status, p["step"]), (200, "binary"))
+        status, r = self.call("POST", f"/questions/{q['id']}/answer", {"answer": "0" * 32})
+        self.assertEqual((status, r["next_step"]), (200, "opcode"))
+        status, s = self.call("GET", "/stats")
+        self.assertEqual(s["modes"]["decoding"]["answers"], 1)
+        self.assertIs(self.conn.sock, sock) # one connection throughout
+
+    def test_errors(self):
+        self.assertEqual(self.call("GET", "/nowhere")[0], 404)
+        self.assertEqual(self.call("GET", "/questions/zzz")[0], 404)
+        self.conn.request("POST", "/questions", body=b"{not json")
+        r = self.conn.getresponse()
+        self.assertEqual(r.status, 400)
+        r.read()
+
+    def test_bad_content_length(self):
+        for length in ("ten", "-5"):
+            self.conn.putrequest("POST", "/questions")
+            self.conn.putheader("Content-Length", length)
+            self.conn.endheaders()
+            r = self.conn.getresponse()
+            self.assertEqual(r.status, 400)
+            self.assertIn("Content-Length", json.loads(r.read())["error"])
+            self.conn.close()
+
+    def test_unexpected_errors_get_a_response(self):
+        with patch.object(self.httpd.api, "stats_doc", side_effect=KeyError("boom")), \
+             patch("sys.stderr", new_callable=io.StringIO):
+            status, doc = self.call("GET", "/stats")
+        self.assertEqual((status, doc), (500, {"error": "internal error"}))
+
+if __name__ == '__main__':
+    unittest.main()
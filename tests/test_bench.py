@@ -0,0 +1,59 @@
+import unittest
+import builtins
+import io
+import sys
+from unittest.mock import patch
+import main
+from engine import QuizEngine
+from bench import micro, targets
+from bench.oracle import encoding_answers, decoding_answers
+
+class TestBench(unittest.TestCase):
+    def test_oracle_answers_score_full_marks(self):
+        engine = QuizEngine()
+        engine.filter_pool(['R', 'I', 'S', 'B', 'U', 'J'])
+        for run, answers_for in [(main.run_encoding_pipeline, encoding_answers),
+                                 (main.run_decoding_pipeline, decoding_answers)]:
+            for _ in range(20):
+                q = engine.generate_question()
+                with patch('builtins.input', side_effect=answers_for(engine, q)), \
+                     patch('sys.stdout', new_callable=io.StringIO):
+                    self.assertTrue(run(engine, q))
+        self.assertAlmostEqual(engine.stats["points"], engine.stats["total_points"])
+
+    def test_run_suite(self):
+        real_input = builtins.input
+        doc = micro.run_suite(duration=0.01, only=["utils.to_hex", "run_decoding_pipeline"])
+        self.assertEqual(set(doc["results"]), {"utils.to_hex", "run_decoding_pipeline"})
+        for r in doc["results"].values():
+            self.assertGreater(r["ops_per_sec"], 0)
+            self.assertLessEqual(r["p50_ns"], r["p99_ns"])
+        self.assertIs(builtins.input, real_input)
+        self.assertNotIsInstance(sys.stdout, micro.NullWriter)
+
+    def test_compare_flags_regressions(self):
+        def doc(ops):
+            return {"results": {"a": {"ops_per_sec": ops, "p50_ns": 1, "p99_ns": 2}}}
+        table, regressed = micro.compare(doc(100.0), doc(80.0), threshold=10)
+        self.assertEqual(regressed, ["a"])
+        self.assertIn("REGRESSION", table)
+        _, regressed = micro.compare(doc(100.0), doc(95.0), threshold=10)
+        self.assertEqual(regressed, [])
+
+    def test_stats_scaling(self):
+        results = micro.stats_scaling(threads=(1, 4), grades=200)
+        self.assertEqual({n: set(r) for n, r in results.items()}, {"sharded": {1, 4}, "locked": {1, 4}})
+        table = micro.format_scaling(results)
+        self.assertIn("sharded grades/s", table)
+        self.assertEqual(len(table.splitlines()), 3)
+
+    def test_targets_measure(self):
+        self.assertGreater(targets.restore_seconds(repeats=2), 0)
+        self.assertGreater(targets.takeover_seconds(sessions=3), 0)
+        self.assertGreater(targets.sampler_overhead(0.05, hz=200), 0)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            targets.main_cli(["restore"])
+        self.assertIn("restore", out.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
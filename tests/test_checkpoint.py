@@ -0,0 +1,84 @@
+import unittest
+import asyncio
+import tempfile
+import checkpoint
+from checkpoint import SessionState, SpillDir, pack, unpack
+from engine import QuizEngine, ground_truth
+from pipeline import reference_rows
+from render import WorksheetRenderer
+from riscv import REGISTRY
+from server import Session
+from test_server import NullWriter
+
+class TestCheckpoint(unittest.TestCase):
+    def test_round_trip(self):
+        engine = QuizEngine()
+        ins = next(i for i in REGISTRY if i.type == "S")
+        q = {"instruction": ins, "rd": 0, "rs1": 5, "rs2": 31, "imm": -2048}
+        rows = reference_rows(engine, ins)
+        stats = {"success": 3, "attempts": 4, "points": 3.5, "total_points": 4.0}
+        state = SessionState(checkpoint.QUESTION, False, ["I", "S"], "4", stats, q, rows, ("0101", "35", "ünï"),
+                             b"\r\n> ")
+        record = pack(state)
+        self.assertLess(len(record), 128)
+        back = unpack(record)
+        self.assertEqual((back.phase, back.fresh, back.types, back.mode, back.stats),
+                         (checkpoint.QUESTION, False, ["I", "S"], "4", stats))
+        self.assertEqual(back.question, q)
+        self.assertEqual(back.rows, rows)
+        self.assertEqual((back.answers, back.last), (state.answers, state.last))
+
+        menu = unpack(pack(SessionState(checkpoint.MODE, True, [], None, stats)))
+        self.assertEqual((menu.phase, menu.fresh, menu.mode, menu.question), (checkpoint.MODE, True, None, None))
+
+    def test_malformed_records_are_rejected(self):
+        stats = {"success": 0, "attempts": 0, "points": 0.0, "total_points": 0.0}
+        record = pack(SessionState(checkpoint.CONTINUE, False, ["R"], "1", stats, last=b"abc"))
+        for bad in (b"", record[:-1], b"\x09" + record[1:]):
+            with self.assertRaises(ValueError):
+                unpack(bad)
+        with self.assertRaises(ValueError):
+            pack(SessionState(checkpoint.QUESTION, False, ["R"], "1", stats))
+
+    def test_spill_dir(self):
+        with tempfile.TemporaryDirectory() as path:
+            spill = SpillDir(path)
+            spill.put("abc123", b"record")
+            self.assertEqual(spill.take("abc123"), b"record")
+            with self.assertRaises(FileNotFoundError):
+                spill.take("abc123")
+            spill.discard("abc123")
+            with self.assertRaises(ValueError):
+                spill.put("../x", b"")
+
+    def test_session_restores_mid_worksheet(self):
+        async def main():
+            worksheet = WorksheetRenderer()
+            session = Session(asyncio.StreamReader(), NullWriter(), "s")
+            engine = session.engine
+            engine.filter_pool(["R", "I"])
+            session.types, session.mode, session.phase = ["I", "R"], "4", checkpoint.QUESTION
+            q = engine.generate_question()
+            session.rows = reference_rows(engine, q["instruction"])
+            pipeline = session.pipeline = session._pipeline(q, worksheet)
+            pipeline.start()
+            for answer in (ground_truth(q)["binary"], "0", q["instruction"].type):
+                session.answers.append(answer)
+                pipeline.feed(answer)
+            session.last = b"screen"
+            record = session.checkpoint()
+            restored = Session(asyncio.StreamReader(), NullWriter(), "s")
+            restored.restore(record, worksheet) # its speed is a target in bench/targets.py
+            return session, restored
+
+        session, restored = asyncio.run(main())
+        before, after = session.pipeline, restored.pipeline
+        self.assertEqual((after.step_name, after.prompt), (before.step_name, before.prompt))
+        self.assertEqual(after.sheet.status_log, before.sheet.status_log)
+        self.assertEqual(restored.engine.stats, session.engine.stats)
+        self.assertEqual(restored.engine.pool, session.engine.pool)
+        self.assertEqual((restored.last, restored.answers, restored.restored), (b"screen", session.answers, True))
+        self.assertEqual(after.feed("q"), before.feed("q"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import io
+import os
+import tempfile
+from unittest.mock import patch
+import corpus
+import engine
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "golden.rvgc")
+        corpus.build_corpus(self.path, count=3000, seed=7)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, vectorized):
+        return corpus.check_corpus(self.path, vectorized=vectorized, out=io.StringIO())
+
+    def test_layout(self):
+        self.assertEqual(corpus.RECORD.size, 20)
+        self.assertEqual(os.path.getsize(self.path), corpus.HEADER.size + 3000 * corpus.RECORD.size)
+
+    def test_clean_corpus_stdlib(self):
+        self.assertEqual(self.check(False), [])
+
+    @unittest.skipIf(corpus.np is None, "numpy not installed")
+    def test_clean_corpus_numpy(self):
+        self.assertEqual(self.check(True), [])
+
+    def test_detects_corrupt_record(self):
+        # Flip one bit of record 42's expected word
+        offset = corpus.HEADER.size + 42 * corpus.RECORD.size + corpus.RECORD.size - 4
+        with open(self.path, "r+b") as fh:
+            fh.seek(offset)
+            b = fh.read(1)
+            fh.seek(offset)
+            fh.write(bytes([b[0] ^ 0x80]))
+        self.assertEqual(self.check(False), [42])
+        if corpus.np is not None:
+            self.assertEqual(self.check(True), [42])
+
+    def test_detects_layout_regression(self):
+        # Swap the two B-type single-bit immediates: every non-trivial beq must mismatch
+        plan = list(engine.FIELD_PLANS['B'])
+        plan[0], plan[6] = plan[0][:4] + (11,), plan[6][:4] + (12,)
+        with patch.dict(engine.FIELD_PLANS, {'B': tuple(plan)}):
+            self.assertTrue(self.check(False))
+            if corpus.np is not None:
+                self.assertEqual(self.check(True), self.check(False))
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, "r+b") as fh:
+            fh.write(b"NOPE")
+        with self.assertRaises(ValueError):
+            self.check(False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
-from engine import QuizEngine
-from riscv import Instruction
+import threading
+import riscv
+from engine import QuizEngine, decode_word
+from riscv import Instruction, REGISTRY
 
 class TestEngine(unittest.TestCase):
     def setUp(self):
@@ -26,6 +28,13 @@ class TestEngine(unittest.TestCase):
         self.engine.filter_pool(['R', 'R', 'R'])
         self.assertEqual(len(self.engine.pool), 3) # add, sub, sll
 
+    def test_make_question_leaves_current_question(self):
+        self.engine.filter_pool(['R'])
+        q = self.engine.generate_question()
+        other = self.engine.make_question()
+        self.assertIs(self.engine.current_q, q)
+        self.assertEqual(other["asm"], self.engine.format_asm(other))
+
     def test_generate_question_guards(self):
         # Empty pool
         with self.assertRaises(RuntimeError):
@@ -156,6 +165,27 @@ class TestEngine(unittest.TestCase):
         self.assertEqual(self.engine.stats["success"], 2)
         self.assertEqual(self.engine.stats["attempts"], 3)
 
+    def test_stats_from_32_threads_are_exact(self):
+        self.engine.stats = {"success": 1, "attempts": 1, "points": 2.0, "total_points": 2.0}
+        start = threading.Barrier(32)
+        def grade():
+            start.wait()
+            for n in range(5000):
+                self.engine.record_stats(0.5 if n % 4 else 1.0, 1.0) # exact in binary
+        threads = [threading.Thread(target=grade) for _ in range(32)]
+        for t in threads:
+            t.start()
+        merged_during = self.engine.stats # reads do not stop the writers
+        for t in threads:
+            t.join()
+        self.assertLessEqual(merged_during["attempts"], 1 + 32 * 5000)
+        self.assertEqual(self.engine.stats, {"success": 1 + 32 * 1250, "attempts": 1 + 32 * 5000,
+                                             "points": 2.0 + 32 * (1250 + 3750 * 0.5),
+                                             "total_points": 2.0 + 32 * 5000})
+        stats = self.engine.stats
+        stats["points"] = 0 # a copy
+        self.assertEqual(self.engine.stats["points"], 2.0 + 32 * 3125)
+
     def test_format_asm_R(self):
         ins = Instruction("add", "R", 0x33, 0x0, 0x0)
         q = {"instruction": ins, "rs1": 1, "rs2": 2, "rd": 3, "imm": 0}
@@ -219,5 +249,40 @@ class TestEngine(unittest.TestCase):
             if ins.type in ['B', 'J']:
                 self.assertEqual(q['imm'] % 2, 0, f"Misaligned immediate for {ins.name}: {q['imm']}")
 
+    def test_decode_word_round_trip(self):
+        self.engine.filter_pool(['R', 'I', 'S', 'B', 'U', 'J'])
+        for _ in range(500):
+            q = self.engine.generate_question()
+            d = decode_word(int(self.engine.get_ground_truth()["hex"], 16))
+            self.assertIs(d["instruction"], q["instruction"])
+            self.assertEqual(self.engine.format_asm(d), q["asm"])
+
+    def test_decode_word_known(self):
+        d = decode_word(0x402081B3) # sub x3, x1, x2
+        self.assertEqual((d["instruction"].name, d["rd"], d["rs1"], d["rs2"]), ("sub", 3, 1, 2))
+        self.assertEqual(decode_word(0xFE000EE3)["imm"], -4) # beq x0, x0, -4
+        self.assertIsNone(decode_word(0x00000000))
+        with self.assertRaises(TypeError):
+            decode_word("0x0")
+
+    def test_reload_applies_from_the_next_question(self):
+        self.engine.filter_pool(['U'])
+        pool = self.engine.pool
+        q = self.engine.generate_question()
+        lui2 = Instruction("lui2", "U", 0x37)
+        try:
+            riscv.publish([lui2])
+            self.assertIn(q["instruction"], REGISTRY) # the open question keeps its instruction
+            self.assertIs(self.engine.make_question()["instruction"], lui2)
+            self.assertEqual(self.engine.pool, pool) # drawing never writes the engine (prefetch threads)
+            riscv.publish([i for i in REGISTRY if i.type != "U"])
+            # a reload that empties the filter keeps the filtered pool
+            self.assertIn(self.engine.make_question()["instruction"], pool)
+        finally:
+            riscv.publish(REGISTRY)
+        self.engine.pool = [REGISTRY[0]] # a pool set by hand is left alone
+        self.assertIsNone(self.engine.pool_key)
+        self.assertIs(self.engine.make_question()["instruction"], REGISTRY[0])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import io
+import json
+import random
+import os
+import tempfile
+from unittest.mock import patch
+import headless
+from main import cli
+
+RECALL = {"mode": "recall", "types": "R", "questions": [["R", "funct7 rs2 rs1 funct3 rd opcode"], ["I", "q"]]}
+
+class TestHeadless(unittest.TestCase):
+    def test_per_step_results(self):
+        r = headless.run_session(RECALL, seed=1)
+        first, second = r["questions"]
+        self.assertEqual(first["result"], "done")
+        self.assertEqual([s["step"] for s in first["steps"]], ["type", "layout"])
+        self.assertEqual((first["points"], first["total"]), (7, 7))
+        self.assertEqual(second["result"], "quit")
+        self.assertEqual(len(second["steps"]), 1)
+        self.assertEqual((r["points"], r["total"]), (7, 8))
+
+    def test_seed_reproduces_questions(self):
+        spec = {"mode": "decoding", "answers": ["0" * 32]}
+        state = random.getstate()
+        a = headless.run_session(spec, seed="7:0")
+        b = headless.run_session(spec, seed="7:0")
+        self.assertEqual(a, b)
+        self.assertEqual(random.getstate(), state) # the caller's random state is left alone
+        self.assertEqual(a["questions"][0]["result"], "incomplete")
+
+    def test_encoding_with_correct_answers(self):
+        spec = {"mode": "3", "types": ["U"], "answers": ["U", "imm[31:12] rd opcode"]}
+        q = headless.run_session(spec, seed=0)["questions"][0]
+        self.assertEqual([s["points"] for s in q["steps"]], [1, 3])
+
+    def test_bad_sessions_are_reported(self):
+        results = headless.run_script(['{"mode": "x"}', "", "not json", json.dumps(RECALL)])
+        self.assertEqual([r["session"] for r in results], [0, 1, 2])
+        self.assertIn("error", results[0])
+        self.assertIn("error", results[1])
+        self.assertNotIn("error", results[2])
+
+    def test_cli_writes_results_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            script = os.path.join(tmp, "answers.jsonl")
+            with open(script, "w") as fh:
+                fh.write(json.dumps(RECALL) + "\n")
+            with patch('sys.stdout', new_callable=io.StringIO) as out, patch('main.clear_screen') as clear:
+                with self.assertRaises(SystemExit) as cm:
+                    cli(["--script", script, "--seed", "5"])
+            self.assertEqual(cm.exception.code, 0)
+            clear.assert_not_called()
+            lines = out.getvalue().splitlines()
+            self.assertEqual(len(lines), 1)
+            self.assertEqual(json.loads(lines[0])["mode"], "recall")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,7 @@ class TestInputGuards(unittest.TestCase):
         # Single-attempt: extra field -> feedback shown immediately, no retry
         mock_input.side_effect = ["R", "1", "R", "funct7 rs2 rs1 funct3 rd opcode extra", "n", "q", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("add", "R", 0x33, 0x0, 0x0)
             mock_choice.return_value = ins
             
@@ -35,7 +35,7 @@ class TestInputGuards(unittest.TestCase):
         # Single-attempt: extra bit -> feedback shown immediately, no retry
         mock_input.side_effect = ["I", "2", "I", "12 5 3 5 7 99", "n", "q", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("addi", "I", 0x13, 0x0)
             mock_choice.return_value = ins
             
@@ -0,0 +1,91 @@
+import unittest
+import os
+import random
+import tempfile
+import io
+import legality
+import main
+import riscv
+from unittest.mock import patch
+from engine import QuizEngine, decode_word, encode_word
+
+class TestLegality(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Three funct7 shards (files stay sparse): f7=0 covers most opcodes, 0x20 holds sub
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.prefix = os.path.join(cls.tmp.name, "legality")
+        cls.shards = [0x00, 0x20, 0x7F]
+        cls.total = legality.build_map(cls.prefix, with_ids=True, workers=1, shards=cls.shards)
+        cls.lmap = legality.LegalityMap(cls.prefix)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.lmap.close()
+        cls.tmp.cleanup()
+
+    def words(self, n):
+        rng = random.Random(3)
+        for _ in range(n):
+            yield (rng.choice(self.shards) << 25) | rng.getrandbits(25)
+
+    def test_total_legal_words(self):
+        # R: 3 x 2^15, I/S/B: 4 x 2^22, U/J: 3 x 2^25
+        self.assertEqual(self.total, 3 * (1 << 15) + 4 * (1 << 22) + 3 * (1 << 25))
+        self.assertEqual(os.path.getsize(self.prefix + ".bitmap"), 1 << 29)
+
+    def test_bitmap_matches_decoder(self):
+        for word in self.words(20000):
+            self.assertEqual(self.lmap.is_legal(word), decode_word(word) is not None, hex(word))
+
+    def test_instruction_ids(self):
+        for word in self.words(5000):
+            d = decode_word(word)
+            self.assertIs(self.lmap.instruction(word), d["instruction"] if d else None, hex(word))
+
+    def test_generated_questions_are_legal(self):
+        engine = QuizEngine()
+        engine.filter_pool(['R', 'I', 'S', 'B', 'U', 'J'])
+        for _ in range(500):
+            q = engine.generate_question()
+            word = encode_word(q)
+            if word >> 25 in self.shards:
+                self.assertIs(self.lmap.instruction(word), q["instruction"])
+
+    def test_stale_registry_rejected(self):
+        with open(self.prefix + ".json") as fh:
+            meta = fh.read()
+        stale = os.path.join(self.tmp.name, "stale")
+        with open(stale + ".json", "w") as fh:
+            fh.write(meta.replace(legality.registry_fingerprint(), "0" * 40))
+        with self.assertRaises(ValueError):
+            legality.LegalityMap(stale)
+
+    def test_probes_into_unbuilt_shards_raise(self):
+        self.assertEqual(len(self.lmap.missing), legality.SHARDS - len(self.shards))
+        word = encode_word({"instruction": riscv.REGISTRY[0], "rd": 1, "rs1": 2, "rs2": 3, "imm": 0}) | (0x01 << 25)
+        for probe in (self.lmap.is_legal, self.lmap.instruction):
+            with self.assertRaises(RuntimeError):
+                probe(word)
+
+    def test_probe_rejects_bad_words(self):
+        for raw in ("zz", "1ffffffff", "-1"):
+            with patch('sys.stderr', new_callable=io.StringIO) as err, \
+                 patch('legality.LegalityMap') as lmap:
+                with self.assertRaises(SystemExit) as cm:
+                    main.cli(["legality", "probe", "003100b3", raw, "--prefix", self.prefix])
+            self.assertEqual(cm.exception.code, 2)
+            self.assertIn(repr(raw), err.getvalue())
+            lmap.assert_not_called()
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            with self.assertRaises(SystemExit):
+                main.cli(["legality", "probe", "003100b3", "--prefix", self.prefix])
+        self.assertEqual(out.getvalue(), "003100b3: legal (add)\n")
+
+    def test_registry_must_fit_one_byte_ids(self):
+        with patch('legality.REGISTRY', riscv.REGISTRY * 30):
+            with self.assertRaises(ValueError):
+                legality.key_table()
+
+if __name__ == '__main__':
+    unittest.main()
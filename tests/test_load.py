@@ -0,0 +1,39 @@
+import unittest
+import asyncio
+import os
+from server import TutorServer
+from bench import load
+
+class TestLoad(unittest.TestCase):
+    def run_load(self, **kw):
+        async def main():
+            srv = TutorServer(port=0)
+            await srv.start()
+            try:
+                return await load.run_load("127.0.0.1", srv.port, modes=list(load.MODES), **kw)
+            finally:
+                await srv.close()
+        return asyncio.run(asyncio.wait_for(main(), 60))
+
+    def test_oracle_students_score_full_marks(self):
+        doc = self.run_load(students=12, questions=4, server_pid=os.getpid())
+        self.assertEqual(doc["failures"], [])
+        self.assertEqual(doc["accuracy"], 1.0)
+        self.assertEqual(doc["steps"]["decoding.assembly"]["count"], 12)
+        self.assertEqual(doc["answers"], 3 * 4 * (2 + 2 + 4 + 6))
+        for r in doc["steps"].values():
+            self.assertLessEqual(r["p50_ms"], r["p999_ms"])
+        if os.path.exists("/proc/self/status"):
+            self.assertTrue(doc["memory_kib"])
+        self.assertIn("answers/s", load.format_report(doc))
+
+    def test_error_rate_and_think_time(self):
+        doc = self.run_load(students=4, questions=2, error_rate=1.0, think="uniform:0:0.005")
+        self.assertEqual(doc["failures"], [])
+        self.assertEqual(doc["accuracy"], 0.0)
+        for spec in ("exp", "gauss:1", "uniform:1"):
+            with self.assertRaises(ValueError):
+                load.think_time(spec)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,7 @@ class TestMain(unittest.TestCase):
         # Note: Enter for ALL = ""
         mock_input.side_effect = ["", "1", "R", "funct7 rs2 rs1 funct3 rd opcode", "n", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("add", "R", 0x33, 0x0, 0x0)
             mock_choice.return_value = ins
             
@@ -33,7 +33,7 @@ class TestMain(unittest.TestCase):
         # Flow: Types (I), Mode (2), Step 1: Type (I), Step 2: Bits (12 5 3 5 7), Continue (n), Types Exit (q)
         mock_input.side_effect = ["I", "2", "I", "12 5 3 5 7", "n", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("addi", "I", 0x13, 0x0)
             mock_choice.return_value = ins
             
@@ -49,7 +49,7 @@ class TestMain(unittest.TestCase):
         # Flow: Types (I), Mode (2), Step 1: Type (I), Step 2: Bad Answer, Continue (n), Types Exit (q)
         mock_input.side_effect = ["I", "2", "I", "not numbers", "n", "q", "q", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("addi", "I", 0x13, 0x0)
             mock_choice.return_value = ins
             
@@ -87,7 +87,7 @@ class TestMain(unittest.TestCase):
         # Q2: Type (I), Bits (Fail), Continue (n), Quit
         mock_input.side_effect = ["all", "2", "I", "12 5 3 5 7", "y", "I", "0 0 0 0 0", "n", "q", "q", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("addi", "I", 0x13, 0x0)
             mock_choice.return_value = ins
             
@@ -104,7 +104,7 @@ class TestMain(unittest.TestCase):
         # Flow: Types (r,i), Mode (1), Answer Type (r), Mixed-Case Fields, Continue (n), Types Exit (q)
         mock_input.side_effect = ["R,i", "1", "r", "FUNCT7 rs2 RS1 funct3 rd OPCODE", "n", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("add", "R", 0x33, 0x0, 0x0)
             mock_choice.return_value = ins
             
@@ -120,7 +120,7 @@ class TestMain(unittest.TestCase):
         # Flow: Types (all), Mode (1), Type(R), Fields(OK), Continue (n) -> Mode (2), Type(I), Bits(OK), Continue (n) -> Mode Exit (q) -> Types Exit (q)
         mock_input.side_effect = ["all", "1", "R", "funct7 rs2 rs1 funct3 rd opcode", "n", "2", "I", "12 5 3 5 7", "n", "q", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins_r = Instruction("add", "R", 0x33, 0x0, 0x0)
             ins_i = Instruction("addi", "I", 0x13, 0x0)
             mock_choice.side_effect = [ins_r, ins_i]
@@ -137,7 +137,7 @@ class TestMain(unittest.TestCase):
     def test_main_encoding_quit_midway(self, mock_stdout, mock_input):
         # Flow: Types (all), Mode (3), Step 1 (q), Mode Exit (q), Types Exit (q)
         mock_input.side_effect = ["all", "3", "q", "q", "q"]
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             mock_choice.return_value = Instruction("add", "R", 0x33, 0x0, 0x0)
             with self.assertRaises(SystemExit):
                 main()
@@ -220,7 +220,7 @@ class TestMain(unittest.TestCase):
         # S-Type has 6 fields. User enters 7.
         mock_input.side_effect = ["S", "1", "S", "imm[11:5] rs2 rs1 funct3 rs imm[4:0] opcode", "n", "q", "q", "q"]
         
-        with patch('engine.random.choice') as mock_choice:
+        with patch('random.Random.choice') as mock_choice:
             ins = Instruction("sw", "S", 0x23, 0x2)
             mock_choice.return_value = ins
             
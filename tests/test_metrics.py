@@ -0,0 +1,92 @@
+import unittest
+import asyncio
+import threading
+import metrics
+import engine
+import pipeline
+from metrics import Counter, Histogram
+from engine import QuizEngine
+from server import TutorServer
+
+class TestMetrics(unittest.TestCase):
+    def test_render_format(self):
+        c = Counter("t_total", "Help.", ("mode",))
+        c.inc(("recall",))
+        c.inc(("recall",), 2)
+        h = Histogram("t_seconds", "Help.", ("call",), buckets=(0.1, 1.0))
+        for v in (0.05, 0.5, 5.0):
+            h.observe(("x",), v)
+        old = metrics.FAMILIES
+        metrics.FAMILIES = [c, h]
+        try:
+            text = metrics.render()
+        finally:
+            metrics.FAMILIES = old
+        self.assertIn("# TYPE t_total counter\nt_total{mode=\"recall\"} 3\n", text)
+        self.assertIn('t_seconds_bucket{call="x",le="0.1"} 1\n', text)
+        self.assertIn('t_seconds_bucket{call="x",le="1.0"} 2\n', text)
+        self.assertIn('t_seconds_bucket{call="x",le="+Inf"} 3\n', text)
+        self.assertIn('t_seconds_count{call="x"} 3\n', text)
+
+    def test_thread_shards_sum_exactly(self):
+        c = Counter("t_total", "Help.")
+        h = Histogram("t_seconds", "Help.")
+        def work():
+            for _ in range(5000):
+                c.inc()
+                h.observe((), 0.001)
+        threads = [threading.Thread(target=work) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(c.values()[()], 80000)
+        self.assertEqual(h.values()[()][-1], 80000)
+
+    def test_instrument_wraps_and_restores(self):
+        original = QuizEngine.__dict__["generate_question"]
+        metrics.instrument()
+        try:
+            self.assertIsNot(QuizEngine.__dict__["generate_question"], original)
+            before = metrics.CALL_SECONDS.values().get(("generate_question",), [0])[-1]
+            parse_failures = metrics.ASM_PARSE_FAILURES.values().get((), 0)
+            e = QuizEngine()
+            e.filter_pool(["R"])
+            q = e.generate_question()
+            pipeline.validate_asm_strict("add x1 x2", q["instruction"], {})
+            self.assertEqual(metrics.CALL_SECONDS.values()[("generate_question",)][-1], before + 1)
+            self.assertEqual(metrics.ASM_PARSE_FAILURES.values()[()], parse_failures + 1)
+        finally:
+            metrics.uninstrument()
+        self.assertIs(QuizEngine.__dict__["generate_question"], original)
+        self.assertFalse(hasattr(engine.ground_truth, "__wrapped__"))
+
+    def test_server_metrics_endpoint(self):
+        async def fetch(port, path):
+            r, w = await asyncio.open_connection("127.0.0.1", port)
+            w.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            data = (await r.read()).decode()
+            w.close()
+            return data
+
+        async def main():
+            srv = TutorServer(port=0, metrics_port=0)
+            await srv.start()
+            before = metrics.GRADES.values().get(("recall", "type"), 0)
+            r, w = await asyncio.open_connection("127.0.0.1", srv.port)
+            await r.readuntil(b"> ")
+            for line in (b"U\n", b"1\n", b"U\n"):
+                w.write(line)
+                await r.readuntil(b"> ")
+            text = await fetch(srv.metrics_port, "/metrics")
+            self.assertTrue(text.startswith("HTTP/1.1 200 OK"))
+            self.assertIn('rvtutor_questions_total{mode="recall",type="U"}', text)
+            self.assertIn("rvtutor_sessions 1\n", text)
+            self.assertEqual(metrics.GRADES.values()[("recall", "type")], before + 1)
+            self.assertIn("404", (await fetch(srv.metrics_port, "/nope")).split("\r\n")[0])
+            w.close()
+            await srv.close()
+        asyncio.run(asyncio.wait_for(main(), 30))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from engine import QuizEngine
+from render import WorksheetRenderer
+from pipeline import (RecallPipeline, BitsPipeline, EncodingPipeline, DecodingPipeline,
+                      CLEAR, TEXT, FRAME, PROMPT, GRADE)
+from bench.oracle import encoding_answers, decoding_answers, recall_answers, bits_answers
+
+def run(pipeline, answers):
+    """Feeds answers until the pipeline finishes; returns every event."""
+    events = pipeline.start()
+    for answer in answers:
+        if pipeline.done:
+            break
+        events += pipeline.feed(answer)
+    return events
+
+class TestPipelines(unittest.TestCase):
+    def setUp(self):
+        self.engine = QuizEngine()
+        self.engine.filter_pool(['R', 'I', 'S', 'B', 'U', 'J'])
+        self.q = self.engine.generate_question()
+
+    def assertPerfect(self, pipeline, answers):
+        events = run(pipeline, answers)
+        self.assertTrue(pipeline.done)
+        self.assertTrue(pipeline.result)
+        self.assertEqual(pipeline.points, pipeline.total)
+        self.assertEqual(self.engine.stats["points"], self.engine.stats["total_points"])
+        steps = [e[1] for e in events if e[0] == GRADE]
+        self.assertEqual(steps[0], pipeline.STEPS[0])
+        self.assertEqual(steps[-1], pipeline.STEPS[-1])
+        return events
+
+    def test_encoding_oracle_scores_everything(self):
+        events = self.assertPerfect(EncodingPipeline(self.engine, self.q), encoding_answers(self.engine, self.q))
+        self.assertEqual(events[0], (CLEAR,))
+        self.assertEqual(sum(1 for e in events if e[0] == PROMPT), 4)
+
+    def test_decoding_oracle_scores_everything(self):
+        p = DecodingPipeline(self.engine, self.q, WorksheetRenderer())
+        events = self.assertPerfect(p, decoding_answers(self.engine, self.q))
+        self.assertTrue(all(e[0] in (FRAME, PROMPT, GRADE) for e in events))
+        self.assertEqual(events[-1][1][-1], f"Assembly: {self.q['asm']}")
+
+    def test_recall_and_bits_oracle(self):
+        self.assertPerfect(RecallPipeline(self.engine, self.q, "Mode: Recall"), recall_answers(self.q))
+        self.assertPerfect(BitsPipeline(self.engine, self.q, "Mode: Bits"), bits_answers(self.q))
+
+    def test_prompt_is_last_event_of_each_batch(self):
+        p = EncodingPipeline(self.engine, self.q)
+        batch = p.start()
+        self.assertEqual(batch[-1], (PROMPT, p.prompt))
+        batch = p.feed("X")
+        self.assertIn((TEXT, f"Answer: {self.q['instruction'].type}"), batch)
+        self.assertEqual(batch[-1][0], PROMPT)
+        self.assertEqual(p.step_name, "layout")
+
+    def test_quit_paths(self):
+        p = EncodingPipeline(self.engine, self.q)
+        p.start()
+        self.assertEqual(p.feed("  "), [])   # empty quits encoding
+        self.assertTrue(p.done)
+        self.assertFalse(p.result)
+
+        p = RecallPipeline(self.engine, self.q, "Mode: Recall")
+        p.start()
+        p.feed("")                            # empty is graded as wrong in recall
+        self.assertFalse(p.done)
+        p.feed("QUIT")
+        self.assertFalse(p.result)
+
+    def test_guards(self):
+        p = BitsPipeline(self.engine, self.q, "Mode: Bits")
+        with self.assertRaises(RuntimeError):
+            p.feed("R")                       # not started
+        p.start()
+        with self.assertRaises(RuntimeError):
+            p.start()
+        with self.assertRaises(TypeError):
+            p.feed(None)
+        p.feed("q")
+        with self.assertRaises(RuntimeError):
+            p.feed("R")
+
+if __name__ == '__main__':
+    unittest.main()
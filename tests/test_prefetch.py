@@ -0,0 +1,76 @@
+import unittest
+import time
+from unittest.mock import patch
+from engine import QuizEngine, ground_truth
+from prefetch import Prefetcher
+from riscv import Instruction
+from pipeline import reference_rows
+
+class TestPrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.engine = QuizEngine()
+        self.engine.filter_pool(['R', 'I', 'S', 'B', 'U', 'J'])
+        self.p = Prefetcher(self.engine, depth=2)
+
+    def tearDown(self):
+        self.p.close()
+
+    def test_next_sets_current_question_and_truth(self):
+        item = self.p.next()
+        self.assertIs(self.engine.current_q, item.question)
+        self.assertEqual(item.truth, ground_truth(item.question))
+        self.assertEqual(item.truth, self.engine.get_ground_truth())
+        self.assertIsNone(item.extra)
+
+    def test_prepare_hook_runs_ahead(self):
+        self.p.set_prepare(lambda q, truth, rng: (q["asm"], truth["hex"]))
+        item = self.p.next()
+        self.assertEqual(item.extra, (item.question["asm"], item.truth["hex"]))
+
+    def test_questions_come_out_in_generation_order(self):
+        add = Instruction("add", "R", 0x33, 0x0, 0x0)
+        addi = Instruction("addi", "I", 0x13, 0x0)
+        with patch('random.Random.choice', side_effect=[add, addi]):
+            self.assertIs(self.p.next().question["instruction"], add)
+            self.assertIs(self.p.next().question["instruction"], addi)
+            # Side effects are exhausted: the worker's error reaches the consumer
+            with self.assertRaises(StopIteration):
+                self.p.next()
+            self.p.close()
+
+    def test_seeded_sequence_does_not_depend_on_timing(self):
+        def prepare(q, truth, rng):
+            return reference_rows(self.engine, q["instruction"], rng)
+        def run(p, early):
+            if not early: # let the first questions be built without the hook
+                p.next()
+                while len(p._ready) < p.depth:
+                    time.sleep(0.001)
+            p.set_prepare(prepare)
+            if early:
+                p.next()
+            out = [(item.question["asm"], item.extra) for item in (p.next() for _ in range(3))]
+            p.close()
+            return out
+        a = run(Prefetcher(self.engine, seed=7), early=True)
+        b = run(Prefetcher(self.engine, seed=7), early=False)
+        self.assertEqual(a, b)
+        self.assertTrue(all(rows for _, rows in a))
+
+    def test_reset_drops_questions_from_the_old_pool(self):
+        self.engine.filter_pool(['U'])
+        self.p.next()
+        self.engine.filter_pool(['R'])
+        self.p.reset()
+        for _ in range(5):
+            self.assertEqual(self.p.next().question["instruction"].type, 'R')
+
+    def test_guards(self):
+        with self.assertRaises(ValueError):
+            Prefetcher(self.engine, depth=0)
+        self.p.close()
+        with self.assertRaises(RuntimeError):
+            self.p.next()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import io
+import json
+import os
+import pstats
+import tempfile
+import tracemalloc
+import headless
+import main
+from profiling import Profiler
+
+SESSION = {"mode": "recall", "types": "R", "questions": [["R", "funct7 rs2 rs1 funct3 rd opcode"], ["I", "q"]]}
+
+class TestProfiling(unittest.TestCase):
+    def test_profiles_questions_and_saves_reports(self):
+        run_question, drive = headless.run_question, main.drive
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, "prof")
+            profiler = Profiler(prefix, top=5)
+            profiler.start(main)
+            try:
+                headless.run_script([json.dumps(SESSION)], seed=3)
+            finally:
+                out = io.StringIO()
+                profiler.stop(out)
+            self.assertIs(headless.run_question, run_question)
+            self.assertIs(main.drive, drive)
+            self.assertFalse(tracemalloc.is_tracing())
+
+            report = out.getvalue()
+            self.assertIn("cumulative", report)
+            self.assertIn("run_session", report)
+            self.assertIn("allocation sites", report)
+            self.assertIn("prof.pstats", report)
+            stats = pstats.Stats(prefix + ".pstats")
+            self.assertTrue(any(fn == "run_question" for _, _, fn in stats.stats))
+            with open(prefix + ".alloc.txt") as fh:
+                alloc = fh.read()
+            self.assertIn("== run: 2 questions", alloc)
+            self.assertIn("== question 1: RecallPipeline", alloc)
+            self.assertIn("== question 2: RecallPipeline", alloc)
+            self.assertNotIn("profiling.py", alloc)
+
+    def test_top_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            Profiler(top=0)
+
+if __name__ == '__main__':
+    unittest.main()
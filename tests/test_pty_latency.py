@@ -0,0 +1,17 @@
+import unittest
+import os
+
+@unittest.skipIf(os.name != "posix", "pty benchmark is POSIX only")
+class TestPtyLatency(unittest.TestCase):
+    def test_report_per_mode(self):
+        from bench import pty_latency
+        doc = pty_latency.run_report(["recall", "decoding"], questions=2)
+        for mode, keys_per_q in [("recall", 3), ("decoding", 7)]:
+            r = doc["modes"][mode]
+            self.assertEqual(r["keystrokes"], 2 * keys_per_q)
+            self.assertGreater(r["bytes_per_question"], 0)
+            self.assertLessEqual(r["latency_ms"]["p50"], r["latency_ms"]["max"])
+        self.assertIn("decoding", pty_latency.format_report(doc, doc))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import io
+import os
+from unittest.mock import patch, MagicMock
+from render import FrameRenderer, WorksheetRenderer, ALT_SCREEN_ON, ALT_SCREEN_OFF, HOME_CLEAR, PROMPT_ROWS
+from riscv import REGISTRY
+
+class FakeTTY(io.StringIO):
+    def isatty(self):
+        return True
+
+@patch('render.shutil.get_terminal_size', return_value=os.terminal_size((80, 40)))
+@patch('render.os.name', 'posix')
+class TestFrameRenderer(unittest.TestCase):
+    def setUp(self):
+        self.out = FakeTTY()
+        self.r = FrameRenderer(self.out)
+
+    def take(self):
+        s = self.out.getvalue()
+        self.out.seek(0)
+        self.out.truncate()
+        return s
+
+    def test_first_frame_is_full_on_alternate_screen(self, *_):
+        self.r.render(["a", "b"])
+        s = self.take()
+        self.assertTrue(s.startswith(ALT_SCREEN_ON + HOME_CLEAR))
+        self.assertIn("a\nb\n", s)
+
+    def test_only_changed_lines_are_sent(self, *_):
+        self.r.render(["title", "same", "old"])
+        self.take()
+        self.r.render(["title", "same", "new"])
+        s = self.take()
+        self.assertEqual(s, "\033[3;1Hnew\033[K\033[4;1H\033[J")
+
+    def test_identical_frame_only_parks_cursor(self, *_):
+        self.r.render(["x"])
+        self.take()
+        self.assertEqual(self.r.render(["x"]), len("\033[2;1H\033[J"))
+
+    def test_shrinking_frame_clears_below(self, *_):
+        self.r.render(["a", "b", "c"])
+        self.take()
+        self.r.render(["a"])
+        self.assertEqual(self.take(), "\033[2;1H\033[J")
+
+    def test_invalidate_forces_full_redraw(self, *_):
+        self.r.render(["a"])
+        self.take()
+        self.r.invalidate()
+        self.r.render(["a"])
+        self.assertEqual(self.take(), HOME_CLEAR + "a\n")
+
+    def test_tall_frame_redraws_in_full(self, term, *_):
+        self.r.render(["a"] * 10)
+        self.take()
+        term.return_value = os.terminal_size((80, 12))
+        self.r.render(["a"] * 10)
+        self.assertTrue(self.take().startswith(HOME_CLEAR))
+
+    def test_frame_filling_all_but_the_prompt_rows_redraws_in_full(self, *_):
+        self.r.render(["a"])
+        self.take()
+        self.r.render(["a"] * (40 - PROMPT_ROWS)) # the Enter after the prompt would scroll it
+        self.assertTrue(self.take().startswith(HOME_CLEAR))
+        self.r.render(["b"] * (39 - PROMPT_ROWS))
+        self.assertFalse(self.take().startswith(HOME_CLEAR))
+
+    def test_leave_restores_primary_screen(self, *_):
+        self.r.leave()
+        self.assertEqual(self.take(), "")
+        self.r.render(["a"])
+        self.take()
+        self.r.leave()
+        self.assertEqual(self.take(), ALT_SCREEN_OFF)
+        self.assertFalse(self.r.active)
+
+    def test_plain_stream_clears_and_reprints(self, *_):
+        clear = MagicMock()
+        out = io.StringIO()
+        r = FrameRenderer(out, clear=clear)
+        r.render(["a", "b"])
+        r.render(["a", "b"])
+        self.assertEqual(out.getvalue(), "a\nb\na\nb\n")
+        self.assertEqual(clear.call_count, 2)
+
+class TestWorksheetRenderer(unittest.TestCase):
+    def setUp(self):
+        self.ins = next(i for i in REGISTRY if i.name == "add")
+        sub = next(i for i in REGISTRY if i.name == "lw")
+        rows = [("add", self.ins.op, "0", "0", "R"), ("lw", sub.op, "2", "-", "I")]
+        truth = {"hex": "003100B3", "binary": "0" * 32}
+        self.ws = WorksheetRenderer(FrameRenderer(io.StringIO()))
+        self.sheet = self.ws.prepare(self.ins, truth, rows, "add x1, x2, x3", 6)
+
+    def test_reference_table_filters_and_caches(self):
+        full = self.sheet.ref_table()
+        self.assertEqual(len(full), 5)
+        only = self.sheet.ref_table("R", self.ins.op)
+        self.assertEqual(len(only), 4)
+        self.assertTrue(only[-1].startswith("add"))
+        self.assertIs(self.sheet.ref_table("R", self.ins.op), only)
+
+    def test_sections_rebuild_only_when_state_changes(self):
+        a = self.ws.frame(self.sheet, "Step 1", show_nibbles=True)
+        cached = self.sheet._memo["nibbles"]
+        b = self.ws.frame(self.sheet, "Step 1", show_nibbles=True)
+        self.assertEqual(a, b)
+        self.assertIs(self.sheet._memo["nibbles"], cached)
+        self.sheet.nibble_bins[0] = "0000"
+        c = self.ws.frame(self.sheet, "Step 1", show_nibbles=True)
+        self.assertIn("Binary: 0000 ", c[-2])
+
+    def test_progress_and_assembly(self):
+        self.sheet.solved_names[0] = "funct7"
+        self.sheet.status_log.append("opcode OK")
+        lines = self.ws.frame(self.sheet, "Step 7", show_fields=True, show_vals=True, show_asm=True)
+        self.assertIn("Progress:", lines)
+        self.assertIn("  opcode OK", lines)
+        self.assertEqual(lines[-1], "Assembly: add x1, x2, x3")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,10 @@
 import unittest
-from riscv import Instruction, Swizzler, REGISTRY
+import json
+import os
+import tempfile
+import threading
+import riscv
+from riscv import Instruction, Swizzler, REGISTRY, Registry
 
 class TestRISCV(unittest.TestCase):
     def test_instruction_init(self):
@@ -100,5 +105,62 @@ class TestRISCV(unittest.TestCase):
         res = Swizzler.j_type(0)
         self.assertEqual(res, ["0", "0000000000", "0", "00000000"])
 
+    def test_registry_snapshot(self):
+        registry = Registry(REGISTRY)
+        self.assertEqual(len(registry.pools), 64) # every set of the six types
+        self.assertEqual([i.name for i in registry.pools[("R", "U")]], ["add", "sub", "sll", "lui", "auipc"])
+        self.assertEqual(registry.pools[()], ())
+        self.assertIs(registry.by_name["beq"], REGISTRY[6])
+        with self.assertRaises(TypeError):
+            registry.by_name["nop"] = REGISTRY[0]
+        with self.assertRaises(ValueError):
+            Registry(REGISTRY + [Instruction("add", "R", 0x33, 0, 0)])
+        with self.assertRaises(ValueError):
+            Registry([])
+
+    def test_reload_publishes_a_new_snapshot(self):
+        original = riscv.current()
+        entries = [[i.name, i.type, i.op, i.f3, i.f7] for i in REGISTRY] + [["xor", "R", 0x33, 4, 0]]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "registry.json")
+            with open(path, "w") as fh:
+                json.dump(entries, fh)
+            try:
+                registry = riscv.reload(path)
+                self.assertIs(riscv.current(), registry)
+                self.assertEqual(registry.version, original.version + 1)
+                self.assertEqual(len(registry.pools[("R",)]), 4)
+                self.assertEqual(len(original.pools[("R",)]), 3) # the old snapshot is untouched
+                for bad in ('{"add": 1}', '[["nop", "X", 1]]', '[["nop"]]', "not json"):
+                    with open(path, "w") as fh:
+                        fh.write(bad)
+                    with self.assertRaises(ValueError):
+                        riscv.reload(path)
+                self.assertIs(riscv.current(), registry)
+            finally:
+                riscv.publish(REGISTRY)
+
+    def test_readers_see_whole_snapshots_during_reloads(self):
+        small, full = REGISTRY[:3], list(REGISTRY)
+        stop, torn = threading.Event(), []
+        def read():
+            while not stop.is_set():
+                registry = riscv.current()
+                pool = registry.pools[("I", "R")]
+                if any(registry.by_name.get(i.name) is not i for i in pool):
+                    torn.append(registry.version)
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for t in readers:
+            t.start()
+        try:
+            for n in range(200):
+                riscv.publish(small if n % 2 else full)
+        finally:
+            stop.set()
+            for t in readers:
+                t.join()
+            riscv.publish(REGISTRY)
+        self.assertEqual(torn, [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+import sampler
+from sampler import Sampler
+from server import TutorServer
+
+def spin_in_named_function(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+class TestSampler(unittest.TestCase):
+    def test_collapsed_stacks_name_the_busy_thread(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=spin_in_named_function, args=(stop,), name="busy")
+        worker.start()
+        try:
+            prof = sampler.profile(0.3, hz=200)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertFalse(prof.running)
+        self.assertNotIn("rvtutor-sampler", [t.name for t in threading.enumerate()])
+        lines = prof.collapsed().splitlines()
+        busy = [l for l in lines if l.startswith("busy;")]
+        self.assertTrue(busy)
+        self.assertTrue(all("test_sampler.py:spin_in_named_function" in l for l in busy))
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+            self.assertNotIn("sampler.py:_run", stack) # the sampler never samples itself
+        # every sample sees the busy thread exactly once
+        self.assertEqual(sum(int(l.rsplit(" ", 1)[1]) for l in busy), prof.samples)
+        self.assertGreater(prof.samples, 20)
+        self.assertTrue(0 < prof.overhead < 1) # its target is in bench/targets.py
+
+    def test_guards(self):
+        with self.assertRaises(ValueError):
+            Sampler(hz=0)
+        with self.assertRaises(ValueError):
+            sampler.profile(0)
+        prof = Sampler()
+        prof.start()
+        try:
+            with self.assertRaises(RuntimeError):
+                prof.start()
+        finally:
+            prof.stop()
+        prof.stop() # idempotent
+
+    def test_server_profile_endpoint(self):
+        async def fetch(port, path):
+            r, w = await asyncio.open_connection("127.0.0.1", port)
+            w.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            data = (await r.read()).decode()
+            w.close()
+            return data
+
+        async def main():
+            srv = TutorServer(port=0, metrics_port=0)
+            await srv.start()
+            first = asyncio.ensure_future(fetch(srv.metrics_port, "/profile?seconds=0.3&hz=100"))
+            await asyncio.sleep(0.1)
+            busy = await fetch(srv.metrics_port, "/profile?seconds=0.1")
+            self.assertTrue(busy.startswith("HTTP/1.1 409"))
+            text = await first
+            head, body = text.split("\r\n\r\n", 1)
+            self.assertTrue(head.startswith("HTTP/1.1 200 OK"))
+            self.assertIn("X-Sampler-Overhead:", head)
+            self.assertIn("MainThread;", body) # the event loop, parked in select
+            self.assertIn(" ", body.splitlines()[0])
+            bad = await fetch(srv.metrics_port, "/profile?seconds=-1")
+            self.assertTrue(bad.startswith("HTTP/1.1 400"))
+            bad = await fetch(srv.metrics_port, "/profile?hz=abc")
+            self.assertTrue(bad.startswith("HTTP/1.1 400"))
+            with patch('server._on_loopback', return_value=False): # a student on the lab network
+                self.assertTrue((await fetch(srv.metrics_port, "/profile?seconds=0.1")).startswith("HTTP/1.1 403"))
+                self.assertTrue((await fetch(srv.metrics_port, "/metrics")).startswith("HTTP/1.1 200"))
+            await srv.close()
+        asyncio.run(asyncio.wait_for(main(), 30))
+
+if __name__ == '__main__':
+    unittest.main()
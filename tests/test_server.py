@@ -0,0 +1,441 @@
+import unittest
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+import riscv
+import server
+import takeover
+from server import TutorServer, Session, session_owner, new_session_id
+from render import WorksheetRenderer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def connect(port):
+    r, w = await asyncio.open_connection("127.0.0.1", port)
+    await r.readuntil(b"> ")              # types prompt
+    return r, w
+
+async def answer(r, w, line):
+    w.write(line.encode() + b"\n")
+    return (await r.readuntil(b"> ")).decode()
+
+class NullWriter:
+    """A connection that takes every write; stands in for sockets in the memory budget test."""
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+# Traced bytes per waiting session, including its task, reader and coroutine frames
+SESSION_BUDGETS = [("types prompt", b"", 3584), ("encoding question", b"\n3\nR\n", 5632),
+                   ("decoding worksheet", b"\n4\n", 8192)]
+
+class TestServer(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(asyncio.wait_for(coro, 30))
+
+    def test_concurrent_recall_sessions(self):
+        async def student(port):
+            r, w = await connect(port)
+            await answer(r, w, "R")        # mode menu
+            text = await answer(r, w, "1") # first question
+            self.assertIn("Mode: Recall", text)
+            self.assertIn("What instruction type is this?", text)
+            await answer(r, w, "R")
+            w.write(b"funct7 rs2 rs1 funct3 rd opcode\n")
+            text = (await r.readuntil(b"[Y/n]: ")).decode()
+            self.assertIn("Accuracy: 7.00/7.00", text)
+            self.assertIn("\r\n", text)
+            w.write(b"n\n")
+            await r.readuntil(b"> ")       # back at the mode menu
+            w.write(b"q\n")
+            self.assertIn(b"Goodbye.", await r.read())
+            w.close()
+
+        async def main():
+            srv = TutorServer(port=0)
+            await srv.start()
+            await asyncio.gather(*[student(srv.port) for _ in range(50)])
+            self.assertEqual(len(srv.sessions), 0)
+            await srv.close()
+        self.run_async(main())
+
+    def test_decoding_frames_and_hangup(self):
+        async def main():
+            srv = TutorServer(port=0)
+            await srv.start()
+            r, w = await connect(srv.port)
+            await answer(r, w, "")
+            text = await answer(r, w, "4")
+            self.assertIn("Mode: Decoding - Step 1: Hex to Binary", text)
+            self.assertEqual(len(srv.sessions), 1)
+            w.close()
+            for _ in range(100):
+                if not srv.sessions:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(len(srv.sessions), 0)
+            await srv.close()
+        self.run_async(main())
+
+    def test_session_cap_and_long_lines(self):
+        async def main():
+            srv = TutorServer(port=0, max_sessions=1)
+            await srv.start()
+            r, w = await connect(srv.port)
+            r2, w2 = await asyncio.open_connection("127.0.0.1", srv.port)
+            self.assertIn(b"Server full", await r2.read())
+            w2.close()
+            w.write(b"x" * (server.MAX_LINE * 2) + b"\n")
+            self.assertEqual(await r.read(), b"") # dropped
+            w.close()
+            await srv.close()
+        self.run_async(main())
+
+    def test_memory_per_session(self):
+        async def main():
+            srv = TutorServer(port=0)
+            await srv.start()
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                conns = []
+                for _ in range(200):
+                    r, w = await connect(srv.port)
+                    await answer(r, w, "")
+                    await answer(r, w, "3")
+                    conns.append((r, w))
+                per_session = (tracemalloc.get_traced_memory()[0] - before) / 200
+            finally:
+                tracemalloc.stop()
+            # Client and server ends both live in this process
+            self.assertLess(per_session, 48 * 1024)
+            for _, w in conns:
+                w.close()
+            await srv.close()
+        self.run_async(main())
+
+    def test_session_memory_budget(self):
+        async def main():
+            worksheet = WorksheetRenderer()
+            readers, tasks = [], []
+            async def open_sessions(script, n):
+                batch = []
+                for _ in range(n):
+                    reader = asyncio.StreamReader()
+                    reader.feed_data(script)
+                    readers.append(reader)
+                    batch.append(Session(reader, NullWriter(), "s"))
+                    tasks.append(asyncio.ensure_future(batch[-1].run(worksheet)))
+                for _ in range(50): # every session reaches its prompt
+                    await asyncio.sleep(0)
+                # one still short of it would make the budget pass vacuously
+                self.assertTrue(all(s.reading and s.last.endswith(b"> ") for s in batch))
+            for _, script, _ in SESSION_BUDGETS: # builds the shared tables outside the measurement
+                await open_sessions(script, 1)
+            per_session = {}
+            tracemalloc.start()
+            try:
+                n = 10_000 // len(SESSION_BUDGETS) + 1 # all 10k stay open together
+                for name, script, _ in SESSION_BUDGETS:
+                    before = tracemalloc.get_traced_memory()[0]
+                    await open_sessions(script, n)
+                    per_session[name] = (tracemalloc.get_traced_memory()[0] - before) / n
+            finally:
+                tracemalloc.stop()
+            self.assertGreaterEqual(len(tasks), 10_000)
+            for reader in readers:
+                reader.feed_eof()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return per_session
+
+        per_session = self.run_async(main())
+        for name, _, budget in SESSION_BUDGETS:
+            with self.subTest(name):
+                self.assertLess(per_session[name], budget)
+
+    def test_idle_sessions_are_swept(self):
+        async def main():
+            srv = TutorServer(port=0)
+            await srv.start()
+            r, w = await connect(srv.port)
+            await answer(r, w, "R")
+            self.assertEqual(len(srv.sessions), 1)
+            self.assertEqual(await r.read(), b"") # hung up once idle, not parked
+            self.assertEqual(srv.by_id, {})
+            w.close()
+            await srv.close()
+        old = server.IDLE_TIMEOUT, server.WHEEL_TICK
+        server.IDLE_TIMEOUT, server.WHEEL_TICK = 0.2, 0.05
+        try:
+            self.run_async(main())
+        finally:
+            server.IDLE_TIMEOUT, server.WHEEL_TICK = old
+
+    def test_idle_sessions_are_evicted_and_restored(self):
+        async def wait_evicted(srv, n):
+            while srv.evicted != n:
+                await asyncio.sleep(0.02)
+
+        async def main():
+            with tempfile.TemporaryDirectory() as spill:
+                srv = TutorServer(port=0, spill_dir=spill, evict_after=0.1)
+                await srv.start()
+                r, w = await connect(srv.port)
+                await answer(r, w, "R")
+                await wait_evicted(srv, 1) # at the mode menu
+                (session,) = srv.sessions
+                self.assertIsNone(session.engine)
+                self.assertEqual(len(os.listdir(spill)), 1)
+                text = await answer(r, w, "1")
+                self.assertIn("What instruction type is this?", text)
+                self.assertEqual(srv.evicted, 0)
+                await wait_evicted(srv, 1) # in the question
+                text = await answer(r, w, "R")
+                self.assertIn("Fields in order", text)
+                await wait_evicted(srv, 1)
+                w.write(b"funct7 rs2 rs1 funct3 rd opcode\n")
+                text = (await r.readuntil(b"[Y/n]: ")).decode()
+                self.assertIn("Accuracy: 7.00/7.00", text) # grades from before the evictions are kept
+                await wait_evicted(srv, 1)
+                w.close() # an evicted session still parks on hang-up
+                for _ in range(100):
+                    if not srv.sessions:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertEqual((len(srv.sessions), len(srv.by_id)), (0, 1))
+                await srv.close()
+                self.assertEqual(os.listdir(spill), [])
+        old = server.WHEEL_TICK
+        server.WHEEL_TICK = 0.05
+        try:
+            self.run_async(main())
+        finally:
+            server.WHEEL_TICK = old
+
+    def test_resume_after_hangup(self):
+        async def main():
+            srv = TutorServer(port=0)
+            await srv.start()
+            r, w = await asyncio.open_connection("127.0.0.1", srv.port)
+            sid = re.search(r"Session (\w+)", (await r.readuntil(b"> ")).decode()).group(1)
+            await answer(r, w, "U")
+            await answer(r, w, "1")
+            w.close()
+            for _ in range(3):
+                r, w = await connect(srv.port)
+                text = await answer(r, w, f"resume {sid}")
+                self.assertTrue(text.endswith("What instruction type is this? (q to quit):\r\n> "))
+                w.close()
+            r, w = await connect(srv.port)
+            await answer(r, w, f"resume {sid}")
+            w.write(b"U\n")
+            await r.readuntil(b"> ")
+            w.write(b"imm[31:12] rd opcode\n")
+            self.assertIn("Accuracy: 4.00/4.00", (await r.readuntil(b"[Y/n]: ")).decode())
+            w.close()
+            r, w = await connect(srv.port)
+            w.write(b"resume nope\n")
+            self.assertIn(b"Unknown or expired session", await r.read())
+            await srv.close()
+        self.run_async(main())
+
+    def test_takeover_keeps_sessions(self):
+        async def main():
+            with tempfile.TemporaryDirectory() as tmp:
+                control = os.path.join(tmp, "control")
+                old = TutorServer(port=0, control=control)
+                await old.start()
+                serving = asyncio.ensure_future(old.serve_forever())
+                ra, wa = await connect(old.port) # in a question
+                await answer(ra, wa, "U")
+                await answer(ra, wa, "1")
+                rb, wb = await connect(old.port) # at the mode menu
+                await answer(rb, wb, "R")
+                rc, wc = await asyncio.open_connection("127.0.0.1", old.port) # hung up
+                sid = re.search(r"Session (\w+)", (await rc.readuntil(b"> ")).decode()).group(1)
+                await answer(rc, wc, "U")
+                await answer(rc, wc, "1")
+                wc.close()
+                rd, wd = await connect(old.port) # no answer yet
+                while len(old.sessions) != 3:
+                    await asyncio.sleep(0.01)
+
+                new = TutorServer(port=0, control=control)
+                await new.start()
+                await serving # the old server stops once it has handed over
+                self.assertEqual((old.handed_over, new.taken_over, new.port), (4, 4, old.port))
+                self.assertEqual((len(new.sessions), len(new.by_id)), (3, 4))
+
+                wa.write(b"U\n")
+                await ra.readuntil(b"> ")
+                wa.write(b"imm[31:12] rd opcode\n")
+                self.assertIn("Accuracy: 4.00/4.00", (await ra.readuntil(b"[Y/n]: ")).decode())
+                wb.write(b"q\n")
+                self.assertIn(b"Goodbye.", await rb.read())
+                r, w = await connect(new.port)
+                text = await answer(r, w, f"resume {sid}")
+                self.assertTrue(text.endswith("What instruction type is this? (q to quit):\r\n> "))
+                text = await answer(rd, wd, "R")
+                self.assertIn("Selected Instruction Types: R", text)
+                for writer in (wa, wb, w, wd):
+                    writer.close()
+                await new.close()
+                self.assertFalse(os.path.exists(control))
+        self.run_async(main())
+
+    def test_failed_takeover_rolls_back(self):
+        async def main():
+            with tempfile.TemporaryDirectory() as tmp:
+                control = os.path.join(tmp, "control")
+                old = TutorServer(port=0, control=control)
+                await old.start()
+                serving = asyncio.ensure_future(old.serve_forever())
+                conns = []
+                for _ in range(500): # more than the control socket buffers, so the send is cut off
+                    conns.append(await connect(old.port))
+                r, w = conns[0]
+                await answer(r, w, "")
+                await answer(r, w, "4") # one mid-worksheet
+
+                def die_mid_transfer():
+                    conn = takeover.connect(control)
+                    _, fds, _, _ = socket.recv_fds(conn, takeover.MAX_MESSAGE, 1) # the listener
+                    for fd in fds:
+                        os.close(fd)
+                    conn.close()
+                with contextlib.redirect_stderr(io.StringIO()) as err:
+                    await asyncio.to_thread(die_mid_transfer)
+                    while old.moving or len(old.sessions) != 500:
+                        await asyncio.sleep(0.01)
+                self.assertIn("hand-over failed", err.getvalue())
+                self.assertFalse(serving.done())
+                self.assertIsNone(old.handed_over)
+                self.assertIn("Step 2: Opcode", await answer(r, w, "0" * 32))
+                r2, w2 = await connect(old.port) # still accepting
+
+                new = TutorServer(port=0, control=control) # a later hand-over still works
+                await new.start()
+                await serving
+                self.assertEqual((new.taken_over, new.port), (501, old.port))
+                self.assertIn("Selected Instruction Types: R", await answer(r2, w2, "R"))
+                for _, w in conns + [(r2, w2)]:
+                    w.close()
+                await new.close()
+        self.run_async(main())
+
+    def test_takeover_of_many_sessions(self):
+        async def main():
+            with tempfile.TemporaryDirectory() as tmp:
+                control = os.path.join(tmp, "control")
+                old = TutorServer(port=0, control=control)
+                await old.start()
+                conns = []
+                for _ in range(1000):
+                    r, w = await connect(old.port)
+                    await answer(r, w, "")
+                    conns.append((r, w))
+                await answer(r, w, "4") # one mid-worksheet
+                new = TutorServer(port=0, control=control)
+                await new.start() # its speed is a target in bench/targets.py
+                self.assertEqual(new.taken_over, 1000)
+                self.assertIn("Step 2: Opcode", await answer(r, w, "0" * 32))
+                for _, w in conns:
+                    w.close()
+                await old.close()
+                await new.close()
+        self.run_async(main())
+
+    def test_reload_endpoint(self):
+        async def http(port, method, path):
+            r, w = await asyncio.open_connection("127.0.0.1", port)
+            w.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            data = (await r.read()).decode()
+            w.close()
+            return data
+
+        async def main():
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "registry.json")
+                srv = TutorServer(port=0, metrics_port=0, registry_file=path)
+                await srv.start()
+                r, w = await connect(srv.port)
+                await answer(r, w, "R")
+                self.assertIn("What instruction type is this?", await answer(r, w, "1"))
+                with open(path, "w") as fh:
+                    json.dump([["xor", "R", 0x33, 4, 0]], fh)
+                text = await http(srv.metrics_port, "POST", "/reload")
+                self.assertTrue(text.startswith("HTTP/1.1 200 OK"))
+                self.assertIn("Registry v", text)
+                self.assertEqual([i.name for i in riscv.current().instructions], ["xor"])
+                self.assertIn("Fields in order", await answer(r, w, "R")) # the open question carries on
+                w.write(b"funct7 rs2 rs1 funct3 rd opcode\n")
+                await r.readuntil(b"[Y/n]: ")
+                self.assertIn("Instruction: xor", await answer(r, w, "y")) # the next one is from the reload
+                with open(path, "w") as fh:
+                    fh.write("[")
+                self.assertIn("400 Bad Request", await http(srv.metrics_port, "POST", "/reload"))
+                self.assertIn("405", await http(srv.metrics_port, "GET", "/reload"))
+                with patch('server._on_loopback', return_value=False): # a student on the lab network
+                    self.assertIn("403 Forbidden", await http(srv.metrics_port, "POST", "/reload"))
+                w.close()
+                await srv.close()
+                other = TutorServer(port=0, metrics_port=0)
+                await other.start()
+                self.assertIn("409 Conflict", await http(other.metrics_port, "POST", "/reload"))
+                await other.close()
+        try:
+            self.run_async(main())
+        finally:
+            riscv.publish(riscv.REGISTRY)
+
+    def test_session_ids_hash_to_their_worker(self):
+        for index in range(4):
+            self.assertEqual(session_owner(new_session_id(index, 4), 4), index)
+        ids = [new_session_id(0, 1) for _ in range(2000)]
+        counts = [0] * 8
+        for sid in ids:
+            counts[session_owner(sid, 8)] += 1
+            # Growing the pool only moves sessions to the new worker
+            self.assertIn(session_owner(sid, 9), (session_owner(sid, 8), 8))
+        self.assertGreater(min(counts), 150)
+
+    @unittest.skipUnless(hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT"), "needs fork and SO_REUSEPORT")
+    def test_prefork_workers_route_resumes(self):
+        proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "serve", "--port", "0",
+                                 "--workers", "3"], cwd=ROOT, stderr=subprocess.PIPE)
+        try:
+            port = int(re.search(r":(\d+) ", proc.stderr.readline().decode()).group(1))
+
+            async def main():
+                r, w = await asyncio.open_connection("127.0.0.1", port)
+                sid = re.search(r"Session (\w+)", (await r.readuntil(b"> ")).decode()).group(1)
+                await answer(r, w, "R")
+                await answer(r, w, "2")
+                w.close()
+                for _ in range(8): # the kernel spreads these over all workers
+                    r, w = await connect(port)
+                    text = await answer(r, w, f"resume {sid}")
+                    self.assertIn("What instruction type is this?", text)
+                    w.close()
+            self.run_async(main())
+        finally:
+            proc.terminate()
+            proc.wait(10)
+            proc.stderr.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import socket
+import tempfile
+import threading
+import takeover
+
+class TestTakeover(unittest.TestCase):
+    def test_listener_and_sessions_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "control")
+            self.assertIsNone(takeover.connect(path)) # nothing running yet
+            control = takeover.listen(path)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+            conn = takeover.connect(path)
+            peer, _ = control.accept()
+            listener = socket.create_server(("127.0.0.1", 0))
+            a, b = socket.socketpair()
+            sessions = [("abc", b"record", b"ahead\n", a), ("def", b"parked", b"", None)]
+            sender = threading.Thread(target=takeover.send, args=(peer, listener, sessions))
+            sender.start()
+            got_listener, got = takeover.receive(conn)
+            sender.join()
+            self.assertEqual(got_listener.getsockname(), listener.getsockname())
+            self.assertEqual([s[:3] for s in got], [s[:3] for s in sessions])
+            self.assertIsNone(got[1][3])
+            got[0][3].sendall(b"ping") # the passed descriptor is the same connection
+            self.assertEqual(b.recv(4), b"ping")
+            for sock in (control, conn, peer, listener, a, b, got_listener, got[0][3]):
+                sock.close()
+            control = takeover.listen(path) # replaces the stale path
+            control.close()
+
+    def test_malformed_streams_are_rejected(self):
+        for messages in ([takeover.HEAD.pack(takeover.END, 0, 0, 0)], [b"x"],
+                         [takeover.HEAD.pack(takeover.SESSION, 3, 0, 0), takeover.HEAD.pack(takeover.END, 0, 0, 0)]):
+            a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            with a, b:
+                for msg in messages:
+                    a.send(msg)
+                with self.assertRaises(ValueError):
+                    takeover.receive(b)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from timerwheel import TimerWheel
+
+class TestTimerWheel(unittest.TestCase):
+    def test_keys_expire_in_their_tick(self):
+        wheel = TimerWheel(tick=1.0, slots=8)
+        wheel.schedule("a", 1)
+        wheel.schedule("b", 2.5) # rounded up to 3 ticks
+        wheel.schedule("c", 0)   # never in the current tick
+        self.assertEqual(len(wheel), 3)
+        self.assertEqual(sorted(wheel.advance()), ["a", "c"])
+        self.assertEqual(wheel.advance(), [])
+        self.assertEqual(wheel.advance(), ["b"])
+        self.assertEqual(len(wheel), 0)
+
+    def test_reschedule_and_cancel(self):
+        wheel = TimerWheel(tick=0.5, slots=16)
+        wheel.schedule("a", 1)
+        wheel.schedule("a", 3) # replaces the first deadline
+        wheel.schedule("b", 1)
+        wheel.cancel("b")
+        wheel.cancel("missing")
+        self.assertNotIn("b", wheel)
+        expired = [wheel.advance() for _ in range(6)]
+        self.assertEqual(expired, [[], [], [], [], [], ["a"]])
+
+    def test_deadlines_wrap_around(self):
+        wheel = TimerWheel(tick=1.0, slots=4)
+        for _ in range(6):
+            wheel.advance()
+        wheel.schedule("a", 3)
+        self.assertEqual([wheel.advance() for _ in range(3)], [[], [], ["a"]])
+
+    def test_guards(self):
+        with self.assertRaises(ValueError):
+            TimerWheel(tick=0)
+        with self.assertRaises(ValueError):
+            TimerWheel(slots=1)
+        wheel = TimerWheel(tick=1.0, slots=4)
+        self.assertEqual(wheel.span, 3.0)
+        with self.assertRaises(ValueError):
+            wheel.schedule("a", 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import base64
+import riscv
+import tokens
+from riscv import REGISTRY, Instruction
+from engine import QuizEngine
+from api import TutorAPI, ApiError
+from bench.oracle import encoding_answers, decoding_answers
+
+KEY = b"test-key"
+
+class TestTokens(unittest.TestCase):
+    def test_round_trip_is_compact(self):
+        token, tok = tokens.generate(KEY, "3", ["R", "I"])
+        self.assertLessEqual(len(token), 48)
+        back = tokens.parse(KEY, token)
+        self.assertEqual((back.mode, back.types, back.seed), ("3", ["I", "R"], tok.seed))
+        for key in ("instruction", "rd", "rs1", "rs2", "imm", "asm"):
+            self.assertEqual(back.question[key], tok.question[key])
+
+    def test_tampered_or_foreign_tokens_are_rejected(self):
+        token, _ = tokens.generate(KEY, "1", ["R"])
+        raw = bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        raw[2] ^= 1
+        forged = base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode()
+        for bad in (forged, token[:-4], "!!", None):
+            with self.assertRaises(ValueError):
+                tokens.parse(KEY, bad)
+        with self.assertRaises(ValueError):
+            tokens.parse(b"other-key", token)
+
+    def test_decoding_sheet_is_reproducible(self):
+        token, tok = tokens.generate(KEY, "4", ["R", "I", "S"])
+        a = tokens.pipeline_for(tokens.parse(KEY, token)).sheet.ref_rows
+        b = tokens.pipeline_for(tok).sheet.ref_rows
+        self.assertEqual(a, b)
+
+    def test_tokens_stay_on_the_built_in_registry_after_a_reload(self):
+        riscv.publish([Instruction(i.name, i.type, i.op, i.f3, i.f7) for i in REGISTRY])
+        try:
+            token, tok = tokens.generate(KEY, "4", ["R", "I"])
+            self.assertIn(tok.question["instruction"], REGISTRY)
+            back = tokens.parse(KEY, token)
+            self.assertIs(back.question["instruction"], tok.question["instruction"])
+            self.assertEqual(tokens.pipeline_for(back).sheet.ref_rows, tokens.pipeline_for(tok).sheet.ref_rows)
+        finally:
+            riscv.publish(REGISTRY)
+
+    def test_every_step_grades_from_the_token_alone(self):
+        for mode, oracle in (("3", encoding_answers), ("4", decoding_answers)):
+            token, _ = tokens.generate(KEY, mode, ["B", "J"])
+            tok = tokens.parse(KEY, token)
+            p = tokens.pipeline_for(tok)
+            for step, answer in zip(p.STEPS, oracle(QuizEngine(), tok.question)):
+                p, _ = tokens.grade(tokens.parse(KEY, token), step, answer)
+                self.assertEqual(p.points, p.total, (mode, step, answer))
+            self.assertTrue(p.done)
+        with self.assertRaises(ValueError):
+            tokens.grade(tok, "nope", "x")
+
+class TestTokenAPI(unittest.TestCase):
+    def test_issue_and_grade_across_instances(self):
+        issued = TutorAPI(token_key=KEY).issue_token({"mode": "bits", "types": "U"})
+        self.assertIn("What instruction type is this?", issued["prompt"])
+        other = TutorAPI(token_key=KEY)
+        r = other.grade_token({"token": issued["token"], "step": "type", "answer": "U"})
+        self.assertEqual((r["points"], r["next_step"], r["done"]), (1, "bits", False))
+        self.assertEqual(other.stats_doc()["outstanding"], 0)
+        out = other.grade_tokens({"answers": [{"token": issued["token"], "step": "bits", "answer": "20 5 7"},
+                                              {"token": issued["token"], "step": "hex", "answer": "0"}]})
+        self.assertEqual(out["results"][0]["points"], 3)
+        self.assertEqual(out["results"][1]["status"], 400)
+        with self.assertRaises(ApiError) as cm:
+            TutorAPI(token_key=b"x").grade_token({"token": issued["token"], "step": "type", "answer": "U"})
+        self.assertEqual(cm.exception.status, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+import io
+import json
+import os
+import tempfile
+import tracing
+import main
+from engine import QuizEngine
+from pipeline import Pipeline
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        tracing.reset()
+
+    def tearDown(self):
+        tracing.uninstall()
+        tracing.reset()
+
+    @patch('builtins.input')
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_spans_cover_steps_engine_and_io(self, mock_stdout, mock_input):
+        mock_input.side_effect = ["R", "funct7 rs2 rs1 funct3 rd opcode", "0 0 0 0 0 0", "0"]
+        tracing.install()
+        engine = QuizEngine()
+        engine.filter_pool(["R"])
+        main.run_encoding_pipeline(engine, engine.generate_question())
+        tracing.uninstall()
+        spans = [e for e in tracing.events() if e["ph"] == "X"]
+        names = {e["name"] for e in spans}
+        for name in ("question", "EncodingPipeline.type", "EncodingPipeline.layout", "generate_question",
+                     "ground_truth", "filter_pool", "input", "print"):
+            self.assertIn(name, names)
+        self.assertEqual(sum(e["name"] == "input" for e in spans), 4)
+        # start() and the first feed() both run at the type step; the last feed is named for hex, not None
+        self.assertEqual(sum(e["name"] == "EncodingPipeline.type" for e in spans), 2)
+        self.assertNotIn("EncodingPipeline.None", names)
+        question = next(e for e in spans if e["name"] == "question")
+        self.assertEqual(question["args"], {"pipeline": "EncodingPipeline"})
+        for e in spans: # every span nests inside the question or precedes it
+            self.assertGreaterEqual(e["dur"], 0)
+            if e["cat"] in ("step", "io"):
+                self.assertGreaterEqual(e["ts"], question["ts"])
+                self.assertLessEqual(e["ts"] + e["dur"], question["ts"] + question["dur"] + 1)
+
+    def test_uninstall_restores(self):
+        feed = Pipeline.__dict__["feed"]
+        generate = QuizEngine.__dict__["generate_question"]
+        tracing.install()
+        self.assertIsNot(Pipeline.__dict__["feed"], feed)
+        self.assertIn("input", vars(main))
+        tracing.uninstall()
+        self.assertIs(Pipeline.__dict__["feed"], feed)
+        self.assertIs(QuizEngine.__dict__["generate_question"], generate)
+        self.assertNotIn("input", vars(main))
+        self.assertNotIn("print", vars(main))
+
+    def test_save_writes_chrome_trace(self):
+        tracing.install()
+        engine = QuizEngine()
+        engine.filter_pool(["I"])
+        engine.generate_question()
+        tracing.uninstall()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.json")
+            self.assertGreaterEqual(tracing.save(path), 2)
+            with open(path) as fh:
+                doc = json.load(fh)
+        kinds = {e["ph"] for e in doc["traceEvents"]}
+        self.assertEqual(kinds, {"X", "M"})
+        self.assertTrue(all({"name", "ts", "dur", "pid", "tid"} <= set(e) for e in doc["traceEvents"] if e["ph"] == "X"))
+
+    def test_long_running_subcommands_are_rejected(self):
+        for command in ("serve", "api", "worker"):
+            with patch('sys.stderr', new_callable=io.StringIO) as err, patch('tracing.install') as install:
+                with self.assertRaises(SystemExit):
+                    main.cli(["--trace", "t.json", command])
+            self.assertIn("--trace cannot be combined", err.getvalue())
+            install.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
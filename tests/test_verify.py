@@ -0,0 +1,92 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+import verify
+from engine import QuizEngine
+from riscv import REGISTRY
+from verify import QuestionSpace, check_point, verify_range, run_verify
+
+class BrokenAsmEngine(QuizEngine):
+    def format_asm(self, q):
+        return super().format_asm(q).replace(",", "")
+
+class TestVerify(unittest.TestCase):
+    def test_space_size(self):
+        # R: 32^3, I/S/B: 32^2 * 4096, U/J: 32 * 2^20
+        self.assertEqual(len(QuestionSpace(["add"])), 32 ** 3)
+        self.assertEqual(len(QuestionSpace(["addi"])), 32 * 32 * 4096)
+        self.assertEqual(len(QuestionSpace(["beq"])), 32 * 32 * 4096)
+        self.assertEqual(len(QuestionSpace(["jal"])), 32 * (1 << 20))
+        self.assertEqual(len(QuestionSpace()), sum(len(QuestionSpace([i.name])) for i in REGISTRY))
+
+    def test_space_points(self):
+        space = QuestionSpace(["add", "jal"])
+        q = space.point(0)
+        self.assertEqual((q["instruction"].name, q["rd"], q["rs1"], q["rs2"]), ("add", 0, 0, 0))
+        q = space.point(32 ** 3 - 1)
+        self.assertEqual((q["rd"], q["rs1"], q["rs2"]), (31, 31, 31))
+        q = space.point(32 ** 3)
+        self.assertEqual((q["instruction"].name, q["rd"], q["imm"]), ("jal", 0, -(1 << 20)))
+        q = space.point(len(space) - 1)
+        self.assertEqual((q["rd"], q["imm"]), (31, (1 << 20) - 2))
+        with self.assertRaises(IndexError):
+            space.point(len(space))
+        with self.assertRaises(ValueError):
+            QuestionSpace(["nop"])
+
+    def test_check_point_edges(self):
+        engine = QuizEngine()
+        for name in ["addi", "lw", "sw", "beq", "lui", "auipc", "jal"]:
+            space = QuestionSpace([name])
+            for index in [0, 1, len(space) // 2, len(space) - 1]:
+                self.assertIsNone(check_point(engine, space.point(index)))
+
+    def test_check_point_reports_disagreement(self):
+        q = QuestionSpace(["add"]).point(100)
+        reason = check_point(BrokenAsmEngine(), q)
+        self.assertIn("validate_asm_strict rejected", reason)
+
+    def test_verify_range(self):
+        self.assertEqual(verify_range(["sub"], 0, 5000), (5000, 0, []))
+        checked, _, _ = verify_range(["sub"], 32 ** 3 - 10, 32 ** 3 + 10)
+        self.assertEqual(checked, 10)
+
+    def test_failure_totals_are_not_capped(self):
+        with patch('verify.check_point', return_value="broken"):
+            checked, failed, failures = verify_range(["sub"], 0, 100)
+            self.assertEqual((checked, failed, len(failures)), (100, 100, verify.MAX_FAILURES_PER_SHARD))
+            out = io.StringIO()
+            state = run_verify(["sub"], workers=1, chunk=1 << 14, out=out) # workers fork with the patch
+        self.assertEqual(state["failed"], 32 ** 3)
+        self.assertIn("shard 0: 16384 points, 16384 failures", out.getvalue())
+        self.assertIn(f"Done: {32 ** 3} failures ({2 * verify.MAX_FAILURES_PER_SHARD} shown)", out.getvalue())
+
+    def test_run_verify_resumes_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "verify.json")
+            # Pretend the first three shards of sll already finished
+            with open(path, "w") as fh:
+                json.dump({"version": verify.CHECKPOINT_VERSION, "total": 32 ** 3, "chunk": 8192, "names": ["sll"],
+                           "done": [0, 1, 2], "failed": 0, "failures": []}, fh)
+            out = io.StringIO()
+            state = run_verify(["sll"], workers=1, chunk=8192, checkpoint=path, out=out)
+            self.assertEqual(sorted(state["done"]), [0, 1, 2, 3])
+            self.assertEqual(state["failures"], [])
+            self.assertIn("1 shards (3 already done)", out.getvalue())
+            with open(path) as fh:
+                self.assertEqual(sorted(json.load(fh)["done"]), [0, 1, 2, 3])
+
+            with self.assertRaises(ValueError):
+                run_verify(["add"], workers=1, chunk=8192, checkpoint=path, out=out)
+
+            with open(path, "w") as fh:  # written before failure counts were kept
+                json.dump({"version": 1, "total": 32 ** 3, "chunk": 8192, "names": ["sll"],
+                           "done": [0, 1, 2], "failures": []}, fh)
+            with self.assertRaisesRegex(ValueError, "format version 1"):
+                run_verify(["sll"], workers=1, chunk=8192, checkpoint=path, out=out)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import io
+import json
+import subprocess
+import sys
+import os
+import worker
+from worker import Worker, run_worker
+from engine import QuizEngine
+from bench.oracle import encoding_answers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(requests, key=b"k"):
+    data = "".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in requests).encode()
+    out = io.BytesIO()
+    run_worker(io.BytesIO(data), out, key)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+class TestWorker(unittest.TestCase):
+    def test_generate_then_grade_every_kind(self):
+        gen = Worker(b"k").handle({"op": "generate", "mode": "encoding", "types": "S B"})
+        q = worker._question(int(gen["hex"], 16))[0]
+        _, layout, binary, hexa = encoding_answers(QuizEngine(), q)
+        widths = " ".join(str(len(b)) for b in binary.split())
+        reqs = [{"id": k, "op": "grade", "kind": k, "token": gen["token"], "answer": a}
+                for k, a in (("layout", layout), ("bits", widths), ("binary", binary), ("hex", hexa),
+                             ("asm", gen["asm"]))]
+        resps = run(reqs)
+        self.assertEqual([r["id"] for r in resps], ["layout", "bits", "binary", "hex", "asm"])
+        for r in resps:
+            self.assertTrue(r["correct"], r)
+            self.assertEqual(r["points"], r["total"])
+
+    def test_wrong_answers_get_feedback(self):
+        r = run([{"op": "grade", "kind": "hex", "hex": "003100b3", "answer": "0"},
+                 {"op": "grade", "kind": "asm", "hex": "003100b3", "answer": "sub x1, x2, x3"},
+                 {"op": "grade", "kind": "layout", "hex": "003100b3", "answer": "rd rs1"}])
+        self.assertEqual((r[0]["points"], r[0]["expected"]), (0, "003100b3"))
+        self.assertIn("Mnemonic", r[1]["feedback"])
+        self.assertEqual((r[2]["points"], r[2]["total"]), (0, 6))
+
+    def test_decode_and_errors_keep_order(self):
+        r = run([{"id": 1, "op": "decode", "hex": "003100b3"}, "not json", {"id": 3, "op": "decode", "hex": "0"},
+                 {"id": 4, "op": "nope"}, {"id": 5, "op": "grade", "kind": "hex", "token": "bad", "answer": ""}])
+        self.assertEqual((r[0]["id"], r[0]["asm"]), (1, "add x1, x2, x3"))
+        self.assertEqual(r[0]["fields"][0], ["funct7", "0000000"])
+        self.assertIn("error", r[1])
+        self.assertEqual([x["id"] for x in r[2:]], [3, 4, 5])
+        self.assertTrue(all("error" in x for x in r[2:]))
+
+    def test_over_long_line_gets_one_response(self):
+        big = '{"id": 2, "op": "decode", "hex": "' + "0" * (worker.MAX_REQUEST + 3 * worker.READ_CHUNK) + '"}'
+        r = run([{"id": 1, "op": "decode", "hex": "003100b3"}, big, {"id": 3, "op": "decode", "hex": "003100b3"}])
+        self.assertEqual(len(r), 3)
+        self.assertEqual(r[1], {"error": "request line too long"})
+        self.assertEqual([r[0]["id"], r[2]["id"]], [1, 3])
+
+    def test_deeply_nested_line_gets_one_response(self):
+        r = run([{"id": 1, "op": "decode", "hex": "003100b3"}, "[" * 100000, {"id": 3, "op": "decode", "hex": "003100b3"}])
+        self.assertEqual(len(r), 3)
+        self.assertEqual(r[1], {"error": "request nested too deeply"})
+        self.assertEqual([r[0]["id"], r[2]["id"]], [1, 3])
+
+    def test_streams_through_the_cli(self):
+        reqs = [{"id": i, "op": "grade", "kind": "hex", "hex": "003100b3", "answer": "003100b3"} for i in range(2000)]
+        proc = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "worker"], cwd=ROOT, timeout=60,
+                              input="".join(json.dumps(r) + "\n" for r in reqs).encode(), capture_output=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        resps = [json.loads(line) for line in proc.stdout.splitlines()]
+        self.assertEqual([r["id"] for r in resps], list(range(2000)))
+        self.assertTrue(all(r["correct"] for r in resps))
+
+if __name__ == '__main__':
+    unittest.main()
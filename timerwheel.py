@@ -0,0 +1,57 @@
+"""
+RISC-V Tutor Timer Wheel
+Hashed timing wheel for many coarse timeouts: scheduling, rescheduling and
+cancelling a key are O(1), and each tick only touches the keys that expire in it.
+"""
+from typing import Dict, Hashable, List, Set
+
+class TimerWheel:
+    """`slots` buckets of `tick` seconds each; a key holds at most one deadline."""
+    def __init__(self, tick: float = 1.0, slots: int = 4096):
+        if tick <= 0:
+            raise ValueError("tick must be positive")
+        if slots < 2:
+            raise ValueError("slots must be at least 2")
+        self.tick = tick
+        self.slots = slots
+        self.now = 0 # ticks advanced so far
+        self._buckets: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self._slot: Dict[Hashable, int] = {}
+
+    @property
+    def span(self) -> float:
+        """The longest delay the wheel can hold, in seconds."""
+        return (self.slots - 1) * self.tick
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """Sets key to expire after `delay` seconds, replacing any earlier deadline."""
+        ticks = max(1, -int(-delay // self.tick)) # rounded up: never early
+        if ticks >= self.slots:
+            raise ValueError(f"delay {delay} exceeds the wheel's span of {self.span} seconds")
+        self.cancel(key)
+        slot = (self.now + ticks) % self.slots
+        self._buckets[slot].add(key)
+        self._slot[key] = slot
+
+    def cancel(self, key: Hashable) -> None:
+        slot = self._slot.pop(key, None)
+        if slot is not None:
+            self._buckets[slot].discard(key)
+
+    def advance(self) -> List[Hashable]:
+        """Moves one tick forward; returns the keys that expired in it."""
+        self.now += 1
+        bucket = self._buckets[self.now % self.slots]
+        if not bucket:
+            return []
+        expired = list(bucket)
+        bucket.clear()
+        for key in expired:
+            del self._slot[key]
+        return expired
@@ -0,0 +1,104 @@
+"""
+RISC-V Tutor Signed Question Tokens
+A question packed into a compact HMAC-signed token, so any process holding the
+key can rebuild its ground truth and grade answers without session storage.
+Tokens index the built-in registry, so they are drawn from it whatever has been
+reloaded since.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import random
+import struct
+from typing import Dict, List, Optional, Tuple
+from riscv import REGISTRY, BUILT_IN
+from engine import QuizEngine, ground_truth
+from render import WorksheetRenderer, Worksheet
+from pipeline import ALL_TYPES, MODE_NAMES, Pipeline, make_pipeline, reference_rows
+
+VERSION = 1
+# version, mode, instruction index, rd, rs1, rs2, type mask, imm, seed
+PAYLOAD = struct.Struct("<BBBBBBBiI")
+MAC_BYTES = 16            # HMAC-SHA256 truncated to 128 bits
+KEY_ENV = "RVTUTOR_TOKEN_KEY"
+
+def default_key() -> bytes:
+    """The shared signing key from $RVTUTOR_TOKEN_KEY, or a random per-process key."""
+    key = os.environ.get(KEY_ENV)
+    return key.encode() if key else os.urandom(32)
+
+def _mac(key: bytes, payload: bytes) -> bytes:
+    return hmac.new(key, payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+def _type_mask(types: List[str]) -> int:
+    return sum(1 << i for i, t in enumerate(ALL_TYPES) if t in types)
+
+class QuestionToken:
+    """A decoded token: the question, its mode, the type filter and the seed for its random parts."""
+    __slots__ = ("mode", "question", "types", "seed")
+
+    def __init__(self, mode: str, question: Dict, types: List[str], seed: int):
+        self.mode = mode
+        self.question = question
+        self.types = types
+        self.seed = seed
+
+def issue(key: bytes, mode: str, q: Dict, types: List[str], seed: int) -> str:
+    """Signs a question generated by QuizEngine into a URL-safe token."""
+    if mode not in MODE_NAMES:
+        raise ValueError(f"Unknown mode {mode!r}")
+    payload = PAYLOAD.pack(VERSION, int(mode), REGISTRY.index(q["instruction"]), q["rd"], q["rs1"], q["rs2"],
+                           _type_mask(types), q["imm"], seed & 0xFFFFFFFF)
+    return base64.urlsafe_b64encode(payload + _mac(key, payload)).rstrip(b"=").decode()
+
+def parse(key: bytes, token: str) -> QuestionToken:
+    """Verifies and unpacks a token; raises ValueError if it is malformed or not signed with `key`."""
+    if not isinstance(token, str):
+        raise ValueError("token must be a string")
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        raise ValueError("token is not base64")
+    if len(raw) != PAYLOAD.size + MAC_BYTES:
+        raise ValueError("token has the wrong length")
+    payload, mac = raw[:PAYLOAD.size], raw[PAYLOAD.size:]
+    if not hmac.compare_digest(mac, _mac(key, payload)):
+        raise ValueError("token signature does not match")
+    version, mode, index, rd, rs1, rs2, mask, imm, seed = PAYLOAD.unpack(payload)
+    if version != VERSION or str(mode) not in MODE_NAMES or index >= len(REGISTRY):
+        raise ValueError("token fields are out of range")
+    q = {"instruction": REGISTRY[index], "rd": rd, "rs1": rs1, "rs2": rs2, "imm": imm}
+    q["asm"] = QuizEngine().format_asm(q)
+    return QuestionToken(str(mode), q, sorted(t for i, t in enumerate(ALL_TYPES) if mask >> i & 1), seed)
+
+def generate(key: bytes, mode: str, types: List[str]) -> Tuple[str, QuestionToken]:
+    """A new question for a mode and type filter, as (token, decoded token)."""
+    engine = QuizEngine()
+    engine.filter_pool(types, BUILT_IN)
+    active = sorted(set(i.type for i in engine.pool))
+    q = engine.make_question()
+    tok = QuestionToken(mode, q, active, random.getrandbits(32))
+    return issue(key, mode, q, active, tok.seed), tok
+
+def pipeline_for(tok: QuestionToken, worksheet: Optional[WorksheetRenderer] = None) -> Pipeline:
+    """Rebuilds a token's pipeline; the decoding reference table comes from the token's seed."""
+    engine = QuizEngine()
+    engine.filter_pool(tok.types, BUILT_IN)
+    q = tok.question
+    engine.current_q = q
+    truth = ground_truth(q)
+    sheet = None
+    if tok.mode == "4":
+        ins = q["instruction"]
+        rows = reference_rows(engine, ins, random.Random(tok.seed))
+        sheet = Worksheet(ins, truth, rows, q["asm"], len(truth["fields"]))
+    return make_pipeline(tok.mode, engine, q, tok.types, worksheet, truth, sheet)
+
+def grade(tok: QuestionToken, step: str, answer: str) -> Tuple[Pipeline, List[Tuple]]:
+    """Grades one step from the token alone; returns the pipeline (positioned after it) and its events."""
+    p = pipeline_for(tok)
+    if step not in p.STEPS:
+        raise ValueError(f"step must be one of {', '.join(p.STEPS)}")
+    p.resume(p.STEPS.index(step))
+    return p, p.feed(answer)
@@ -0,0 +1,107 @@
+"""
+RISC-V Tutor Tracing
+Opt-in monotonic-clock spans around pipeline steps, engine calls, rendering and
+terminal I/O, saved in Chrome trace-event format (open in Perfetto or
+chrome://tracing). Nothing is wrapped until install(), so tracing costs nothing
+when it is off.
+"""
+import builtins
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+_clock = time.perf_counter_ns
+_t0 = 0
+_events: List[Tuple] = []                 # (name, cat, start ns, end ns, thread ident, args)
+_threads: Dict[int, str] = {}
+_installed: List[Tuple[object, str, object]] = []
+_MISSING = object()
+
+def _span(name, cat: str, fn: Callable, args: Optional[Callable] = None) -> Callable:
+    """Wraps fn in a span; `name` may be a callable of the call's arguments."""
+    clock, record = _clock, _events.append
+
+    @functools.wraps(fn)
+    def traced(*a, **k):
+        label = name(*a) if callable(name) else name # before the call, which may advance a pipeline step
+        start = clock()
+        try:
+            return fn(*a, **k)
+        finally:
+            tid = threading.get_ident()
+            if tid not in _threads:
+                _threads[tid] = threading.current_thread().name
+            record((label, cat, start, clock(), tid, args(*a) if args else None))
+    return traced
+
+def _step_name(pipeline, *_) -> str:
+    return f"{type(pipeline).__name__}.{pipeline.step_name}"
+
+def _wrap(owner, attr: str, span: Callable) -> None:
+    _installed.append((owner, attr, vars(owner).get(attr, _MISSING)))
+    setattr(owner, attr, span(getattr(owner, attr, None)))
+
+def install(cli=None) -> None:
+    """Starts recording: wraps every traced call site; `cli` is the running main module (default: main)."""
+    global _t0
+    import engine
+    import pipeline
+    import prefetch
+    import render
+    if cli is None:
+        import main as cli
+    if _installed:
+        return
+    _t0 = _clock()
+    for attr in ("generate_question", "make_question", "filter_pool", "format_asm", "get_ground_truth",
+                 "validate_layout", "validate_bits"):
+        _wrap(engine.QuizEngine, attr, lambda fn, a=attr: _span(a, "engine", fn))
+    for module in (engine, pipeline, prefetch): # each module calls its own imported name
+        _wrap(module, "ground_truth", lambda fn: _span("ground_truth", "engine", fn))
+    _wrap(pipeline, "validate_asm_strict", lambda fn: _span("validate_asm_strict", "engine", fn))
+    _wrap(pipeline.Pipeline, "start", lambda fn: _span(_step_name, "step", fn))
+    _wrap(pipeline.Pipeline, "feed", lambda fn: _span(_step_name, "step", fn))
+    _wrap(render.WorksheetRenderer, "frame", lambda fn: _span("worksheet_frame", "render", fn))
+    _wrap(render.FrameRenderer, "render", lambda fn: _span("frame_write", "io", fn))
+    _wrap(cli, "drive", lambda fn: _span("question", "pipeline", fn, lambda p, *_: {"pipeline": type(p).__name__}))
+    _wrap(cli, "clear_screen", lambda fn: _span("clear_screen", "io", fn))
+    # the CLI's print and input resolve through its globals first, so these shadow the builtins there only
+    _wrap(cli, "print", lambda fn: _span("print", "io", lambda *a, **k: builtins.print(*a, **k)))
+    _wrap(cli, "input", lambda fn: _span("input", "io", lambda *a, **k: builtins.input(*a, **k)))
+
+def uninstall() -> None:
+    """Stops recording and restores every wrapped call site; recorded spans are kept."""
+    while _installed:
+        owner, attr, original = _installed.pop()
+        if original is _MISSING:
+            delattr(owner, attr)
+        else:
+            setattr(owner, attr, original)
+
+def events() -> List[Dict]:
+    """The recorded spans as Chrome trace events (microsecond timestamps)."""
+    pid = os.getpid()
+    out = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+           for tid, name in list(_threads.items())]
+    for name, cat, start, end, tid, args in list(_events):
+        event = {"name": name, "cat": cat, "ph": "X", "ts": (start - _t0) / 1000, "dur": (end - start) / 1000,
+                 "pid": pid, "tid": tid}
+        if args:
+            event["args"] = args
+        out.append(event)
+    return out
+
+def save(path: str) -> int:
+    """Writes the trace as JSON; returns the number of spans."""
+    doc = events()
+    with open(path, "w") as fh:
+        json.dump({"traceEvents": doc, "displayTimeUnit": "ms"}, fh)
+    return sum(1 for e in doc if e["ph"] == "X")
+
+def reset() -> None:
+    """Drops recorded spans."""
+    del _events[:]
+    _threads.clear()
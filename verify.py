@@ -0,0 +1,174 @@
+"""
+RISC-V Tutor Exhaustive Round-Trip Verifier
+Enumerates every (instruction, register, immediate) point and checks that
+assembly formatting, encoding, decoding and strict assembly grading agree.
+"""
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+from riscv import REGISTRY, LAYOUTS, Instruction
+from engine import QuizEngine, decode_word
+from pipeline import validate_asm_strict
+
+# Full architectural immediate ranges per type (B/J offsets are 2-byte aligned)
+IMM_RANGES = {
+    'I': range(-2048, 2048),
+    'S': range(-2048, 2048),
+    'B': range(-4096, 4096, 2),
+    'U': range(0, 1 << 20),
+    'J': range(-(1 << 20), 1 << 20, 2),
+}
+
+REGISTERS = range(32)
+DEFAULT_CHUNK = 1 << 18
+MAX_FAILURES_PER_SHARD = 20
+CHECKPOINT_VERSION = 2  # 2 added the uncapped "failed" count
+
+def instruction_axes(ins: Instruction) -> List[Tuple[str, range]]:
+    """Returns the (field, values) axes that vary for an instruction, MSB axis first."""
+    names = [f[0] for f in LAYOUTS[ins.type]]
+    axes = [(r, REGISTERS) for r in ("rd", "rs1", "rs2") if r in names]
+    if ins.type in IMM_RANGES:
+        axes.append(("imm", IMM_RANGES[ins.type]))
+    return axes
+
+class QuestionSpace:
+    """Maps a flat index range onto every question point of a set of instructions."""
+    def __init__(self, names: Optional[Sequence[str]] = None):
+        by_name = {i.name: i for i in REGISTRY}
+        if names is None:
+            self.instructions = list(REGISTRY)
+        else:
+            unknown = [n for n in names if n.lower() not in by_name]
+            if unknown:
+                raise ValueError(f"Unknown instructions: {', '.join(unknown)}")
+            self.instructions = [by_name[n.lower()] for n in names]
+
+        self.axes = [instruction_axes(i) for i in self.instructions]
+        self.offsets = []
+        total = 0
+        for axes in self.axes:
+            self.offsets.append(total)
+            size = 1
+            for _, values in axes:
+                size *= len(values)
+            total += size
+        self.total = total
+
+    def __len__(self) -> int:
+        return self.total
+
+    def point(self, index: int) -> Dict:
+        """Returns the question dict at a flat index (unused fields are zero)."""
+        if not 0 <= index < self.total:
+            raise IndexError(f"index {index} out of range [0, {self.total})")
+        k = len(self.offsets) - 1
+        while self.offsets[k] > index:
+            k -= 1
+        rem = index - self.offsets[k]
+        q = {"instruction": self.instructions[k], "rs1": 0, "rs2": 0, "rd": 0, "imm": 0}
+        for name, values in reversed(self.axes[k]):
+            rem, digit = divmod(rem, len(values))
+            q[name] = values[digit]
+        return q
+
+def check_point(engine: QuizEngine, q: Dict) -> Optional[str]:
+    """Round-trips one question; returns a failure reason or None if all paths agree."""
+    ins = q["instruction"]
+    asm = engine.format_asm(q)
+    engine.current_q = q
+    truth = engine.get_ground_truth()
+
+    if len(truth["binary"]) != 32:
+        return f"binary is {len(truth['binary'])} bits"
+    if "".join(f[1] for f in truth["fields"]) != truth["binary"]:
+        return "fields do not concatenate to binary"
+    word = int(truth["hex"], 16)
+    if word != int(truth["binary"], 2):
+        return f"hex {truth['hex']} disagrees with binary"
+
+    decoded = decode_word(word)
+    if decoded is None:
+        return f"{truth['hex']} does not decode"
+    if decoded["instruction"] is not ins:
+        return f"{truth['hex']} decodes as {decoded['instruction'].name}"
+    for name in ("rd", "rs1", "rs2", "imm"):
+        if decoded[name] != q[name]:
+            return f"{truth['hex']} decodes {name}={decoded[name]}, expected {q[name]}"
+    if engine.format_asm(decoded) != asm:
+        return f"decoded assembly '{engine.format_asm(decoded)}' != '{asm}'"
+
+    target_vals = {"opcode": ins.op, "rd": q["rd"], "rs1": q["rs1"], "rs2": q["rs2"], "imm": q["imm"]}
+    ok, msg = validate_asm_strict(asm, ins, target_vals)
+    if not ok:
+        return f"validate_asm_strict rejected '{asm}': {msg}"
+    return None
+
+def verify_range(names: Optional[List[str]], start: int, stop: int) -> Tuple[int, int, List[Tuple[int, str, str]]]:
+    """Checks points [start, stop); returns (checked, failed, the first failures as (index, asm, reason))."""
+    space = QuestionSpace(names)
+    engine = QuizEngine()
+    failed = 0
+    failures = []
+    for index in range(start, min(stop, space.total)):
+        q = space.point(index)
+        reason = check_point(engine, q)
+        if reason is not None:
+            failed += 1
+            if len(failures) < MAX_FAILURES_PER_SHARD:
+                failures.append((index, engine.format_asm(q), reason))
+    return max(0, min(stop, space.total) - start), failed, failures
+
+def _load_checkpoint(path: str, total: int, chunk: int, names: Optional[List[str]]) -> Dict:
+    fresh = {"version": CHECKPOINT_VERSION, "total": total, "chunk": chunk, "names": names, "done": [], "failed": 0, "failures": []}
+    if not path or not os.path.exists(path):
+        return fresh
+    with open(path) as fh:
+        state = json.load(fh)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has format version {state.get('version')}, not {CHECKPOINT_VERSION}; "
+                         "remove it to start over")
+    if (state.get("total"), state.get("chunk"), state.get("names")) != (total, chunk, names):
+        raise ValueError(f"Checkpoint {path} was written for a different question space; remove it to start over")
+    return state
+
+def _save_checkpoint(path: str, state: Dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+def run_verify(names: Optional[List[str]] = None, workers: Optional[int] = None,
+               chunk: int = DEFAULT_CHUNK, checkpoint: Optional[str] = None,
+               out=None) -> Dict:
+    """Verifies the whole question space on a process pool, resuming from a checkpoint."""
+    if chunk <= 0:
+        raise ValueError(f"chunk must be positive, got {chunk}")
+    out = out or sys.stdout
+    space = QuestionSpace(names)
+    state = _load_checkpoint(checkpoint, space.total, chunk, names)
+    done = set(state["done"])
+    shards = [s for s in range((space.total + chunk - 1) // chunk) if s not in done]
+
+    print(f"Verifying {space.total} points in {len(shards)} shards "
+          f"({len(done)} already done)", file=out)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(verify_range, names, s * chunk, (s + 1) * chunk): s for s in shards}
+        for fut in as_completed(futures):
+            checked, failed, failures = fut.result()
+            state["done"].append(futures[fut])
+            state["failed"] += failed
+            state["failures"].extend(failures)
+            if checkpoint:
+                _save_checkpoint(checkpoint, state)
+            print(f"  shard {futures[fut]}: {checked} points, {failed} failures "
+                  f"[{len(state['done'])}/{len(done) + len(shards)}]", file=out)
+
+    for index, asm, reason in state["failures"]:
+        print(f"FAIL #{index}: {asm}: {reason}", file=out)
+    shown = f" ({len(state['failures'])} shown)" if state["failed"] > len(state["failures"]) else ""
+    print(f"Done: {state['failed']} failures{shown}", file=out)
+    return state
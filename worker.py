@@ -0,0 +1,184 @@
+"""
+RISC-V Tutor Grading Worker
+A long-running JSON-lines grader for LMS back ends: one request per stdin line,
+one response per stdout line in the same order, tables kept warm between calls.
+
+    {"id": 1, "op": "generate", "mode": "encoding", "types": "R I"}
+    {"id": 2, "op": "grade", "kind": "hex", "hex": "003100b3", "answer": "0x003100b3"}
+    {"id": 3, "op": "grade", "kind": "asm", "token": "...", "answer": "add x1, x2, x3"}
+    {"id": 4, "op": "decode", "hex": "003100b3"}
+
+Grade kinds are layout, bits, binary, hex and asm; the question is given by its
+encoding ("hex") or by a token from generate. Requests may be streamed: every
+line already read is answered before the next read, in one write.
+"""
+import json
+import sys
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from engine import QuizEngine, ground_truth, decode_word
+from pipeline import ALL_TYPES, MODE_NAMES, parse_types, validate_asm_strict, _layout_feedback, _field_feedback
+import tokens
+
+READ_CHUNK = 1 << 16
+MAX_REQUEST = 1 << 20     # Longest accepted request line, bytes
+QUESTION_CACHE = 4096     # Decoded words kept with their ground truth
+MODE_IDS = {name.lower(): mode for mode, name in MODE_NAMES.items()}
+
+_ENGINE = QuizEngine()    # format_asm only; the worker is single-threaded
+
+@lru_cache(maxsize=QUESTION_CACHE)
+def _question(word: int) -> Tuple[Dict, Dict]:
+    q = decode_word(word)
+    if q is None:
+        raise ValueError(f"{word:08x} is not an instruction in the registry")
+    q["asm"] = _ENGINE.format_asm(q)
+    return q, ground_truth(q)
+
+def _word(raw) -> int:
+    if not isinstance(raw, str):
+        raise TypeError("hex must be a string")
+    try:
+        word = int(raw, 16)
+    except ValueError:
+        raise ValueError(f"hex {raw!r} is not a hex number")
+    if not 0 <= word <= 0xFFFFFFFF:
+        raise ValueError(f"hex {raw!r} is not a 32-bit word")
+    return word
+
+class Worker:
+    """Request dispatch; every handler returns a JSON-ready dict or raises TypeError/ValueError."""
+    def __init__(self, token_key: Optional[bytes] = None):
+        self.token_key = token_key or tokens.default_key()
+        self.ops = {"generate": self.generate, "grade": self.grade, "decode": self.decode}
+        self.graders = {"layout": self._layout, "bits": self._bits, "binary": self._binary,
+                        "hex": self._hex, "asm": self._asm}
+        self._token = lru_cache(maxsize=QUESTION_CACHE)(self._parse_token) # a question is graded step by step
+
+    def _parse_token(self, token: str) -> Tuple[Dict, Dict]:
+        q = tokens.parse(self.token_key, token).question
+        return q, ground_truth(q)
+
+    def handle(self, req: Dict) -> Dict:
+        if not isinstance(req, dict):
+            raise TypeError("request must be a JSON object")
+        op = self.ops.get(req.get("op"))
+        if op is None:
+            raise ValueError(f"unknown op {req.get('op')!r}")
+        return op(req)
+
+    def handle_line(self, line: bytes) -> bytes:
+        """One request line in, one response line out; errors become {"error": ...} responses."""
+        req = None
+        try:
+            req = json.loads(line)
+            resp = self.handle(req)
+        except (TypeError, ValueError) as e:
+            resp = {"error": str(e)}
+        except RecursionError:
+            resp = {"error": "request nested too deeply"}
+        except Exception as e: # one bad line must not end the stream
+            resp = {"error": f"internal error: {type(e).__name__}"}
+        if isinstance(req, dict) and "id" in req:
+            resp["id"] = req["id"]
+        return json.dumps(resp, separators=(",", ":")).encode() + b"\n"
+
+    def generate(self, req: Dict) -> Dict:
+        mode = str(req.get("mode", "")).lower()
+        mode = MODE_IDS.get(mode, mode)
+        if mode not in MODE_NAMES:
+            raise ValueError(f"unknown mode {req.get('mode')!r}")
+        types = req.get("types") or ALL_TYPES
+        token, tok = tokens.generate(self.token_key, mode, parse_types(types) if isinstance(types, str) else types)
+        q = tok.question
+        return {"token": token, "mode": MODE_NAMES[mode].lower(), "instruction": q["instruction"].name,
+                "asm": q["asm"], "hex": ground_truth(q)["hex"]}
+
+    def decode(self, req: Dict) -> Dict:
+        q, truth = _question(_word(req.get("hex")))
+        return {"instruction": q["instruction"].name, "type": q["instruction"].type, "asm": q["asm"],
+                "hex": truth["hex"], "fields": [list(f) for f in truth["fields"]]}
+
+    def grade(self, req: Dict) -> Dict:
+        grader = self.graders.get(req.get("kind"))
+        if grader is None:
+            raise ValueError(f"kind must be one of {', '.join(self.graders)}")
+        answer = req.get("answer")
+        if not isinstance(answer, str):
+            raise TypeError("answer must be a string")
+        if "token" in req:
+            if not isinstance(req["token"], str):
+                raise TypeError("token must be a string")
+            q, truth = self._token(req["token"])
+        else:
+            q, truth = _question(_word(req.get("hex")))
+        return grader(q, truth, answer.strip())
+
+    @staticmethod
+    def _result(points, total, expected, feedback: str = "") -> Dict:
+        return {"correct": points == total and not feedback, "points": points, "total": total,
+                "expected": expected, "feedback": feedback}
+
+    def _layout(self, q: Dict, truth: Dict, answer: str) -> Dict:
+        _ENGINE.current_q = q
+        ans = answer.split()
+        ok, mask, correct = _ENGINE.validate_layout(ans)
+        return self._result(sum(mask), len(correct), correct, "" if ok else _layout_feedback(ans, mask, correct))
+
+    def _bits(self, q: Dict, truth: Dict, answer: str) -> Dict:
+        _ENGINE.current_q = q
+        ans = answer.split()
+        ok, mask, correct = _ENGINE.validate_bits(ans)
+        names = [f[0] for f in truth["fields"]]
+        return self._result(sum(mask), len(correct), correct,
+                            "" if ok else _field_feedback(ans, mask, correct, names))
+
+    def _binary(self, q: Dict, truth: Dict, answer: str) -> Dict:
+        ans = answer.split()
+        correct = [f[1] for f in truth["fields"]]
+        mask = [i < len(ans) and ans[i] == bits for i, bits in enumerate(correct)]
+        ok = all(mask) and len(ans) == len(correct)
+        return self._result(sum(mask), len(correct), correct,
+                            "" if ok else _field_feedback(ans, mask, correct, [f[0] for f in truth["fields"]]))
+
+    def _hex(self, q: Dict, truth: Dict, answer: str) -> Dict:
+        h = answer.lower()
+        ok = h == truth["hex"] or h == "0x" + truth["hex"]
+        return self._result(int(ok), 1, truth["hex"], "" if ok else f"Answer: {truth['hex']}")
+
+    def _asm(self, q: Dict, truth: Dict, answer: str) -> Dict:
+        ins = q["instruction"]
+        target = {"opcode": ins.op, "rd": q["rd"], "rs1": q["rs1"], "rs2": q["rs2"], "imm": q["imm"]}
+        ok, msg = validate_asm_strict(answer, ins, target)
+        return self._result(int(ok), 1, q["asm"], "" if ok else msg)
+
+def run_worker(infile: Optional[BinaryIO] = None, outfile: Optional[BinaryIO] = None,
+               token_key: Optional[bytes] = None) -> int:
+    """Serves requests until EOF; returns the number handled."""
+    infile = infile or sys.stdin.buffer
+    outfile = outfile or sys.stdout.buffer
+    worker = Worker(token_key)
+    pending = b""
+    discarding = False # inside an over-long line that has had its error response
+    handled = 0
+    while True:
+        chunk = infile.read1(READ_CHUNK) # whatever is available, so replies never wait on a full buffer
+        data = pending + chunk
+        if discarding:
+            end = data.find(b"\n")
+            data, discarding = (b"", True) if end < 0 else (data[end + 1:], False)
+        lines = data.split(b"\n")
+        pending = b"" if not chunk else lines.pop()
+        out: List[bytes] = []
+        for line in lines:
+            if line.strip():
+                out.append(worker.handle_line(line))
+        if len(pending) > MAX_REQUEST:
+            out.append(b'{"error":"request line too long"}\n')
+            pending, discarding = b"", True # one response per line: the rest of it is dropped
+        if out:
+            outfile.write(b"".join(out))
+            outfile.flush()
+            handled += len(out)
+        if not chunk:
+            return handled